@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -7,22 +8,138 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sinergia_pro.db")
+# Réplica de leitura opcional (Postgres); no SQLite as leituras usam o mesmo arquivo
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", DATABASE_URL)
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
+# Perfil do SQLite: "production" (WAL, pragmas, leitura/escrita separadas) ou "default"
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+SQLITE_WRITE_POOL_TIMEOUT_SECONDS = float(os.getenv("SQLITE_WRITE_POOL_TIMEOUT_SECONDS", "30"))
+
+# Camada assíncrona opcional (AsyncSession com aiosqlite/asyncpg)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+
+def _set_sqlite_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # Persistente no arquivo: basta o escritor definir
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def _create_sqlite_engines(url: str, factory=create_engine):
+    """
+    Engine de escrita com uma única conexão e engine de leitura com pool
+
+    No WAL leitores não bloqueiam o escritor nem são bloqueados por ele. As
+    escritas do processo passam por uma conexão só, e cada transação começa
+    com BEGIN IMMEDIATE: a trava de escrita é obtida no início (esperando
+    até busy_timeout) em vez de falhar com "database is locked" no meio.
+    """
+    connect_args = {"check_same_thread": False}
+    writer = factory(
+        url,
+        connect_args=connect_args,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=SQLITE_WRITE_POOL_TIMEOUT_SECONDS,
         echo=False
     )
-else:
-    engine = create_engine(
-        DATABASE_URL,
+    # Leitores sem limite de overflow: rotas síncronas seguram a conexão até
+    # validar a resposta no threadpool, e um pool menor que o threadpool
+    # trava todas as threads esperando conexões presas nessa fila
+    reader = factory(
+        url,
+        connect_args=connect_args,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=-1,
+        echo=False
+    )
+    # Engines assíncronas recebem os eventos pela engine síncrona interna
+    sync_writer = getattr(writer, "sync_engine", writer)
+    sync_reader = getattr(reader, "sync_engine", reader)
+
+    @event.listens_for(sync_writer, "connect")
+    def _writer_connect(dbapi_connection, connection_record):
+        # O pysqlite não emite BEGIN sozinho; quem controla é o evento "begin"
+        dbapi_connection.isolation_level = None
+        _set_sqlite_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(sync_writer, "begin")
+    def _writer_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(sync_reader, "connect")
+    def _reader_connect(dbapi_connection, connection_record):
+        _set_sqlite_pragmas(dbapi_connection, read_only=True)
+
+    return writer, reader
+
+
+def _create_engines(url: str, read_url: str, factory=create_engine):
+    """Engines de escrita e leitura conforme o banco e o perfil do SQLite"""
+    if url.startswith("sqlite") and SQLITE_PROFILE == "production":
+        return _create_sqlite_engines(url, factory)
+    if url.startswith("sqlite"):
+        engine = factory(
+            url,
+            connect_args={"check_same_thread": False},
+            echo=False
+        )
+        return engine, engine
+    engine = factory(
+        url,
+        pool_size=10,
+        max_overflow=20,
+        echo=False
+    )
+    read_engine = engine if read_url == url else factory(
+        read_url,
         pool_size=10,
         max_overflow=20,
         echo=False
     )
+    return engine, read_engine
+
+
+def async_database_url(url: str) -> str:
+    """Mesma URL com o driver assíncrono: sqlite+aiosqlite ou postgresql+asyncpg"""
+    parsed = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    backend = parsed.get_backend_name()
+    if backend not in drivers:
+        return url
+    return parsed.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+engine, read_engine = _create_engines(DATABASE_URL, READ_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine, async_read_engine = _create_engines(
+        async_database_url(DATABASE_URL), async_database_url(READ_DATABASE_URL), create_async_engine
+    )
+    # expire_on_commit=False: atributos continuam legíveis após o commit sem novo SELECT
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = async_read_engine = None
+    AsyncSessionLocal = AsyncReadSessionLocal = None
 
 Base = declarative_base()
 
@@ -32,3 +149,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Sessão somente leitura, para rotas GET"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """Sessão assíncrona (DATABASE_ASYNC=true)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Sessão assíncrona somente leitura, para rotas GET"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
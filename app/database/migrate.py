@@ -0,0 +1,182 @@
+"""
+Executor das migrações do esquema
+
+Roda como comando separado, antes de subir os workers:
+
+    python -m app.database.migrate upgrade       # aplica as pendentes
+    python -m app.database.migrate status        # versão atual e pendentes
+    python -m app.database.migrate check-plans   # falha se consulta quente varrer tabela
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, event, insert, inspect, select, tuple_
+from app.database.connection import engine
+from app.database.migrations import MIGRATIONS
+
+# Tabela de controle fora de Base.metadata: não é criada pela migração 1
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+def applied_versions(bind=engine) -> set:
+    if not inspect(bind).has_table(schema_migrations.name):
+        return set()
+    with bind.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(bind=engine) -> list:
+    applied = applied_versions(bind)
+    return [(version, description) for version, description, _ in sorted(MIGRATIONS) if version not in applied]
+
+
+def upgrade(bind=engine) -> list:
+    """Aplicar as migrações pendentes, cada uma em sua própria transação"""
+    _metadata.create_all(bind)
+    applied = applied_versions(bind)
+    done = []
+    for version, description, apply in sorted(MIGRATIONS):
+        if version in applied:
+            continue
+        with bind.begin() as connection:
+            apply(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        done.append((version, description))
+    return done
+
+
+# ====== VERIFICAÇÃO DOS PLANOS DE CONSULTA ======
+@contextmanager
+def _explain(bind):
+    """Executar as consultas como EXPLAIN QUERY PLAN nesta conexão"""
+    with bind.connect() as connection:
+        def rewrite(conn, cursor, statement, parameters, context, executemany):
+            return "EXPLAIN QUERY PLAN " + statement, parameters
+
+        event.listen(connection, "before_cursor_execute", rewrite, retval=True)
+        try:
+            yield connection
+        finally:
+            event.remove(connection, "before_cursor_execute", rewrite)
+
+
+def hot_queries() -> dict:
+    """Consultas dos caminhos quentes das rotas, com parâmetros representativos"""
+    from app.models.appointment import Appointment
+    from app.models.archived_appointment import ArchivedAppointment
+    from app.models.calendar_outbox import CalendarOutbox
+    from app.models.user import User
+    from app.utils.availability import APPOINTMENT_DURATION, active_appointments
+    from app.utils.collection_versions import appointment_feed_query
+    from app.utils.archive import archive_candidates
+    from app.utils.user_search import prefix_query
+
+    now = datetime.utcnow()
+    page = (Appointment.date, Appointment.id)
+    return {
+        "login_por_email": select(User).where(User.email == "user@example.com"),
+        "profissionais_por_id": select(User.id, User.name).where(User.role == "therapist", User.id > 0).order_by(User.id).limit(51),
+        "profissionais_por_especialidade": select(User.id, User.name).where(
+            User.role == "therapist", User.specialization == "Psicólogo", User.id > 0
+        ).order_by(User.id).limit(51),
+        "pacientes_por_id": select(User.id, User.name).where(User.role == "patient", User.id > 0).order_by(User.id).limit(51),
+        "busca_de_usuarios_por_prefixo": prefix_query("mar", "patient", None, None, 21),
+        "agenda_do_terapeuta": select(Appointment).where(
+            Appointment.therapist_id == 1, tuple_(*page) > (now, 0)
+        ).order_by(*page).limit(51),
+        "agenda_do_paciente": select(Appointment).where(
+            Appointment.patient_id == 1, Appointment.date >= now
+        ).order_by(*page).limit(51),
+        "agendamentos_por_status": select(Appointment).where(
+            Appointment.status == "scheduled", Appointment.date >= now
+        ).order_by(*page).limit(51),
+        "agendamentos_por_periodo": select(Appointment).where(
+            Appointment.date >= now, Appointment.date < now + timedelta(days=31)
+        ).order_by(*page),
+        "conflito_de_horario": select(Appointment.id).where(
+            Appointment.therapist_id == 1,
+            Appointment.date > now - APPOINTMENT_DURATION,
+            Appointment.date < now + APPOINTMENT_DURATION,
+            active_appointments()
+        ).limit(1),
+        "indice_de_disponibilidade": select(Appointment.therapist_id, Appointment.date).where(
+            Appointment.therapist_id.in_([1, 2, 3]), Appointment.date >= now, active_appointments()
+        ).order_by(Appointment.therapist_id, Appointment.date),
+        "ocorrencias_da_serie": select(Appointment.id).where(
+            Appointment.series_id == 1, Appointment.date >= now, Appointment.status == "scheduled"
+        ),
+        "sincronizacao_do_calendar": select(Appointment).where(
+            Appointment.google_meet_event_id.in_(["evento1", "evento2"])
+        ),
+        "arquivamento_candidatos": archive_candidates(now - timedelta(days=365), 200),
+        "historico_do_terapeuta": select(ArchivedAppointment).where(
+            ArchivedAppointment.therapist_id == 1, ArchivedAppointment.date >= now - timedelta(days=730)
+        ).order_by(ArchivedAppointment.date, ArchivedAppointment.id).limit(51),
+        "versao_das_agendas": appointment_feed_query(None, None),
+        "outbox_reivindicacao": select(CalendarOutbox.id).where(
+            CalendarOutbox.status == "pending", CalendarOutbox.next_attempt_at <= now
+        ).order_by(CalendarOutbox.next_attempt_at, CalendarOutbox.id).limit(8),
+        "outbox_job_ativo": select(CalendarOutbox).where(
+            CalendarOutbox.appointment_id == 1,
+            CalendarOutbox.operation == "create",
+            CalendarOutbox.status.in_(("pending", "processing"))
+        ).limit(1),
+    }
+
+
+def full_scans(plan: list) -> list:
+    """Passos do plano que varrem uma tabela inteira sem índice"""
+    return [detail for detail in plan if detail.startswith("SCAN ") and " USING " not in detail]
+
+
+def check_plans(bind=engine) -> dict:
+    """Plano de cada consulta quente; só suportado no SQLite"""
+    if bind.dialect.name != "sqlite":
+        raise RuntimeError("check-plans usa EXPLAIN QUERY PLAN do SQLite")
+    plans = {}
+    with _explain(bind) as connection:
+        for name, query in hot_queries().items():
+            plans[name] = [row[-1] for row in connection.execute(query)]
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do esquema do Sinergia Pro")
+    parser.add_argument("command", choices=["upgrade", "status", "check-plans"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        done = upgrade()
+        for version, description in done:
+            print(f"Aplicada {version:04d}: {description}")
+        if not done:
+            print("Esquema atualizado")
+    elif args.command == "status":
+        applied = applied_versions()
+        print(f"Versão atual: {max(applied, default=0)}")
+        for version, description in pending_migrations():
+            print(f"Pendente {version:04d}: {description}")
+    else:
+        pending = pending_migrations()
+        if pending:
+            print("Migrações pendentes; execute 'upgrade' antes de verificar os planos")
+            sys.exit(1)
+        failed = False
+        for name, plan in check_plans().items():
+            scans = full_scans(plan)
+            failed = failed or bool(scans)
+            print(f"{'FALHA' if scans else 'ok   '} {name}: {' | '.join(plan)}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
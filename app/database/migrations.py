@@ -0,0 +1,302 @@
+"""
+Migrações versionadas do esquema
+
+Cada migração recebe uma conexão dentro de uma transação e deve ser segura
+para bancos criados antes do controle de versões (tabelas ou colunas já
+existentes). Novas migrações entram no fim da lista com a próxima versão.
+
+As tabelas e índices de cada migração ficam congelados aqui, como estavam
+naquela versão, e não são lidos dos modelos: mudar um modelo não muda o que
+uma migração já aplicada cria, e bancos novos e atualizados chegam ao mesmo
+esquema. Alterações de modelo entram como uma nova migração. Nenhuma
+migração importa código da aplicação.
+"""
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Time, inspect, text
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(upgrade):
+        MIGRATIONS.append((version, description, upgrade))
+        return upgrade
+    return register
+
+
+def add_column_if_missing(connection, table: str, column: str, ddl: str):
+    columns = {c["name"] for c in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(connection, name: str, table: str, columns: str, where: str = None, unique: bool = False):
+    """CREATE INDEX IF NOT EXISTS (SQLite e Postgres), com WHERE para índices parciais"""
+    ddl = f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    connection.execute(text(ddl + (f" WHERE {where}" if where else "")))
+
+
+def _referenced(metadata: MetaData, *names: str):
+    """Tabelas só referenciadas por chave estrangeira (não são criadas)"""
+    for name in names:
+        Table(name, metadata, Column("id", Integer, primary_key=True))
+
+
+def _create_tables(connection, metadata: MetaData, names: list):
+    for name in names:
+        metadata.tables[name].create(connection, checkfirst=True)
+
+
+@migration(1, "Tabelas iniciais (users e appointments)")
+def _initial_tables(connection):
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("password", String),
+        Column("name", String),
+        Column("role", String),
+        Column("specialization", String, nullable=True),
+        Column("crm_or_crp", String, nullable=True),
+        Column("created_at", DateTime),
+    )
+    # series_id e os índices compostos entram nas migrações 5 e 6
+    Table(
+        "appointments", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("therapist_id", Integer, ForeignKey("users.id"), index=True),
+        Column("patient_id", Integer, ForeignKey("users.id"), index=True),
+        Column("date", DateTime),
+        Column("status", String),
+        Column("google_meet_event_id", String, nullable=True),
+        Column("google_meet_link", String, nullable=True),
+        Column("notes", String, nullable=True),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    # checkfirst: bancos antigos já têm users e appointments
+    _create_tables(connection, metadata, ["users", "appointments"])
+
+
+@migration(2, "Tabela calendar_outbox (efeitos colaterais no Calendar)")
+def _calendar_outbox(connection):
+    metadata = MetaData()
+    _referenced(metadata, "appointments")
+    Table(
+        "calendar_outbox", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("appointment_id", Integer, ForeignKey("appointments.id"), index=True),
+        Column("operation", String),
+        Column("status", String),
+        Column("title", String, nullable=True),
+        Column("event_id", String, nullable=True),
+        Column("attempts", Integer),
+        Column("next_attempt_at", DateTime),
+        Column("last_error", String, nullable=True),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Column("processed_at", DateTime, nullable=True),
+        Index("ix_calendar_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+    _create_tables(connection, metadata, ["calendar_outbox"])
+
+
+@migration(3, "Tabela stat_counters (contadores das estatísticas)")
+def _stat_counters(connection):
+    metadata = MetaData()
+    Table(
+        "stat_counters", metadata,
+        Column("key", String, primary_key=True),
+        Column("value", Integer, nullable=False),
+    )
+    _create_tables(connection, metadata, ["stat_counters"])
+
+
+@migration(4, "Tabela working_hours (expediente dos terapeutas)")
+def _working_hours(connection):
+    metadata = MetaData()
+    _referenced(metadata, "users")
+    Table(
+        "working_hours", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("therapist_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("weekday", Integer, nullable=False),
+        Column("start_time", Time, nullable=False),
+        Column("end_time", Time, nullable=False),
+        Index("ix_working_hours_therapist_weekday", "therapist_id", "weekday"),
+    )
+    _create_tables(connection, metadata, ["working_hours"])
+
+
+@migration(5, "Tabela appointment_series e coluna appointments.series_id")
+def _appointment_series(connection):
+    metadata = MetaData()
+    _referenced(metadata, "users")
+    Table(
+        "appointment_series", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("therapist_id", Integer, ForeignKey("users.id"), index=True),
+        Column("patient_id", Integer, ForeignKey("users.id"), index=True),
+        Column("frequency", String),
+        Column("start", DateTime),
+        Column("count", Integer, nullable=True),
+        Column("until", Date, nullable=True),
+        Column("created_at", DateTime),
+    )
+    _create_tables(connection, metadata, ["appointment_series"])
+    add_column_if_missing(connection, "appointments", "series_id", "INTEGER REFERENCES appointment_series (id)")
+    create_index(connection, "ix_appointments_series_id", "appointments", "series_id")
+
+
+@migration(6, "Índices compostos e parciais dos padrões de acesso")
+def _access_pattern_indexes(connection):
+    create_index(connection, "ix_users_role_id", "users", "role, id")
+    create_index(connection, "ix_users_therapist_specialization", "users", "specialization, id", where="role = 'therapist'")
+    create_index(connection, "ix_appointments_therapist_date", "appointments", "therapist_id, date")
+    create_index(connection, "ix_appointments_patient_date", "appointments", "patient_id, date")
+    create_index(connection, "ix_appointments_status_date", "appointments", "status, date")
+    create_index(
+        connection, "ix_appointments_active_therapist_date", "appointments", "therapist_id, date",
+        where="status != 'cancelled'"
+    )
+    create_index(connection, "ix_calendar_outbox_appointment_operation", "calendar_outbox", "appointment_id, operation, status")
+    # Bancos anteriores às migrações não têm o índice simples de date
+    create_index(connection, "ix_appointments_date", "appointments", "date")
+
+
+@migration(7, "Tabela collection_versions (ETags das listagens)")
+def _collection_versions(connection):
+    metadata = MetaData()
+    Table(
+        "collection_versions", metadata,
+        Column("key", String, primary_key=True),
+        Column("version", Integer, nullable=False),
+    )
+    _create_tables(connection, metadata, ["collection_versions"])
+
+
+@migration(8, "Estado da sincronização com o Calendar e índice de google_meet_event_id")
+def _calendar_sync(connection):
+    metadata = MetaData()
+    Table(
+        "calendar_sync_state", metadata,
+        Column("calendar_id", String, primary_key=True),
+        Column("sync_token", String, nullable=True),
+        Column("full_sync_at", DateTime, nullable=True),
+        Column("synced_at", DateTime, nullable=True),
+        Column("updated_at", DateTime),
+    )
+    _create_tables(connection, metadata, ["calendar_sync_state"])
+    create_index(connection, "ix_appointments_google_meet_event_id", "appointments", "google_meet_event_id")
+
+
+@migration(9, "Tabela reminder_deliveries (lembretes enviados)")
+def _reminder_deliveries(connection):
+    metadata = MetaData()
+    _referenced(metadata, "appointments")
+    Table(
+        "reminder_deliveries", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("appointment_id", Integer, ForeignKey("appointments.id"), nullable=False),
+        Column("offset_minutes", Integer, nullable=False),
+        Column("due_at", DateTime, nullable=False),
+        Column("status", String),
+        Column("error", String, nullable=True),
+        Column("created_at", DateTime),
+        Column("sent_at", DateTime, nullable=True),
+        Index("ix_reminder_deliveries_unique", "appointment_id", "offset_minutes", "due_at", unique=True),
+        Index("ix_reminder_deliveries_due_at", "due_at"),
+    )
+    _create_tables(connection, metadata, ["reminder_deliveries"])
+
+
+# Dobra de caixa e acentos da migração 10, congelada como SQL: minúsculas
+# e um replace() por letra acentuada; {0} é a coluna
+_FOLD_V10 = (
+    "replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace("
+    "replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace(replace("
+    "lower(coalesce({0}, ''))"
+    ", 'á', 'a'), 'Á', 'a'), 'à', 'a'), 'À', 'a')"
+    ", 'â', 'a'), 'Â', 'a'), 'ã', 'a'), 'Ã', 'a')"
+    ", 'é', 'e'), 'É', 'e'), 'ê', 'e'), 'Ê', 'e')"
+    ", 'í', 'i'), 'Í', 'i'), 'ó', 'o'), 'Ó', 'o')"
+    ", 'ô', 'o'), 'Ô', 'o'), 'õ', 'o'), 'Õ', 'o')"
+    ", 'ú', 'u'), 'Ú', 'u'), 'ü', 'u'), 'Ü', 'u')"
+    ", 'ç', 'c'), 'Ç', 'c')"
+)
+
+
+@migration(10, "Busca de usuários: user_search, FTS5 e triggers (SQLite)")
+def _user_search(connection):
+    # Nos demais bancos a busca usa o índice em memória
+    if connection.dialect.name != "sqlite":
+        return
+    name_key, email_key = _FOLD_V10.format("new.name"), _FOLD_V10.format("new.email")
+    statements = [
+        "CREATE TABLE IF NOT EXISTS user_search ("
+        "user_id INTEGER NOT NULL, role VARCHAR, specialization VARCHAR, name_key VARCHAR, email_key VARCHAR, "
+        "PRIMARY KEY (user_id))",
+        "CREATE INDEX IF NOT EXISTS ix_user_search_name_key ON user_search (name_key, user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_user_search_role_name_key ON user_search (role, name_key, user_id)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS user_search_fts USING fts5("
+        "name_key, email_key, content='user_search', content_rowid='user_id', tokenize='trigram')",
+        # users -> user_search
+        "CREATE TRIGGER IF NOT EXISTS users_search_ai AFTER INSERT ON users BEGIN "
+        "INSERT INTO user_search (user_id, role, specialization, name_key, email_key) "
+        f"VALUES (new.id, new.role, new.specialization, {name_key}, {email_key}); END",
+        "CREATE TRIGGER IF NOT EXISTS users_search_au AFTER UPDATE OF name, email, role, specialization ON users BEGIN "
+        "UPDATE user_search SET role = new.role, specialization = new.specialization, "
+        f"name_key = {name_key}, email_key = {email_key} WHERE user_id = new.id; END",
+        "CREATE TRIGGER IF NOT EXISTS users_search_ad AFTER DELETE ON users BEGIN "
+        "DELETE FROM user_search WHERE user_id = old.id; END",
+        # user_search -> user_search_fts (tabela de conteúdo externo)
+        "CREATE TRIGGER IF NOT EXISTS user_search_fts_ai AFTER INSERT ON user_search BEGIN "
+        "INSERT INTO user_search_fts (rowid, name_key, email_key) VALUES (new.user_id, new.name_key, new.email_key); END",
+        "CREATE TRIGGER IF NOT EXISTS user_search_fts_ad AFTER DELETE ON user_search BEGIN "
+        "INSERT INTO user_search_fts (user_search_fts, rowid, name_key, email_key) "
+        "VALUES ('delete', old.user_id, old.name_key, old.email_key); END",
+        "CREATE TRIGGER IF NOT EXISTS user_search_fts_au AFTER UPDATE ON user_search BEGIN "
+        "INSERT INTO user_search_fts (user_search_fts, rowid, name_key, email_key) "
+        "VALUES ('delete', old.user_id, old.name_key, old.email_key); "
+        "INSERT INTO user_search_fts (rowid, name_key, email_key) VALUES (new.user_id, new.name_key, new.email_key); END",
+        "INSERT OR IGNORE INTO user_search (user_id, role, specialization, name_key, email_key) "
+        f"SELECT id, role, specialization, {_FOLD_V10.format('name')}, {_FOLD_V10.format('email')} FROM users",
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+@migration(11, "Tabela appointments_archive (arquivamento de agendamentos antigos)")
+def _appointments_archive(connection):
+    metadata = MetaData()
+    _referenced(metadata, "users", "appointment_series")
+    Table(
+        "appointments_archive", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("therapist_id", Integer, ForeignKey("users.id")),
+        Column("patient_id", Integer, ForeignKey("users.id")),
+        Column("date", DateTime),
+        Column("status", String),
+        Column("google_meet_event_id", String, nullable=True),
+        Column("google_meet_link", String, nullable=True),
+        Column("notes", String, nullable=True),
+        Column("series_id", Integer, ForeignKey("appointment_series.id"), nullable=True),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Column("archived_at", DateTime),
+        Index("ix_appointments_archive_therapist_date", "therapist_id", "date"),
+        Index("ix_appointments_archive_patient_date", "patient_id", "date"),
+        Index("ix_appointments_archive_date", "date"),
+    )
+    _create_tables(connection, metadata, ["appointments_archive"])
+
+
+@migration(12, "Índices simples de therapist_id e patient_id em bancos anteriores às migrações")
+def _baseline_foreign_key_indexes(connection):
+    create_index(connection, "ix_appointments_therapist_id", "appointments", "therapist_id")
+    create_index(connection, "ix_appointments_patient_id", "appointments", "patient_id")
+
+
+@migration(13, "Coluna appointments.date_changed_at (sincronização com o Calendar)")
+def _appointment_date_changed_at(connection):
+    add_column_if_missing(connection, "appointments", "date_changed_at", "DATETIME")
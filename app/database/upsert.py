@@ -0,0 +1,42 @@
+"""
+Incremento de contadores por chave com INSERT ... ON CONFLICT DO UPDATE
+
+Uma instrução só por lote de chaves, no SQLite (3.24+) e no Postgres: a
+primeira escrita de uma chave não corre o risco de duas transações
+concorrentes tentarem o INSERT e uma delas falhar com IntegrityError, como
+no "UPDATE e, se não havia linha, INSERT".
+"""
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def upsert_increments(connection, model, column: str, deltas: dict):
+    """
+    Somar os deltas à coluna `column` das linhas de cada chave primária
+
+    Linhas que ainda não existem são criadas com o próprio delta. As chaves
+    vão em ordem, para transações concorrentes travarem as linhas na mesma
+    sequência.
+    """
+    table = model.__table__
+    key = table.primary_key.columns[0]
+    rows = [{key.name: k, column: deltas[k]} for k in sorted(deltas) if deltas[k]]
+    if not rows:
+        return
+    dialect_insert = _DIALECT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is None:
+        # Outros bancos: sem upsert nativo
+        for row in rows:
+            result = connection.execute(
+                update(table).where(key == row[key.name]).values({column: table.c[column] + row[column]})
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(row))
+        return
+    stmt = dialect_insert(table)
+    connection.execute(
+        stmt.on_conflict_do_update(index_elements=[key], set_={column: table.c[column] + stmt.excluded[column]}),
+        rows
+    )
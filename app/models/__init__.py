@@ -1,2 +1,10 @@
 from app.models.user import User
 from app.models.appointment import Appointment
+from app.models.calendar_outbox import CalendarOutbox
+from app.models.stat_counter import StatCounter
+from app.models.working_hours import WorkingHours
+from app.models.appointment_series import AppointmentSeries
+from app.models.collection_version import CollectionVersion
+from app.models.calendar_sync_state import CalendarSyncState
+from app.models.reminder_delivery import ReminderDelivery
+from app.models.archived_appointment import ArchivedAppointment
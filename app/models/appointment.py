@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.connection import Base
 
@@ -10,8 +11,29 @@ class Appointment(Base):
     patient_id = Column(Integer, ForeignKey("users.id"), index=True)
     date = Column(DateTime, index=True)
     status = Column(String, default="scheduled")  # scheduled, completed, cancelled
-    google_meet_event_id = Column(String, nullable=True)
+    google_meet_event_id = Column(String, nullable=True, index=True)  # Sincronização com o Calendar
     google_meet_link = Column(String, nullable=True)
     notes = Column(String, nullable=True)
+    series_id = Column(Integer, ForeignKey("appointment_series.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Última mudança de date feita aqui (UTC), comparada ao "updated" dos eventos do Calendar
+    date_changed_at = Column(DateTime, nullable=True)
+
+    # Carregar com joinedload/selectinload nas consultas que usam os nomes;
+    # sem isso cada acesso vira uma consulta (N+1)
+    therapist = relationship("User", foreign_keys=[therapist_id])
+    patient = relationship("User", foreign_keys=[patient_id])
+
+    __table_args__ = (
+        # Agenda do terapeuta/paciente e listagens por status, ordenadas por (date, id)
+        Index("ix_appointments_therapist_date", "therapist_id", "date"),
+        Index("ix_appointments_patient_date", "patient_id", "date"),
+        Index("ix_appointments_status_date", "status", "date"),
+        # Verificação de conflitos e índice de disponibilidade: só agendamentos ativos
+        Index(
+            "ix_appointments_active_therapist_date", "therapist_id", "date",
+            sqlite_where=text("status != 'cancelled'"),
+            postgresql_where=text("status != 'cancelled'")
+        ),
+    )
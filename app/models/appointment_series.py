@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey
+from datetime import datetime
+from app.database.connection import Base
+
+class AppointmentSeries(Base):
+    __tablename__ = "appointment_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    therapist_id = Column(Integer, ForeignKey("users.id"), index=True)
+    patient_id = Column(Integer, ForeignKey("users.id"), index=True)
+    frequency = Column(String)  # weekly, biweekly
+    start = Column(DateTime)  # Primeira ocorrência da regra
+    count = Column(Integer, nullable=True)
+    until = Column(Date, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
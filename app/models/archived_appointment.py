@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database.connection import Base
+
+class ArchivedAppointment(Base):
+    __tablename__ = "appointments_archive"
+
+    id = Column(Integer, primary_key=True)  # Mesmo id de appointments
+    therapist_id = Column(Integer, ForeignKey("users.id"))
+    patient_id = Column(Integer, ForeignKey("users.id"))
+    date = Column(DateTime)
+    status = Column(String)  # completed, cancelled
+    google_meet_event_id = Column(String, nullable=True)
+    google_meet_link = Column(String, nullable=True)
+    notes = Column(String, nullable=True)
+    series_id = Column(Integer, ForeignKey("appointment_series.id"), nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Consulta histórica: por terapeuta/paciente ou por período, ordenada por (date, id)
+        Index("ix_appointments_archive_therapist_date", "therapist_id", "date"),
+        Index("ix_appointments_archive_patient_date", "patient_id", "date"),
+        Index("ix_appointments_archive_date", "date"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database.connection import Base
+
+class CalendarOutbox(Base):
+    __tablename__ = "calendar_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), index=True)
+    operation = Column(String)  # create, delete
+    status = Column(String, default="pending")  # pending, processing, done, failed, cancelled
+    title = Column(String, nullable=True)  # Para create
+    event_id = Column(String, nullable=True)  # Evento criado ou a deletar
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_calendar_outbox_status_next_attempt", "status", "next_attempt_at"),
+        # Jobs ativos de um agendamento (enqueue e consulta do link)
+        Index("ix_calendar_outbox_appointment_operation", "appointment_id", "operation", "status"),
+    )
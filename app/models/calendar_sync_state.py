@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.database.connection import Base
+
+class CalendarSyncState(Base):
+    __tablename__ = "calendar_sync_state"
+
+    calendar_id = Column(String, primary_key=True)  # Ex.: "primary"
+    sync_token = Column(String, nullable=True)  # nextSyncToken da última passada completa
+    full_sync_at = Column(DateTime, nullable=True)
+    synced_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
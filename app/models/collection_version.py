@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.database.connection import Base
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+
+    # Ex.: "appointments:therapist:12", "appointments:patient:7", "users:role:patient"
+    key = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database.connection import Base
+
+class ReminderDelivery(Base):
+    __tablename__ = "reminder_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
+    offset_minutes = Column(Integer, nullable=False)  # Antecedência do lembrete
+    due_at = Column(DateTime, nullable=False)  # Appointment.date - antecedência
+    status = Column(String, default="sending")  # sending, sent, failed
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)  # Hora local, como due_at
+
+    __table_args__ = (
+        # Reivindicação do envio: no máximo uma linha por lembrete (at-most-once)
+        Index("ix_reminder_deliveries_unique", "appointment_id", "offset_minutes", "due_at", unique=True),
+        # Carga das janelas e limpeza das linhas antigas
+        Index("ix_reminder_deliveries_due_at", "due_at"),
+    )
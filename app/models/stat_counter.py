@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.database.connection import Base
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    # Ex.: "users:role:therapist", "appointments:status:scheduled", "appointments:month:2025-01"
+    key = Column(String, primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
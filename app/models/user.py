@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index, text
 from datetime import datetime
 from app.database.connection import Base
 
@@ -13,3 +13,14 @@ class User(Base):
     specialization = Column(String, nullable=True)  # Para profissionais
     crm_or_crp = Column(String, nullable=True)  # Para profissionais
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Listagens por perfil paginadas por id
+        Index("ix_users_role_id", "role", "id"),
+        # Profissionais por especialidade (listagem do admin e busca de horários)
+        Index(
+            "ix_users_therapist_specialization", "specialization", "id",
+            sqlite_where=text("role = 'therapist'"),
+            postgresql_where=text("role = 'therapist'")
+        ),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Time, ForeignKey, Index
+from app.database.connection import Base
+
+class WorkingHours(Base):
+    __tablename__ = "working_hours"
+
+    id = Column(Integer, primary_key=True, index=True)
+    therapist_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    weekday = Column(Integer, nullable=False)  # 0 = segunda ... 6 = domingo
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+
+    __table_args__ = (
+        Index("ix_working_hours_therapist_weekday", "therapist_id", "weekday"),
+    )
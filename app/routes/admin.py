@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from app.database.connection import get_db
+from app.database.connection import get_db, get_read_db
 from app.models.user import User
-from app.utils.auth import hash_password, get_current_user
-import secrets
-import string
+from app.schemas.user import ProfessionalPage, ProfessionalSummary, PatientPage, UserSearchPage
+from app.utils.auth import get_current_user, invalidate_user, get_auth_cache_stats
+from app.utils.password_pool import hash_password_pooled
+from app.utils.statistics import read_statistics, reconcile_counters
+from app.utils.archive import archive_appointments, get_archive_stats
+from app.utils.collection_versions import collection_etag, etag_headers, etag_matches, not_modified, read_version, users_key
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.user_import import UserImporter, generate_temp_password, iter_csv, iter_ndjson
+from app.utils.user_search import search_users
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -25,7 +33,7 @@ class ProfessionalResponse(BaseModel):
     crm_or_crp: str
 
 # ====== FUNÇÃO PARA VERIFICAR ADMIN ======
-def check_admin(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def check_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -33,10 +41,35 @@ def check_admin(current_user: User = Depends(get_current_user), db: Session = De
         )
     return current_user
 
-# ====== FUNÇÃO GERAR SENHA TEMPORÁRIA ======
-def generate_temp_password(length=12):
-    characters = string.ascii_letters + string.digits + "!@#$%"
-    return ''.join(secrets.choice(characters) for _ in range(length))
+# ====== LISTAGENS PAGINADAS ======
+# Apenas colunas públicas: o hash da senha nunca é carregado
+PROFESSIONAL_COLUMNS = (User.id, User.email, User.name, User.specialization, User.crm_or_crp, User.created_at)
+PATIENT_COLUMNS = (User.id, User.email, User.name, User.created_at)
+
+def users_page_query(query, cursor: Optional[str], limit: int, name_prefix: Optional[str] = None):
+    """Paginar por id (índice (role, id)) com filtro opcional por prefixo do nome"""
+    if name_prefix:
+        escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(User.name.like(f"{escaped}%", escape="\\"))
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            query = query.filter(User.id > int(values[0]))
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    return query.order_by(User.id).limit(limit + 1)
+
+def users_page(rows: list, limit: int) -> dict:
+    """Página e próximo cursor a partir de até limit + 1 linhas"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": encode_cursor(rows[-1].id) if has_more else None
+    }
+
+def paginate_users(query, cursor: Optional[str], limit: int, name_prefix: Optional[str] = None) -> dict:
+    return users_page(users_page_query(query, cursor, limit, name_prefix).all(), limit)
 
 # ====== ENDPOINTS ======
 
@@ -53,13 +86,16 @@ def create_professional(
     if existing_user:
         raise HTTPException(status_code=400, detail="Email já registrado")
     
+    # Devolver a conexão de escrita enquanto o hash roda em outro processo
+    db.rollback()
+    
     # Gerar senha temporária
     temp_password = generate_temp_password()
     
     # Criar novo usuário
     new_user = User(
         email=prof_data.email,
-        password=hash_password(temp_password),
+        password=hash_password_pooled(temp_password),
         name=prof_data.name,
         role="therapist",
         specialization=prof_data.specialization,
@@ -79,26 +115,78 @@ def create_professional(
         "note": "O profissional deve trocar a senha no primeiro login"
     }
 
-@router.get("/profissionais")
-def list_professionals(
+@router.post("/usuarios/importar", response_model=dict)
+def import_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
     admin: User = Depends(check_admin),
     db: Session = Depends(get_db)
 ):
-    """Listar todos os profissionais"""
-    professionals = db.query(User).filter(User.role == "therapist").all()
-    return professionals
+    """
+    Importar pacientes e profissionais de um arquivo CSV ou NDJSON
+
+    Colunas: email, name, role (patient/therapist), password ou password_hash,
+    specialization e crm_or_crp. Sem senha é gerada uma temporária, devolvida
+    em `credentials`. Linhas inválidas não interrompem a importação e são
+    listadas em `errors`.
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in (file.content_type or ""):
+            format = "ndjson"
+        elif filename.endswith(".csv") or "csv" in (file.content_type or ""):
+            format = "csv"
+        else:
+            raise HTTPException(status_code=400, detail="Formato não reconhecido; informe format=csv ou format=ndjson")
+
+    rows = iter_csv(file.file) if format == "csv" else iter_ndjson(file.file)
+    return UserImporter(db).run(rows)
+
+@router.get("/usuarios/busca", response_model=UserSearchPage)
+def find_users(
+    q: str = Query(..., min_length=1, max_length=100, description="Nome ou email, sem diferenciar acentos"),
+    role: Optional[Literal["patient", "therapist", "admin"]] = None,
+    specialization: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin: User = Depends(check_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Buscar usuários por nome ou email (nomes que começam pela busca primeiro)"""
+    return ORJSONResponse(search_users(db, q, role, specialization, cursor, limit))
+
+@router.get("/profissionais", response_model=ProfessionalPage)
+def list_professionals(
+    request: Request,
+    specialization: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, description="Prefixo do nome"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(check_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Listar profissionais (paginado por cursor, com ETag)"""
+    etag = collection_etag(request, read_version(db, users_key("therapist")))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-@router.get("/profissionais/{professional_id}")
+    query = db.query(*PROFESSIONAL_COLUMNS).filter(User.role == "therapist")
+    if specialization:
+        query = query.filter(User.specialization == specialization)
+    # Página já no formato de ProfessionalPage: serializada direto pelo orjson
+    return ORJSONResponse(paginate_users(query, cursor, limit, q), headers=etag_headers(etag))
+
+@router.get("/profissionais/{professional_id}", response_model=ProfessionalSummary)
 def get_professional(
     professional_id: int,
     admin: User = Depends(check_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Obter detalhes de um profissional"""
-    user = db.query(User).filter(User.id == professional_id).first()
+    user = db.query(*PROFESSIONAL_COLUMNS).filter(User.id == professional_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Profissional não encontrado")
-    return user
+    return user._asdict()
 
 @router.delete("/profissionais/{professional_id}")
 def delete_professional(
@@ -116,17 +204,26 @@ def delete_professional(
     
     db.delete(user)
     db.commit()
+    invalidate_user(professional_id)
     
     return {"message": "Profissional deletado com sucesso"}
 
-@router.get("/pacientes")
+@router.get("/pacientes", response_model=PatientPage)
 def list_patients(
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, description="Prefixo do nome"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     admin: User = Depends(check_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Listar todos os pacientes"""
-    patients = db.query(User).filter(User.role == "patient").all()
-    return patients
+    """Listar pacientes (paginado por cursor, com ETag)"""
+    etag = collection_etag(request, read_version(db, users_key("patient")))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = db.query(*PATIENT_COLUMNS).filter(User.role == "patient")
+    return ORJSONResponse(paginate_users(query, cursor, limit, q), headers=etag_headers(etag))
 
 @router.delete("/pacientes/{patient_id}")
 def delete_patient(
@@ -144,23 +241,39 @@ def delete_patient(
     
     db.delete(user)
     db.commit()
+    invalidate_user(patient_id)
     
     return {"message": "Paciente deletado com sucesso"}
 
 @router.get("/estatisticas")
 def get_statistics(
     admin: User = Depends(check_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Obter estatísticas do sistema"""
-    total_users = db.query(User).count()
-    total_therapists = db.query(User).filter(User.role == "therapist").count()
-    total_patients = db.query(User).filter(User.role == "patient").count()
-    total_admins = db.query(User).filter(User.role == "admin").count()
-    
-    return {
-        "total_users": total_users,
-        "total_therapists": total_therapists,
-        "total_patients": total_patients,
-        "total_admins": total_admins
-    }
+    return read_statistics(db)
+
+@router.post("/estatisticas/reconciliar")
+def reconcile_statistics(
+    admin: User = Depends(check_admin),
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
+):
+    """Recalcular os contadores de estatísticas a partir das tabelas"""
+    drift = reconcile_counters(db, read_db)
+    return {"message": "Estatísticas reconciliadas", "drift": drift}
+
+@router.post("/arquivamento")
+def run_archival(admin: User = Depends(check_admin)):
+    """Arquivar agora os agendamentos concluídos/cancelados além do horizonte"""
+    return archive_appointments()
+
+@router.get("/arquivamento")
+def get_archival_stats(admin: User = Depends(check_admin)):
+    """Contadores do arquivamento (linhas movidas, lotes e duração dos lotes)"""
+    return get_archive_stats()
+
+@router.get("/cache-autenticacao")
+def get_auth_cache(admin: User = Depends(check_admin)):
+    """Obter contadores de acerto/falha do cache de autenticação"""
+    return get_auth_cache_stats()
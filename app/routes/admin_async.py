@@ -0,0 +1,198 @@
+"""
+Rotas do admin com AsyncSession (DATABASE_ASYNC=true)
+
+Cadastro, listagens, busca, exclusões e estatísticas; a importação em massa e o
+cache de autenticação continuam nas rotas síncronas de app/routes/admin.py.
+"""
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_async_db, get_async_read_db
+from app.models.user import User
+from app.routes.admin import (
+    PATIENT_COLUMNS, PROFESSIONAL_COLUMNS, ProfessionalCreate, users_page, users_page_query
+)
+from app.schemas.user import ProfessionalPage, ProfessionalSummary, PatientPage, UserSearchPage
+from app.utils.auth import get_current_user_async, invalidate_user
+from app.utils.collection_versions import collection_etag, etag_headers, etag_matches, not_modified, users_key, version_query
+from app.utils.password_pool import hash_password_async
+from app.utils.statistics import correct_counters, counter_drift, read_statistics
+from app.utils.user_import import generate_temp_password
+from app.utils.user_search import search_users
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+async def check_admin(current_user: User = Depends(get_current_user_async)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    return current_user
+
+async def _get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.scalar(select(User).where(User.id == user_id))
+
+# ====== ENDPOINTS ======
+
+@router.post("/profissionais", response_model=dict)
+async def create_professional(
+    prof_data: ProfessionalCreate,
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Criar um novo profissional (Psicólogo/Médico)"""
+    existing_user = await db.scalar(select(User.id).where(User.email == prof_data.email))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email já registrado")
+    
+    # Devolver a conexão de escrita enquanto o hash roda em outro processo
+    await db.rollback()
+    
+    temp_password = generate_temp_password()
+    new_user = User(
+        email=prof_data.email,
+        password=await hash_password_async(temp_password),
+        name=prof_data.name,
+        role="therapist",
+        specialization=prof_data.specialization,
+        crm_or_crp=prof_data.crm_or_crp
+    )
+    
+    db.add(new_user)
+    await db.commit()
+    
+    return {
+        "message": "Profissional criado com sucesso",
+        "id": new_user.id,
+        "email": prof_data.email,
+        "name": prof_data.name,
+        "temporary_password": temp_password,
+        "note": "O profissional deve trocar a senha no primeiro login"
+    }
+
+@router.get("/usuarios/busca", response_model=UserSearchPage)
+async def find_users(
+    q: str = Query(..., min_length=1, max_length=100, description="Nome ou email, sem diferenciar acentos"),
+    role: Optional[Literal["patient", "therapist", "admin"]] = None,
+    specialization: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Buscar usuários por nome ou email (nomes que começam pela busca primeiro)"""
+    page = await db.run_sync(lambda session: search_users(session, q, role, specialization, cursor, limit))
+    return ORJSONResponse(page)
+
+@router.get("/profissionais", response_model=ProfessionalPage)
+async def list_professionals(
+    request: Request,
+    specialization: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, description="Prefixo do nome"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Listar profissionais (paginado por cursor, com ETag)"""
+    etag = collection_etag(request, await db.scalar(version_query(users_key("therapist"))) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = select(*PROFESSIONAL_COLUMNS).where(User.role == "therapist")
+    if specialization:
+        query = query.where(User.specialization == specialization)
+    rows = (await db.execute(users_page_query(query, cursor, limit, q))).all()
+    return ORJSONResponse(users_page(rows, limit), headers=etag_headers(etag))
+
+@router.get("/profissionais/{professional_id}", response_model=ProfessionalSummary)
+async def get_professional(
+    professional_id: int,
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Obter detalhes de um profissional"""
+    user = (await db.execute(select(*PROFESSIONAL_COLUMNS).where(User.id == professional_id))).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Profissional não encontrado")
+    return user._asdict()
+
+@router.delete("/profissionais/{professional_id}")
+async def delete_professional(
+    professional_id: int,
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deletar um profissional"""
+    user = await _get_user(db, professional_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Profissional não encontrado")
+    
+    if user.role != "therapist":
+        raise HTTPException(status_code=400, detail="Usuário não é um profissional")
+    
+    await db.delete(user)
+    await db.commit()
+    invalidate_user(professional_id)
+    
+    return {"message": "Profissional deletado com sucesso"}
+
+@router.get("/pacientes", response_model=PatientPage)
+async def list_patients(
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, description="Prefixo do nome"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Listar pacientes (paginado por cursor, com ETag)"""
+    etag = collection_etag(request, await db.scalar(version_query(users_key("patient"))) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = select(*PATIENT_COLUMNS).where(User.role == "patient")
+    rows = (await db.execute(users_page_query(query, cursor, limit, q))).all()
+    return ORJSONResponse(users_page(rows, limit), headers=etag_headers(etag))
+
+@router.delete("/pacientes/{patient_id}")
+async def delete_patient(
+    patient_id: int,
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deletar um paciente"""
+    user = await _get_user(db, patient_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+    
+    if user.role != "patient":
+        raise HTTPException(status_code=400, detail="Usuário não é um paciente")
+    
+    await db.delete(user)
+    await db.commit()
+    invalidate_user(patient_id)
+    
+    return {"message": "Paciente deletado com sucesso"}
+
+@router.get("/estatisticas")
+async def get_statistics(
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Obter estatísticas do sistema"""
+    return await db.run_sync(read_statistics)
+
+@router.post("/estatisticas/reconciliar")
+async def reconcile_statistics(
+    admin: User = Depends(check_admin),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db)
+):
+    """Recalcular os contadores de estatísticas a partir das tabelas"""
+    drift = await read_db.run_sync(counter_drift)
+    await db.run_sync(correct_counters, drift)
+    return {"message": "Estatísticas reconciliadas", "drift": drift}
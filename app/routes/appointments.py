@@ -1,16 +1,422 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database.connection import get_db
+import csv
+import io
+import zlib
+import orjson
+from datetime import date as date_type, datetime, time, timedelta
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import Session, aliased, joinedload
+from app.database.connection import get_db, get_read_db, ReadSessionLocal
 from app.models.appointment import Appointment
+from app.models.archived_appointment import ArchivedAppointment
+from app.models.user import User
+from app.models.appointment_series import AppointmentSeries
+from app.schemas.appointment import AppointmentResponse, AppointmentPage, ArchivedAppointmentPage, AgendaItem, AgendaResponse
+from app.utils.appointment_series import expand_series, counter_deltas
+from app.utils.auth import get_current_user
+from app.utils.availability import find_conflict, find_conflicts_many, availability_index
+from app.utils.calendar_outbox import enqueue_calendar_job, outbox_worker
+from app.utils.google_meet import local_now
+from app.utils.statistics import adjust_counters
+from app.utils.collection_versions import (
+    appointment_feed_query, appointment_version_keys, bump_versions, collection_etag, etag_headers, etag_matches,
+    not_modified
+)
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.reminders import reminder_scheduler
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
 
-@router.get("/")
-def list_appointments(db: Session = Depends(get_db)):
-    return db.query(Appointment).all()
+# ====== SCHEMAS ======
+class SeriesCreate(BaseModel):
+    therapist_id: int
+    patient_id: int
+    start: datetime
+    frequency: Literal["weekly", "biweekly"] = "weekly"
+    count: Optional[int] = Field(None, ge=1)
+    until: Optional[date_type] = None
+    skip_dates: List[date_type] = []
+    notes: Optional[str] = None
 
-@router.post("/")
-def create_appointment(therapist_id: int, patient_id: int, date: str, db: Session = Depends(get_db)):
+    @model_validator(mode="after")
+    def check_end(self):
+        if (self.count is None) == (self.until is None):
+            raise ValueError("Informe count ou until")
+        return self
+
+class SeriesUpdate(BaseModel):
+    from_date: Optional[datetime] = None  # Padrão: agora (hora local)
+    start_time: Optional[time] = None  # Novo horário das ocorrências
+    notes: Optional[str] = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "id", "date", "status", "therapist_id", "therapist_name", "patient_id", "patient_name",
+    "series_id", "google_meet_link", "notes", "created_at"
+)
+
+
+# Listagens consultam só as colunas: tuplas leves, sem hidratar objetos do
+# ORM, convertidas em dict e serializadas direto pelo orjson
+APPOINTMENT_COLUMNS = (
+    Appointment.id,
+    Appointment.therapist_id,
+    Appointment.patient_id,
+    Appointment.date,
+    Appointment.status,
+    Appointment.google_meet_event_id,
+    Appointment.google_meet_link,
+    Appointment.notes,
+    Appointment.series_id,
+    Appointment.created_at,
+    Appointment.updated_at,
+)
+
+# Mesmas colunas na consulta histórica, mais a data do arquivamento
+ARCHIVED_APPOINTMENT_COLUMNS = tuple(getattr(ArchivedAppointment, column.key) for column in APPOINTMENT_COLUMNS) + (
+    ArchivedAppointment.archived_at,
+)
+
+
+def filter_appointments(
+    query,
+    therapist_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    series_id: Optional[int] = None,
+    model=Appointment,
+):
+    """Aplicar filtros e a posição do cursor (date, id) à consulta (em appointments ou no arquivo)"""
+    if therapist_id is not None:
+        query = query.filter(model.therapist_id == therapist_id)
+    if patient_id is not None:
+        query = query.filter(model.patient_id == patient_id)
+    if status is not None:
+        query = query.filter(model.status == status)
+    if series_id is not None:
+        query = query.filter(model.series_id == series_id)
+    if date_from is not None:
+        query = query.filter(model.date >= date_from)
+    if date_to is not None:
+        query = query.filter(model.date < date_to)
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            last_date, last_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.filter(tuple_(model.date, model.id) > (last_date, last_id))
+    return query.order_by(model.date, model.id)
+
+
+def appointments_page(rows: list, limit: int) -> dict:
+    """Página e próximo cursor a partir de até limit + 1 linhas de APPOINTMENT_COLUMNS"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.date.isoformat(), last.id)
+
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": next_cursor
+    }
+
+
+def _stream_ndjson(filters: dict):
+    # Sessão própria: o gerador continua rodando depois que o handler retorna
+    db = ReadSessionLocal()
+    try:
+        query = filter_appointments(db.query(*APPOINTMENT_COLUMNS), **filters)
+        # Um chunk por lote: cada next() do gerador custa um salto de thread
+        lines = []
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            lines.append(orjson.dumps(row._asdict()))
+            if len(lines) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        db.close()
+
+
+def _export_rows(filters: dict):
+    # Colunas projetadas com os nomes do terapeuta e do paciente via JOIN
+    db = ReadSessionLocal()
+    try:
+        therapist = aliased(User)
+        patient = aliased(User)
+        query = db.query(
+            Appointment.id,
+            Appointment.date,
+            Appointment.status,
+            Appointment.therapist_id,
+            therapist.name.label("therapist_name"),
+            Appointment.patient_id,
+            patient.name.label("patient_name"),
+            Appointment.series_id,
+            Appointment.google_meet_link,
+            Appointment.notes,
+            Appointment.created_at
+        ).outerjoin(
+            therapist, therapist.id == Appointment.therapist_id
+        ).outerjoin(
+            patient, patient.id == Appointment.patient_id
+        )
+        query = filter_appointments(query, **filters)
+        # Cursor no servidor: lê STREAM_BATCH_SIZE linhas por vez
+        for row in query.execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE):
+            yield row
+    finally:
+        db.close()
+
+def _export_chunks(filters: dict, format: str):
+    """Texto do export em blocos de STREAM_BATCH_SIZE linhas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+    written = 0
+    for row in _export_rows(filters):
+        values = row._asdict()
+        for key in ("date", "created_at"):
+            if values[key] is not None:
+                values[key] = values[key].isoformat()
+        if writer:
+            writer.writerow([values[column] for column in EXPORT_COLUMNS])
+        else:
+            buffer.write(orjson.dumps(values).decode())
+            buffer.write("\n")
+        written += 1
+        if written % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    # wbits=31: formato gzip, comprimido conforme os blocos são gerados
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export")
+def export_appointments(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    therapist_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exportar agendamentos com nomes de terapeuta e paciente (CSV ou NDJSON)
+
+    A resposta é transmitida em blocos a partir de um cursor no servidor, com
+    memória constante independentemente do número de linhas. Terapeutas só
+    exportam a própria agenda.
+    """
+    if current_user.role == "therapist":
+        if therapist_id not in (None, current_user.id):
+            raise HTTPException(status_code=403, detail="Sem permissão para exportar a agenda de outro profissional")
+        therapist_id = current_user.id
+    elif current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores e profissionais")
+
+    filters = {"therapist_id": therapist_id, "date_from": date_from, "date_to": date_to}
+    chunks = _export_chunks(filters, format)
+    media_type = "text/csv; charset=utf-8" if format == "csv" else NDJSON_MEDIA_TYPE
+    filename = f"agendamentos.{format}"
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ====== AGENDA ======
+AGENDA_VIEW_DAYS = {"day": 1, "week": 7}
+
+def agenda_window(view: str, day: date_type) -> tuple:
+    """Início e fim da agenda: o dia ou a semana (segunda a domingo) de `day`"""
+    start = datetime.combine(day, time())
+    if view == "week":
+        start -= timedelta(days=day.weekday())
+    return start, start + timedelta(days=AGENDA_VIEW_DAYS[view])
+
+def agenda_query(user: User, start: datetime, end: datetime, include_cancelled: bool = False):
+    """
+    Agendamentos do usuário no intervalo, com o outro participante no mesmo SELECT
+
+    Retorna a consulta e o nome do relacionamento carregado (patient na agenda
+    do terapeuta, therapist na do paciente).
+    """
+    if user.role == "therapist":
+        own, counterpart = Appointment.therapist_id, Appointment.patient
+    elif user.role == "patient":
+        own, counterpart = Appointment.patient_id, Appointment.therapist
+    else:
+        raise HTTPException(status_code=403, detail="Agenda disponível apenas para profissionais e pacientes")
+
+    query = select(Appointment).options(joinedload(counterpart)).where(
+        own == user.id,
+        Appointment.date >= start,
+        Appointment.date < end
+    )
+    if not include_cancelled:
+        query = query.where(Appointment.status != "cancelled")
+    return query.order_by(Appointment.date, Appointment.id), counterpart.key
+
+def agenda_response(view: str, start: datetime, end: datetime, appointments: list, counterpart: str) -> AgendaResponse:
+    return AgendaResponse(
+        view=view,
+        date_from=start,
+        date_to=end,
+        items=[
+            AgendaItem(
+                id=a.id,
+                date=a.date,
+                status=a.status,
+                meet_link=a.google_meet_link,
+                notes=a.notes,
+                series_id=a.series_id,
+                counterpart=getattr(a, counterpart)
+            )
+            for a in appointments
+        ]
+    )
+
+@router.get("/agenda", response_model=AgendaResponse)
+def get_agenda(
+    view: Literal["day", "week"] = "day",
+    day: Optional[date_type] = None,
+    include_cancelled: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Agenda do dia ou da semana do terapeuta/paciente autenticado
+
+    Cada item traz o nome do outro participante e o link do Meet; uma única
+    consulta, independentemente do número de agendamentos. Sem `day`, vale o
+    dia de hoje na hora local dos agendamentos.
+    """
+    start, end = agenda_window(view, day or local_now().date())
+    query, counterpart = agenda_query(current_user, start, end, include_cancelled)
+    return agenda_response(view, start, end, db.scalars(query).all(), counterpart)
+
+@router.get("/", response_model=AppointmentPage)
+def list_appointments(
+    request: Request,
+    therapist_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    series_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Listar agendamentos ordenados por (date, id) com paginação por cursor
+
+    Com `Accept: application/x-ndjson` todas as linhas após o cursor são
+    transmitidas uma por linha, sem carregar a tabela inteira em memória.
+    A resposta é montada a partir das colunas e devolvida já serializada,
+    sem passar pela validação do response_model (que só documenta o formato).
+    O ETag vem da versão da agenda do terapeuta ou paciente filtrado (ou da soma das agendas): um
+    If-None-Match igual recebe 304 sem consultar os agendamentos.
+    """
+    filters = {
+        "therapist_id": therapist_id,
+        "patient_id": patient_id,
+        "status": status,
+        "date_from": date_from,
+        "date_to": date_to,
+        "cursor": cursor,
+        "series_id": series_id,
+    }
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # Validar o cursor antes de iniciar a resposta
+        if cursor:
+            filter_appointments(db.query(Appointment), cursor=cursor)
+        return StreamingResponse(_stream_ndjson(filters), media_type=NDJSON_MEDIA_TYPE)
+
+    # Versão lida antes das linhas: uma escrita concorrente custa no máximo um download a mais
+    etag = collection_etag(request, db.scalar(appointment_feed_query(therapist_id, patient_id)) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    rows = filter_appointments(db.query(*APPOINTMENT_COLUMNS), **filters).limit(limit + 1).all()
+    return ORJSONResponse(appointments_page(rows, limit), headers=etag_headers(etag))
+
+# ====== CONSULTA HISTÓRICA ======
+def archive_scope(current_user: User, therapist_id: Optional[int]) -> Optional[int]:
+    """Terapeutas só consultam o próprio histórico; pacientes não têm acesso"""
+    if current_user.role == "therapist":
+        if therapist_id not in (None, current_user.id):
+            raise HTTPException(status_code=403, detail="Sem permissão para consultar o histórico de outro profissional")
+        return current_user.id
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores e profissionais")
+    return therapist_id
+
+@router.get("/arquivo", response_model=ArchivedAppointmentPage)
+def list_archived_appointments(
+    request: Request,
+    therapist_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Agendamentos arquivados (concluídos/cancelados antigos), por (date, id)
+
+    Lê só appointments_archive; a listagem principal cobre a tabela quente.
+    """
+    therapist_id = archive_scope(current_user, therapist_id)
+    # O arquivamento incrementa a versão da agenda: o mesmo ETag vale aqui
+    etag = collection_etag(request, db.scalar(appointment_feed_query(therapist_id, patient_id)) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = filter_appointments(
+        db.query(*ARCHIVED_APPOINTMENT_COLUMNS), therapist_id, patient_id, status, date_from, date_to, cursor,
+        model=ArchivedAppointment
+    )
+    rows = query.limit(limit + 1).all()
+    return ORJSONResponse(appointments_page(rows, limit), headers=etag_headers(etag))
+
+@router.post("/", response_model=AppointmentResponse)
+def create_appointment(therapist_id: int, patient_id: int, date: datetime, db: Session = Depends(get_db)):
+    # Rejeitar sobreposição com outro atendimento ativo do terapeuta
+    if find_conflict(db, therapist_id, date):
+        raise HTTPException(status_code=409, detail="Horário indisponível para o terapeuta")
     appointment = Appointment(
         therapist_id=therapist_id,
         patient_id=patient_id,
@@ -20,3 +426,182 @@ def create_appointment(therapist_id: int, patient_id: int, date: str, db: Sessio
     db.commit()
     db.refresh(appointment)
     return appointment
+
+# ====== SÉRIES RECORRENTES ======
+def _conflict_error(conflicts: list):
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Horário indisponível para o terapeuta",
+            "conflicts": [c.isoformat() for c in conflicts]
+        }
+    )
+
+def _get_series(db: Session, series_id: int) -> AppointmentSeries:
+    series = db.query(AppointmentSeries).filter(AppointmentSeries.id == series_id).first()
+    if not series:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return series
+
+def _check_series_owner(current_user: User, therapist_id: int):
+    """Terapeutas só gerenciam as próprias séries; pacientes não têm acesso"""
+    if current_user.role == "therapist":
+        if therapist_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Sem permissão para gerenciar séries de outro profissional")
+    elif current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores e profissionais")
+
+def _series_scope(series_id: int, from_date: Optional[datetime]) -> tuple:
+    # Ocorrências futuras ainda agendadas (Appointment.date é hora local)
+    return (
+        Appointment.series_id == series_id,
+        Appointment.date >= (from_date or local_now()),
+        Appointment.status == "scheduled"
+    )
+
+@router.post("/series", status_code=201)
+def create_series(
+    request: SeriesCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Criar uma série semanal ou quinzenal de atendimentos
+
+    Todas as ocorrências são verificadas com uma única consulta de intervalo e
+    gravadas com um único INSERT na mesma transação.
+    """
+    _check_series_owner(current_user, request.therapist_id)
+    try:
+        occurrences = expand_series(request.start, request.frequency, request.count, request.until, request.skip_dates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not occurrences:
+        raise HTTPException(status_code=400, detail="A regra não gera nenhuma ocorrência")
+
+    conflicts = find_conflicts_many(db, request.therapist_id, occurrences)
+    if conflicts:
+        raise _conflict_error(conflicts)
+
+    series = AppointmentSeries(
+        therapist_id=request.therapist_id,
+        patient_id=request.patient_id,
+        frequency=request.frequency,
+        start=request.start,
+        count=request.count,
+        until=request.until
+    )
+    db.add(series)
+    db.flush()
+
+    # created_at e updated_at vêm dos defaults das colunas, como nas escritas da ORM
+    rows = db.execute(
+        insert(Appointment).values([
+            {
+                "therapist_id": request.therapist_id,
+                "patient_id": request.patient_id,
+                "date": occurrence,
+                "status": "scheduled",
+                "notes": request.notes,
+                "series_id": series.id,
+            }
+            for occurrence in occurrences
+        ]).returning(Appointment.id, Appointment.date)
+    ).all()
+    # INSERT do Core não dispara os eventos do mapper
+    adjust_counters(db.connection(), counter_deltas("scheduled", occurrences))
+    bump_versions(db.connection(), appointment_version_keys([request.therapist_id], [request.patient_id]))
+    db.commit()
+    availability_index.invalidate(request.therapist_id)
+    reminder_scheduler.appointments_changed([(row.id, row.date, "scheduled") for row in rows])
+
+    return {
+        "series_id": series.id,
+        "count": len(rows),
+        "appointments": [{"id": row.id, "date": row.date.isoformat()} for row in sorted(rows, key=lambda r: r.date)]
+    }
+
+@router.patch("/series/{series_id}")
+def update_series(
+    series_id: int,
+    request: SeriesUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Alterar horário e/ou observações das ocorrências futuras da série"""
+    if request.start_time is None and request.notes is None:
+        raise HTTPException(status_code=400, detail="Nada para atualizar")
+    series = _get_series(db, series_id)
+    _check_series_owner(current_user, series.therapist_id)
+    scope = _series_scope(series_id, request.from_date)
+    updated = 0
+
+    if request.start_time is not None:
+        rows = db.query(Appointment.id, Appointment.date).filter(*scope).all()
+        moved = {appointment_id: datetime.combine(d.date(), request.start_time) for appointment_id, d in rows}
+        conflicts = find_conflicts_many(db, series.therapist_id, list(moved.values()), exclude_series_id=series_id)
+        if conflicts:
+            raise _conflict_error(conflicts)
+        if moved:
+            # UPDATE em massa por chave primária (um único executemany); o
+            # onupdate da coluna preenche updated_at. date_changed_at protege a
+            # nova data da sincronização com o Calendar
+            now = datetime.utcnow()
+            db.execute(update(Appointment), [
+                {"id": appointment_id, "date": new_date, "date_changed_at": now}
+                for appointment_id, new_date in moved.items()
+            ])
+        updated = len(moved)
+        scope = (Appointment.id.in_(list(moved)),) if moved else scope
+
+    if request.notes is not None:
+        result = db.execute(
+            update(Appointment).where(*scope).values(notes=request.notes),
+            execution_options={"synchronize_session": False}
+        )
+        updated = max(updated, result.rowcount)
+
+    if updated:
+        bump_versions(db.connection(), appointment_version_keys([series.therapist_id], [series.patient_id]))
+    db.commit()
+    availability_index.invalidate(series.therapist_id)
+    if request.start_time is not None:
+        reminder_scheduler.appointments_changed([(appointment_id, date, "scheduled") for appointment_id, date in moved.items()])
+    return {"series_id": series_id, "updated": updated}
+
+@router.delete("/series/{series_id}")
+def cancel_series(
+    series_id: int,
+    from_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancelar as ocorrências futuras da série com um único UPDATE"""
+    series = _get_series(db, series_id)
+    _check_series_owner(current_user, series.therapist_id)
+    scope = _series_scope(series_id, from_date)
+    rows = db.query(Appointment.id, Appointment.date, Appointment.google_meet_event_id).filter(*scope).all()
+
+    if rows:
+        db.execute(
+            update(Appointment).where(Appointment.id.in_([row.id for row in rows])).values(
+                status="cancelled", google_meet_link=None
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        dates = [row.date for row in rows]
+        deltas = counter_deltas("cancelled", dates)
+        deltas.update(counter_deltas("scheduled", dates, -1))
+        adjust_counters(db.connection(), deltas)
+        bump_versions(db.connection(), appointment_version_keys([series.therapist_id], [series.patient_id]))
+        # Eventos já criados no Google saem pela outbox
+        for row in rows:
+            if row.google_meet_event_id:
+                enqueue_calendar_job(db, row.id, "delete", event_id=row.google_meet_event_id)
+
+    db.commit()
+    if any(row.google_meet_event_id for row in rows):
+        outbox_worker.notify()
+    availability_index.invalidate(series.therapist_id)
+    reminder_scheduler.appointments_changed([(row.id, row.date, "cancelled") for row in rows])
+    return {"series_id": series_id, "cancelled": len(rows)}
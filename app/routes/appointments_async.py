@@ -0,0 +1,134 @@
+"""
+Rotas de agendamentos com AsyncSession (DATABASE_ASYNC=true)
+
+Listagem (JSON e NDJSON), consulta histórica, agenda e criação; exportação e séries continuam nas rotas
+síncronas de app/routes/appointments.py.
+"""
+import orjson
+from datetime import date as date_type, datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_async_db, get_async_read_db, AsyncReadSessionLocal
+from app.models.appointment import Appointment
+from app.models.archived_appointment import ArchivedAppointment
+from app.models.user import User
+from app.routes.appointments import (
+    APPOINTMENT_COLUMNS, ARCHIVED_APPOINTMENT_COLUMNS, NDJSON_MEDIA_TYPE, STREAM_BATCH_SIZE, agenda_query,
+    agenda_response, agenda_window, appointments_page, archive_scope, filter_appointments
+)
+from app.schemas.appointment import AppointmentResponse, AppointmentPage, ArchivedAppointmentPage, AgendaResponse
+from app.utils.auth import get_current_user_async
+from app.utils.collection_versions import (
+    appointment_feed_query, collection_etag, etag_headers, etag_matches, not_modified
+)
+from app.utils.availability import find_conflict
+from app.utils.google_meet import local_now
+
+router = APIRouter(prefix="/api/appointments", tags=["appointments"])
+
+
+async def _stream_ndjson(filters: dict):
+    # Sessão própria: o gerador continua rodando depois que o handler retorna
+    async with AsyncReadSessionLocal() as db:
+        query = filter_appointments(select(*APPOINTMENT_COLUMNS), **filters)
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield b"\n".join(orjson.dumps(row._asdict()) for row in rows) + b"\n"
+
+
+@router.get("/", response_model=AppointmentPage)
+async def list_appointments(
+    request: Request,
+    therapist_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    series_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Listar agendamentos ordenados por (date, id) com paginação por cursor"""
+    filters = {
+        "therapist_id": therapist_id,
+        "patient_id": patient_id,
+        "status": status,
+        "date_from": date_from,
+        "date_to": date_to,
+        "cursor": cursor,
+        "series_id": series_id,
+    }
+    # Valida o cursor antes de qualquer resposta
+    query = filter_appointments(select(*APPOINTMENT_COLUMNS), **filters)
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_ndjson(filters), media_type=NDJSON_MEDIA_TYPE)
+
+    etag = collection_etag(request, await db.scalar(appointment_feed_query(therapist_id, patient_id)) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    return ORJSONResponse(appointments_page(rows, limit), headers=etag_headers(etag))
+
+
+@router.get("/agenda", response_model=AgendaResponse)
+async def get_agenda(
+    view: Literal["day", "week"] = "day",
+    day: Optional[date_type] = None,
+    include_cancelled: bool = False,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Agenda do dia ou da semana do terapeuta/paciente autenticado"""
+    start, end = agenda_window(view, day or local_now().date())
+    query, counterpart = agenda_query(current_user, start, end, include_cancelled)
+    appointments = (await db.scalars(query)).all()
+    return agenda_response(view, start, end, appointments, counterpart)
+
+
+@router.get("/arquivo", response_model=ArchivedAppointmentPage)
+async def list_archived_appointments(
+    request: Request,
+    therapist_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Agendamentos arquivados (concluídos/cancelados antigos), por (date, id)"""
+    therapist_id = archive_scope(current_user, therapist_id)
+    etag = collection_etag(request, await db.scalar(appointment_feed_query(therapist_id, patient_id)) or 0)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = filter_appointments(
+        select(*ARCHIVED_APPOINTMENT_COLUMNS), therapist_id, patient_id, status, date_from, date_to, cursor,
+        model=ArchivedAppointment
+    )
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    return ORJSONResponse(appointments_page(rows, limit), headers=etag_headers(etag))
+
+
+@router.post("/", response_model=AppointmentResponse)
+async def create_appointment(therapist_id: int, patient_id: int, date: datetime, db: AsyncSession = Depends(get_async_db)):
+    # Rejeitar sobreposição com outro atendimento ativo do terapeuta
+    if await db.run_sync(find_conflict, therapist_id, date):
+        raise HTTPException(status_code=409, detail="Horário indisponível para o terapeuta")
+    appointment = Appointment(
+        therapist_id=therapist_id,
+        patient_id=patient_id,
+        date=date
+    )
+    db.add(appointment)
+    await db.commit()
+    await db.refresh(appointment)
+    return appointment
@@ -1,10 +1,13 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from app.database.connection import get_db
+from app.database.connection import get_db, get_read_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
-from app.utils.auth import hash_password, verify_password, create_access_token
+from app.utils.auth import create_access_token
+from app.utils.password_pool import hash_password_async, verify_password_async
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -12,30 +15,41 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+def _find_user(db: Session, email: str) -> Optional[User]:
+    user = db.query(User).filter(User.email == email).first()
+    # Devolver a conexão ao pool enquanto a senha é processada em outro
+    # processo; close() mantém os atributos já carregados do usuário
+    db.close()
+    return user
+
+def _save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+# Handlers assíncronos: o bcrypt é aguardado no pool de processos sem ocupar
+# thread; só a sessão (I/O bloqueante, e no SQLite o register espera a trava
+# de escrita) passa pelo threadpool
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_find_user, db, user_data.email):
         raise HTTPException(status_code=400, detail="Email já registrado")
     
     new_user = User(
         email=user_data.email,
-        password=hash_password(user_data.password),
+        password=await hash_password_async(user_data.password),
         name=user_data.name,
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+    return await run_in_threadpool(_save_user, db, new_user)
 
 @router.post("/login")
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
+async def login(credentials: LoginRequest, db: Session = Depends(get_read_db)):
+    user = await run_in_threadpool(_find_user, db, credentials.email)
     
-    if not user or not verify_password(credentials.password, user.password):
+    if not user or not await verify_password_async(credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     
     access_token = create_access_token({"sub": str(user.id), "role": user.role})
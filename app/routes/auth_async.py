@@ -0,0 +1,60 @@
+"""
+Rotas de autenticação com AsyncSession (DATABASE_ASYNC=true)
+
+Mesmos caminhos e respostas de app/routes/auth.py; registradas antes das
+rotas síncronas, que continuam atendendo o que não tem versão assíncrona.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_async_db, get_async_read_db
+from app.models.user import User
+from app.routes.auth import LoginRequest
+from app.schemas.user import UserCreate, UserResponse
+from app.utils.auth import create_access_token
+from app.utils.password_pool import hash_password_async, verify_password_async
+
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+@router.post("/register", response_model=UserResponse)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email já registrado")
+    
+    # Devolver a conexão ao pool enquanto o hash roda em outro processo
+    await db.rollback()
+    
+    new_user = User(
+        email=user_data.email,
+        password=await hash_password_async(user_data.password),
+        name=user_data.name,
+        role=user_data.role
+    )
+    
+    db.add(new_user)
+    await db.commit()
+    
+    return new_user
+
+@router.post("/login")
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_async_read_db)):
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+    # Devolver a conexão ao pool enquanto a verificação roda em outro processo
+    await db.close()
+    
+    if not user or not await verify_password_async(credentials.password, user.password):
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    
+    access_token = create_access_token({"sub": str(user.id), "role": user.role})
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "role": user.role
+        }
+    }
@@ -0,0 +1,127 @@
+from datetime import datetime, time, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field, model_validator
+from app.database.connection import get_db, get_read_db
+from app.models.user import User
+from app.models.working_hours import WorkingHours
+from app.utils.auth import get_current_user
+from app.utils.availability import availability_index, APPOINTMENT_DURATION
+from app.utils.google_meet import local_now
+
+router = APIRouter(prefix="/api/availability", tags=["availability"])
+
+# Intervalo máximo de uma busca de horários livres
+MAX_SEARCH_DAYS = 366
+
+# ====== SCHEMAS ======
+class WorkingHoursWindow(BaseModel):
+    weekday: int = Field(..., ge=0, le=6)  # 0 = segunda ... 6 = domingo
+    start_time: time
+    end_time: time
+
+    @model_validator(mode="after")
+    def check_window(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time deve ser posterior a start_time")
+        return self
+
+class WorkingHoursTemplate(BaseModel):
+    windows: List[WorkingHoursWindow] = Field(..., max_length=100)
+
+class FreeSlot(BaseModel):
+    therapist_id: int
+    start: datetime
+    end: datetime
+
+# ====== HORÁRIOS DE ATENDIMENTO ======
+def _get_therapist(db: Session, therapist_id: int) -> User:
+    therapist = db.query(User).filter(User.id == therapist_id, User.role == "therapist").first()
+    if not therapist:
+        raise HTTPException(status_code=404, detail="Profissional não encontrado")
+    return therapist
+
+@router.get("/therapists/{therapist_id}/working-hours", response_model=WorkingHoursTemplate)
+def get_working_hours(therapist_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """Modelo semanal de horários de atendimento do terapeuta"""
+    _get_therapist(db, therapist_id)
+    rows = db.query(WorkingHours).filter(
+        WorkingHours.therapist_id == therapist_id
+    ).order_by(WorkingHours.weekday, WorkingHours.start_time).all()
+    return {"windows": [
+        {"weekday": w.weekday, "start_time": w.start_time, "end_time": w.end_time} for w in rows
+    ]}
+
+@router.put("/therapists/{therapist_id}/working-hours", response_model=WorkingHoursTemplate)
+def set_working_hours(
+    therapist_id: int,
+    template: WorkingHoursTemplate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Substituir o modelo semanal (apenas o próprio terapeuta ou admin)"""
+    if current_user.role != "admin" and current_user.id != therapist_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para alterar os horários deste profissional"
+        )
+    _get_therapist(db, therapist_id)
+
+    windows = sorted(template.windows, key=lambda w: (w.weekday, w.start_time))
+    for previous, current in zip(windows, windows[1:]):
+        if previous.weekday == current.weekday and current.start_time < previous.end_time:
+            raise HTTPException(status_code=400, detail="Janelas de horário sobrepostas")
+
+    db.query(WorkingHours).filter(WorkingHours.therapist_id == therapist_id).delete()
+    db.add_all([
+        WorkingHours(therapist_id=therapist_id, weekday=w.weekday, start_time=w.start_time, end_time=w.end_time)
+        for w in windows
+    ])
+    db.commit()
+    availability_index.invalidate(therapist_id)
+    return {"windows": windows}
+
+# ====== BUSCA DE HORÁRIOS LIVRES ======
+@router.get("/slots", response_model=List[FreeSlot])
+def search_free_slots(
+    therapist_id: Optional[int] = None,
+    specialization: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Próximos horários livres de um terapeuta ou de uma especialidade
+
+    Os horários seguem a grade das janelas de atendimento, com a duração de
+    um atendimento, e desconsideram agendamentos cancelados.
+    """
+    if (therapist_id is None) == (specialization is None):
+        raise HTTPException(status_code=400, detail="Informe therapist_id ou specialization")
+
+    start = start or local_now()
+    end = end or start + timedelta(days=30)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end deve ser posterior a start")
+    if end - start > timedelta(days=MAX_SEARCH_DAYS):
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_SEARCH_DAYS} dias")
+
+    if therapist_id is not None:
+        _get_therapist(db, therapist_id)
+        therapist_ids = [therapist_id]
+    else:
+        therapist_ids = [tid for (tid,) in db.query(User.id).filter(
+            User.role == "therapist",
+            User.specialization == specialization
+        )]
+    # Libera a conexão antes da busca em memória
+    db.close()
+
+    slots = availability_index.next_free_slots(therapist_ids, start, end, limit)
+    return [
+        {"therapist_id": tid, "start": slot, "end": slot + APPOINTMENT_DURATION}
+        for slot, tid in slots
+    ]
@@ -1,12 +1,26 @@
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from app.database.connection import get_db
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.orm import Session, aliased
+from pydantic import BaseModel, Field
+from app.database.connection import get_db, get_read_db
 from app.models.appointment import Appointment
+from app.models.calendar_outbox import CalendarOutbox
 from app.models.user import User
 from app.utils.auth import get_current_user
-from app.utils.google_meet import create_google_meet_event, get_google_meet_link, delete_google_meet_event
-from datetime import datetime
+from app.utils.google_meet import (
+    build_meet_event_body, calendar_event_id, calendar_request_id, create_google_meet_events_batch_async,
+    get_calendar_call_stats
+)
+from app.utils.calendar_outbox import (
+    ACTIVE_STATUSES, backoff_delay, deletes_waiting_on, enqueue_calendar_job, get_pending_create, get_outbox_stats,
+    outbox_worker
+)
+from app.utils.collection_versions import appointment_version_keys, bump_versions
+from app.utils.calendar_sync import sync_calendar
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/google-meet", tags=["google-meet"])
 
@@ -14,19 +28,23 @@ class CreateMeetRequest(BaseModel):
     appointment_id: int
     title: str = "Teleatendimento Sinergia Pro"
 
+class BatchCreateMeetRequest(BaseModel):
+    appointment_ids: List[int] = Field(..., min_length=1, max_length=500)
+    title: str = "Teleatendimento Sinergia Pro"
+
 class MeetResponse(BaseModel):
     event_id: str
     title: str
     meet_link: str
     hangout_link: str
 
-@router.post("/create", response_model=dict)
+@router.post("/create", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 def create_meet(
     request: CreateMeetRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Criar Google Meet para um atendimento"""
+    """Agendar a criação do Google Meet para um atendimento"""
     
     # Buscar agendamento
     appointment = db.query(Appointment).filter(
@@ -43,47 +61,186 @@ def create_meet(
             detail="Sem permissão para criar meet neste atendimento"
         )
     
-    # Buscar dados do terapeuta e paciente
-    therapist = db.query(User).filter(User.id == appointment.therapist_id).first()
-    patient = db.query(User).filter(User.id == appointment.patient_id).first()
-    
-    if not therapist or not patient:
-        raise HTTPException(status_code=404, detail="Terapeuta ou paciente não encontrado")
+    # A chamada ao Google fica com o worker da outbox
+    job = enqueue_calendar_job(db, appointment.id, "create", title=request.title)
+    db.commit()
+    outbox_worker.notify()
     
-    try:
-        # Criar evento no Google Calendar com Meet
-        meet_event = create_google_meet_event(
-            therapist_email=therapist.email,
-            patient_email=patient.email,
-            appointment_datetime=appointment.date.isoformat(),
-            title=request.title
+    return {
+        "message": "Criação do Google Meet agendada",
+        "appointment_id": appointment.id,
+        "job_id": job.id,
+        "status": job.status
+    }
+
+def _load_batch_rows(db: Session, appointment_ids: list) -> list:
+    # Agendamentos, terapeutas e pacientes em uma única consulta
+    therapist = aliased(User)
+    patient = aliased(User)
+    rows = db.query(
+        Appointment.id,
+        Appointment.therapist_id,
+        Appointment.patient_id,
+        Appointment.date,
+        Appointment.google_meet_event_id,
+        therapist.email,
+        patient.email
+    ).outerjoin(
+        therapist, therapist.id == Appointment.therapist_id
+    ).outerjoin(
+        patient, patient.id == Appointment.patient_id
+    ).filter(
+        Appointment.id.in_(appointment_ids)
+    ).all()
+    # Devolver a conexão ao pool antes da transação de escrita
+    db.rollback()
+    return rows
+
+def _claim_batch_jobs(db: Session, appointment_ids: list, title: str) -> tuple:
+    """
+    Registrar na outbox, já reivindicados, os creates do lote
+
+    Agendamentos com create ativo na outbox ficam com o job existente e não
+    entram no batch. Os novos jobs nascem em processing para o worker não
+    pegá-los; se o processo cair, recover_stale os devolve à fila e a nova
+    tentativa reaproveita o mesmo id de evento.
+
+    Returns:
+        (agendamento -> id do job reivindicado, agendamento -> job já ativo)
+    """
+    active = {
+        job.appointment_id: job.id
+        for job in db.query(CalendarOutbox).filter(
+            CalendarOutbox.appointment_id.in_(appointment_ids),
+            CalendarOutbox.operation == "create",
+            CalendarOutbox.status.in_(ACTIVE_STATUSES)
         )
-        
-        # Atualizar agendamento com o ID do evento
-        appointment.google_meet_event_id = meet_event['event_id']
-        appointment.google_meet_link = meet_event.get('hangout_link') or meet_event.get('meet_link')
-        db.commit()
-        
-        return {
-            "message": "Google Meet criado com sucesso",
-            "event_id": meet_event['event_id'],
-            "title": meet_event['title'],
-            "meet_link": meet_event.get('hangout_link') or meet_event.get('meet_link'),
-            "start": meet_event['start'],
-            "end": meet_event['end']
+    }
+    jobs = {
+        appointment_id: CalendarOutbox(appointment_id=appointment_id, operation="create", title=title, status="processing")
+        for appointment_id in appointment_ids if appointment_id not in active
+    }
+    db.add_all(jobs.values())
+    db.commit()
+    return {appointment_id: job.id for appointment_id, job in jobs.items()}, active
+
+def _save_batch_results(db: Session, claimed: dict, outcomes: dict, owners: dict) -> bool:
+    """Concluir os jobs do lote em uma única transação; retorna se sobrou trabalho para o worker"""
+    now = datetime.utcnow()
+    created = {appointment_id: outcome for appointment_id, outcome in outcomes.items() if not isinstance(outcome, Exception)}
+    job_updates = []
+    for appointment_id, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            # Nova tentativa pelo worker, com o mesmo id de evento
+            job_updates.append({
+                "id": claimed[appointment_id], "status": "pending", "attempts": 1, "last_error": str(outcome)[:1000],
+                "next_attempt_at": now + timedelta(seconds=backoff_delay(1)), "updated_at": now
+            })
+        else:
+            job_updates.append({
+                "id": claimed[appointment_id], "status": "done", "event_id": outcome['event_id'],
+                "processed_at": now, "updated_at": now
+            })
+    # Um delete pedido enquanto o batch rodava recebe o evento criado
+    waiting = deletes_waiting_on(db, {appointment_id: claimed[appointment_id] for appointment_id in created})
+    for appointment_id, delete_job in waiting.items():
+        delete_job.event_id = created[appointment_id]['event_id']
+    db.execute(update(CalendarOutbox), job_updates)
+
+    updates = [
+        {
+            "id": appointment_id,
+            "google_meet_event_id": outcome['event_id'],
+            "google_meet_link": outcome.get('hangout_link') or outcome.get('meet_link')
         }
+        for appointment_id, outcome in created.items() if appointment_id not in waiting
+    ]
+    if updates:
+        db.execute(update(Appointment), updates)
+        # UPDATE em massa por chave primária não dispara os eventos do mapper
+        therapist_ids, patient_ids = zip(*(owners[u["id"]] for u in updates))
+        bump_versions(db.connection(), appointment_version_keys(set(therapist_ids), set(patient_ids)))
+    db.commit()
+    return len(created) < len(outcomes) or bool(waiting)
+
+@router.post("/create-batch", response_model=dict)
+async def create_meets_batch(
+    request: BatchCreateMeetRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Criar Google Meet para vários atendimentos em uma única chamada
+
+    Os creates passam pela outbox (ids de evento determinísticos, sem
+    disputar com o worker); os que falham ficam com o worker.
+    """
     
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erro ao criar Google Meet: {str(e)}"
+    appointment_ids = list(dict.fromkeys(request.appointment_ids))
+    rows = await run_in_threadpool(_load_batch_rows, db, appointment_ids)
+    
+    found = {row[0]: row for row in rows}
+    results = {}
+    eligible = []
+    for appointment_id in appointment_ids:
+        row = found.get(appointment_id)
+        if row is None:
+            results[appointment_id] = {"status": "error", "detail": "Atendimento não encontrado"}
+            continue
+        _, therapist_id, _, date, event_id, therapist_email, patient_email = row
+        if current_user.role == "therapist" and therapist_id != current_user.id:
+            results[appointment_id] = {"status": "error", "detail": "Sem permissão para criar meet neste atendimento"}
+        elif not therapist_email or not patient_email:
+            results[appointment_id] = {"status": "error", "detail": "Terapeuta ou paciente não encontrado"}
+        elif event_id:
+            results[appointment_id] = {"status": "skipped", "detail": "Google Meet já criado", "event_id": event_id}
+        else:
+            eligible.append(appointment_id)
+    
+    claimed, active = await run_in_threadpool(_claim_batch_jobs, db, eligible, request.title) if eligible else ({}, {})
+    for appointment_id, job_id in active.items():
+        results[appointment_id] = {"status": "pending", "detail": "Criação já agendada na outbox", "job_id": job_id}
+    
+    events = {}
+    for appointment_id, job_id in claimed.items():
+        _, _, _, date, _, therapist_email, patient_email = found[appointment_id]
+        events[appointment_id] = build_meet_event_body(
+            therapist_email=therapist_email,
+            patient_email=patient_email,
+            appointment_datetime=date.isoformat(),
+            title=request.title,
+            request_id=calendar_request_id(appointment_id, job_id),
+            event_id=calendar_event_id(appointment_id, job_id)
         )
+    
+    if events:
+        # As chamadas ao Google rodam no executor dedicado, sem ocupar o threadpool
+        outcomes = await create_google_meet_events_batch_async(events)
+        for appointment_id, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                results[appointment_id] = {
+                    "status": "pending",
+                    "detail": f"Erro ao criar Google Meet, nova tentativa agendada: {str(outcome)}",
+                    "job_id": claimed[appointment_id]
+                }
+                continue
+            meet_link = outcome.get('hangout_link') or outcome.get('meet_link')
+            results[appointment_id] = {"status": "created", "event_id": outcome['event_id'], "meet_link": meet_link}
+        
+        owners = {appointment_id: found[appointment_id][1:3] for appointment_id in claimed}
+        if await run_in_threadpool(_save_batch_results, db, claimed, outcomes, owners):
+            outbox_worker.notify()
+    
+    return {
+        "created": sum(1 for r in results.values() if r["status"] == "created"),
+        "results": [{"appointment_id": appointment_id, **results[appointment_id]} for appointment_id in appointment_ids]
+    }
 
 @router.get("/link/{appointment_id}")
 def get_meet_link(
     appointment_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Obter link do Google Meet de um atendimento"""
     
@@ -103,6 +260,11 @@ def get_meet_link(
             )
     
     if not appointment.google_meet_link:
+        if get_pending_create(db, appointment.id):
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"appointment_id": appointment.id, "status": "pending", "meet_link": None}
+            )
         raise HTTPException(status_code=404, detail="Google Meet não foi criado para este atendimento")
     
     return {
@@ -111,13 +273,13 @@ def get_meet_link(
         "event_id": appointment.google_meet_event_id
     }
 
-@router.delete("/delete/{appointment_id}")
+@router.delete("/delete/{appointment_id}", status_code=status.HTTP_202_ACCEPTED)
 def delete_meet(
     appointment_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Deletar Google Meet de um atendimento"""
+    """Agendar a remoção do Google Meet de um atendimento"""
     
     appointment = db.query(Appointment).filter(
         Appointment.id == appointment_id
@@ -133,18 +295,48 @@ def delete_meet(
             detail="Sem permissão"
         )
     
-    try:
-        if appointment.google_meet_event_id:
-            delete_google_meet_event(appointment.google_meet_event_id)
-        
-        appointment.google_meet_event_id = None
-        appointment.google_meet_link = None
-        db.commit()
-        
-        return {"message": "Google Meet deletado com sucesso"}
+    # Limpar o link e registrar a remoção na mesma transação
+    enqueue_calendar_job(db, appointment.id, "delete", event_id=appointment.google_meet_event_id)
+    appointment.google_meet_event_id = None
+    appointment.google_meet_link = None
+    db.commit()
+    outbox_worker.notify()
     
-    except Exception as e:
+    return {"message": "Remoção do Google Meet agendada"}
+
+@router.get("/outbox")
+def get_outbox_status(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Profundidade e atraso da fila de operações do Google Calendar"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    return get_outbox_stats(db)
+
+@router.post("/sync")
+def run_calendar_sync(
+    current_user: User = Depends(get_current_user)
+):
+    """Rodar agora uma passada da sincronização incremental com o Calendar"""
+    if current_user.role != "admin":
         raise HTTPException(
-            status_code=500,
-            detail=f"Erro ao deletar Google Meet: {str(e)}"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    return sync_calendar()
+
+@router.get("/health")
+def get_calendar_health(
+    current_user: User = Depends(get_current_user)
+):
+    """Estado do circuit breaker e chamadas em andamento ao Google Calendar"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
         )
+    return get_calendar_call_stats()
@@ -1 +1,8 @@
-from app.schemas.user import UserCreate, UserResponse
+from app.schemas.user import (
+    UserCreate, UserResponse, ProfessionalSummary, PatientSummary, ProfessionalPage, PatientPage,
+    UserSearchResult, UserSearchPage, UserImportRow
+)
+from app.schemas.appointment import (
+    AppointmentResponse, AppointmentPage, ArchivedAppointmentResponse, ArchivedAppointmentPage, AgendaParticipant,
+    AgendaItem, AgendaResponse
+)
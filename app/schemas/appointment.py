@@ -0,0 +1,53 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+class AppointmentResponse(BaseModel):
+    id: int
+    therapist_id: Optional[int] = None
+    patient_id: Optional[int] = None
+    date: Optional[datetime] = None
+    status: Optional[str] = None
+    google_meet_event_id: Optional[str] = None
+    google_meet_link: Optional[str] = None
+    notes: Optional[str] = None
+    series_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class AppointmentPage(BaseModel):
+    items: List[AppointmentResponse]
+    next_cursor: Optional[str] = None
+
+class ArchivedAppointmentResponse(AppointmentResponse):
+    archived_at: Optional[datetime] = None
+
+class ArchivedAppointmentPage(BaseModel):
+    items: List[ArchivedAppointmentResponse]
+    next_cursor: Optional[str] = None
+
+class AgendaParticipant(BaseModel):
+    id: int
+    name: Optional[str] = None
+    email: str
+
+    class Config:
+        from_attributes = True
+
+class AgendaItem(BaseModel):
+    id: int
+    date: datetime
+    status: Optional[str] = None
+    meet_link: Optional[str] = None
+    notes: Optional[str] = None
+    series_id: Optional[int] = None
+    counterpart: Optional[AgendaParticipant] = None  # Paciente na agenda do terapeuta e vice-versa
+
+class AgendaResponse(BaseModel):
+    view: Literal["day", "week"]
+    date_from: datetime
+    date_to: datetime
+    items: List[AgendaItem]
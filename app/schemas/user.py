@@ -1,3 +1,4 @@
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
@@ -16,3 +17,45 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class ProfessionalSummary(BaseModel):
+    id: int
+    email: str
+    name: Optional[str] = None
+    specialization: Optional[str] = None
+    crm_or_crp: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class PatientSummary(BaseModel):
+    id: int
+    email: str
+    name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class ProfessionalPage(BaseModel):
+    items: List[ProfessionalSummary]
+    next_cursor: Optional[str] = None
+
+class PatientPage(BaseModel):
+    items: List[PatientSummary]
+    next_cursor: Optional[str] = None
+
+class UserSearchResult(BaseModel):
+    id: int
+    email: str
+    name: Optional[str] = None
+    role: str
+    specialization: Optional[str] = None
+
+class UserSearchPage(BaseModel):
+    items: List[UserSearchResult]
+    next_cursor: Optional[str] = None
+
+class UserImportRow(BaseModel):
+    email: EmailStr
+    name: str
+    role: Literal["patient", "therapist"] = "patient"
+    password: Optional[str] = None  # Senha em texto; sem senha é gerada uma temporária
+    password_hash: Optional[str] = None  # Hash bcrypt vindo de outro sistema
+    specialization: Optional[str] = None
+    crm_or_crp: Optional[str] = None
@@ -0,0 +1,44 @@
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from app.utils.statistics import appointment_counter_keys
+
+# Limite de ocorrências geradas por uma série
+SERIES_MAX_OCCURRENCES = int(os.getenv("SERIES_MAX_OCCURRENCES", "260"))
+
+FREQUENCY_WEEKS = {"weekly": 1, "biweekly": 2}
+
+
+def expand_series(start: datetime, frequency: str, count: int = None, until: date = None, skip_dates=()) -> list:
+    """
+    Datas das ocorrências de uma regra de recorrência
+
+    Como no EXDATE do iCalendar, as datas puladas contam para `count`:
+    count=10 com uma data pulada gera 9 atendimentos.
+    """
+    step = timedelta(weeks=FREQUENCY_WEEKS[frequency])
+    skipped = set(skip_dates)
+    occurrences = []
+    generated = 0
+    current = start
+    while True:
+        if count is not None and generated >= count:
+            break
+        if until is not None and current.date() > until:
+            break
+        if generated >= SERIES_MAX_OCCURRENCES:
+            raise ValueError(f"A série excede o limite de {SERIES_MAX_OCCURRENCES} ocorrências")
+        if current.date() not in skipped:
+            occurrences.append(current)
+        generated += 1
+        current += step
+    return occurrences
+
+
+def counter_deltas(status: str, dates, sign: int = 1) -> Counter:
+    """Deltas dos contadores de estatísticas para agendamentos gravados em massa"""
+    deltas = Counter()
+    for appointment_date in dates:
+        for key in appointment_counter_keys(status, appointment_date):
+            deltas[key] += sign
+    return deltas
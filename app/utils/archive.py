@@ -0,0 +1,167 @@
+"""
+Arquivamento de agendamentos antigos
+
+Agendamentos concluídos ou cancelados com data anterior a
+ARCHIVE_AFTER_DAYS são movidos de appointments para appointments_archive
+em lotes de ARCHIVE_BATCH_SIZE, cada lote em sua própria transação curta
+(no SQLite a trava de escrita fica com o arquivamento só durante o lote) e
+com uma pausa entre eles para as escritas das rotas. A tabela quente fica
+limitada ao horizonte mais a agenda futura; o histórico continua legível
+pela consulta explícita ao arquivo (GET /api/appointments/arquivo).
+"""
+import os
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.archived_appointment import ArchivedAppointment
+from app.models.calendar_outbox import CalendarOutbox
+from app.models.reminder_delivery import ReminderDelivery
+from app.utils.collection_versions import appointment_version_keys, bump_versions
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Desligado por padrão: habilitar em um único processo
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.05"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_STATUSES = ("completed", "cancelled")
+
+# Colunas copiadas, na mesma ordem nas duas tabelas
+_COPIED = (
+    "id", "therapist_id", "patient_id", "date", "status", "google_meet_event_id", "google_meet_link",
+    "notes", "series_id", "created_at", "updated_at",
+)
+
+_stats = {"archived": 0, "batches": 0, "last_batch_ms": 0.0, "max_batch_ms": 0.0}
+
+
+def archive_candidates(cutoff: datetime, limit: int):
+    """
+    Ids dos agendamentos arquiváveis (índice em (status, date))
+
+    Sem ORDER BY: o índice já entrega as linhas em ordem de data por status,
+    sem ordenar o histórico inteiro a cada lote. Agendamentos com job ativo
+    na outbox do Calendar ficam para a próxima passada.
+    """
+    active_job = exists().where(
+        CalendarOutbox.appointment_id == Appointment.id,
+        CalendarOutbox.status.in_(("pending", "processing"))
+    )
+    return select(Appointment.id, Appointment.therapist_id, Appointment.patient_id).where(
+        Appointment.status.in_(ARCHIVE_STATUSES),
+        Appointment.date < cutoff,
+        ~active_job
+    ).limit(limit)
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Mover um lote para appointments_archive em uma transação; retorna quantos"""
+    started = time.perf_counter()
+    rows = db.execute(archive_candidates(cutoff, batch_size)).all()
+    if not rows:
+        db.rollback()
+        return 0
+    ids = [row.id for row in rows]
+    now = datetime.utcnow()
+
+    columns = [getattr(Appointment, name) for name in _COPIED]
+    db.execute(insert(ArchivedAppointment).from_select(
+        list(_COPIED) + ["archived_at"],
+        select(*columns, literal(now)).where(Appointment.id.in_(ids))
+    ))
+    # Linhas dependentes: envios de lembrete e jobs já encerrados da outbox
+    db.execute(delete(ReminderDelivery).where(ReminderDelivery.appointment_id.in_(ids)))
+    db.execute(delete(CalendarOutbox).where(CalendarOutbox.appointment_id.in_(ids)))
+    db.execute(delete(Appointment).where(Appointment.id.in_(ids)))
+    # DELETE do Core não dispara os eventos do mapper; os contadores de
+    # estatísticas seguem contando o arquivo (ver compute_counters)
+    bump_versions(db.connection(), appointment_version_keys({row.therapist_id for row in rows}, {row.patient_id for row in rows}))
+    db.commit()
+
+    elapsed = (time.perf_counter() - started) * 1000
+    _stats["archived"] += len(ids)
+    _stats["batches"] += 1
+    _stats["last_batch_ms"] = elapsed
+    _stats["max_batch_ms"] = max(_stats["max_batch_ms"], elapsed)
+    return len(ids)
+
+
+def archive_appointments(session_factory=SessionLocal, now: datetime = None, after_days: int = ARCHIVE_AFTER_DAYS,
+                         batch_size: int = ARCHIVE_BATCH_SIZE, pause: float = ARCHIVE_BATCH_PAUSE_SECONDS,
+                         stop: threading.Event = None) -> dict:
+    """Uma passada: lotes até esgotar os arquiváveis (ou `stop`); retorna as contagens"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=after_days)
+    stop = stop or threading.Event()
+    archived = batches = 0
+    db = session_factory()
+    try:
+        while not stop.is_set():
+            moved = archive_batch(db, cutoff, batch_size)
+            archived += moved
+            batches += moved > 0
+            if moved < batch_size:
+                break
+            # Devolve a vez às escritas das rotas entre os lotes
+            stop.wait(pause)
+    finally:
+        db.close()
+    return {"cutoff": cutoff.isoformat(), "archived": archived, "batches": batches}
+
+
+def get_archive_stats() -> dict:
+    return {**_stats, "last_batch_ms": round(_stats["last_batch_ms"], 2), "max_batch_ms": round(_stats["max_batch_ms"], 2)}
+
+
+def _archive_metrics() -> list:
+    return [
+        ("appointments_archived_total", "counter", "Agendamentos movidos para o arquivo", {(): _stats["archived"]}),
+        ("appointments_archive_batch_max_ms", "gauge", "Maior duração de um lote de arquivamento (ms)",
+         {(): round(_stats["max_batch_ms"], 2)}),
+    ]
+
+registry.add_collector(_archive_metrics)
+
+
+class AppointmentArchiver:
+    """Thread que roda archive_appointments a cada ARCHIVE_INTERVAL_SECONDS"""
+
+    def __init__(self, session_factory=SessionLocal, interval: float = ARCHIVE_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="appointment-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = archive_appointments(self._session_factory, stop=self._stop)
+                if result["archived"]:
+                    logger.info("Arquivamento de agendamentos: %s", result)
+            except Exception as e:
+                logger.exception("Erro no arquivamento de agendamentos: %s", e)
+            self._stop.wait(self._interval)
+
+
+appointment_archiver = AppointmentArchiver()
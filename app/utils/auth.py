@@ -1,32 +1,65 @@
+"""
+Autenticação JWT com cache de tokens e usuários
+
+O cache de usuários é por processo. Uma alteração confirmada por este
+processo remove o usuário do cache no after_commit da sessão. Para as
+demais alterações (outros workers, update()/delete() em massa), cada entrada
+guarda a geração dos usuários lida antes da linha (collection_versions, incrementada
+na transação de toda escrita em users) e só vale enquanto ela for a atual.
+A geração atual é relida no máximo a cada USER_CACHE_GENERATION_CHECK_SECONDS:
+esse é o atraso máximo para uma revogação valer em todos os workers.
+Escritas do Core direto na conexão devem chamar bump_versions.
+"""
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
+import bcrypt
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from app.database.connection import get_read_db, get_async_read_db
 from app.models.user import User
+from app.utils.collection_versions import users_generation_query
 
 # Configuração
 SECRET_KEY = os.getenv("SECRET_KEY", "sua-chave-secreta-super-segura-aqui")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Contexto de criptografia
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cache de tokens decodificados e de usuários autenticados
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_GENERATION_CHECK_SECONDS = float(os.getenv("USER_CACHE_GENERATION_CHECK_SECONDS", "1"))
+
+# Custo do bcrypt (hashes existentes continuam válidos com qualquer custo)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # Segurança HTTP Bearer
 security = HTTPBearer()
 
+def _password_bytes(password: str) -> bytes:
+    # bcrypt só considera os primeiros 72 bytes
+    return password.encode("utf-8")[:72]
+
 def hash_password(password: str) -> str:
     """Hash de senha"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar senha"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode())
+    except (ValueError, AttributeError):
+        return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Criar token JWT"""
@@ -53,28 +86,152 @@ def verify_token(token: str) -> dict:
             detail="Token inválido ou expirado"
         )
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obter usuário atual do token"""
-    token = credentials.credentials
-    
+# ====== CACHE DE AUTENTICAÇÃO ======
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+# Geração dos usuários lida por último e quando (time.monotonic)
+_generation = {"value": None, "checked_at": float("-inf")}
+_cache_stats = {"token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0}
+
+# Colunas guardadas no cache (o hash da senha fica de fora)
+_CACHED_USER_COLUMNS = [c.key for c in User.__table__.columns if c.key != "password"]
+
+def verify_token_cached(token: str) -> dict:
+    """Verificar token JWT reaproveitando decodificações recentes"""
+    with _cache_lock:
+        payload = _token_cache.get(token)
+        if payload is not None and payload.get("exp", 0) > time.time():
+            _cache_stats["token_hits"] += 1
+            return payload
+        _cache_stats["token_misses"] += 1
+
     payload = verify_token(token)
-    user_id: int = payload.get("sub")
+    with _cache_lock:
+        _token_cache[token] = payload
+    return payload
+
+def invalidate_user(user_id: int):
+    """Remover usuário do cache (exclusão ou mudança de perfil)"""
+    with _cache_lock:
+        _user_cache.pop(int(user_id), None)
+
+# Invalidação só depois do commit: um rollback não remove nada e um leitor
+# concorrente não recoloca no cache a linha anterior ao commit
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("auth_changed_users", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("auth_changed_users", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop("auth_changed_users", None)
+
+def clear_auth_cache():
+    """Esvaziar os caches de tokens e usuários"""
+    with _cache_lock:
+        _token_cache.clear()
+        _user_cache.clear()
+        _generation.update(value=None, checked_at=float("-inf"))
+
+def get_auth_cache_stats() -> dict:
+    """Contadores de acerto/falha dos caches de autenticação"""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["token_cache_size"] = len(_token_cache)
+        stats["user_cache_size"] = len(_user_cache)
+    for kind in ("token", "user"):
+        total = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+        stats[f"{kind}_hit_ratio"] = stats[f"{kind}_hits"] / total if total else 0.0
+    return stats
+
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    payload = verify_token_cached(credentials.credentials)
+    user_id = payload.get("sub")
     
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
+    return int(user_id)
+
+def _generation_expired() -> bool:
+    with _cache_lock:
+        return time.monotonic() - _generation["checked_at"] >= USER_CACHE_GENERATION_CHECK_SECONDS
+
+def _set_generation(generation: int):
+    with _cache_lock:
+        _generation.update(value=generation, checked_at=time.monotonic())
+
+def _cached_user(user_id: int) -> Optional[User]:
+    with _cache_lock:
+        cached = _user_cache.get(user_id)
+        # Entrada de uma geração anterior: houve escrita em users depois dela
+        if cached is not None and cached["generation"] != _generation["value"]:
+            cached = None
+        _cache_stats["user_hits" if cached is not None else "user_misses"] += 1
     
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    if cached is None:
+        return None
+    # Objeto transiente novo a cada requisição, fora de qualquer sessão
+    return User(**cached["columns"])
+
+def _remember_user(loaded: tuple) -> User:
+    generation, user = loaded
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário não encontrado"
         )
     
+    with _cache_lock:
+        _user_cache[user.id] = {
+            "generation": generation,
+            "columns": {key: getattr(user, key) for key in _CACHED_USER_COLUMNS}
+        }
     return user
+
+def _read_generation(db: Session) -> int:
+    return db.scalar(users_generation_query())
+
+def _load_user(db: Session, user_id: int) -> tuple:
+    # Geração antes da linha: uma escrita entre as duas leituras deixa a
+    # entrada com a geração anterior, nunca uma linha antiga com a nova
+    generation = _read_generation(db)
+    return generation, db.query(User).filter(User.id == user_id).first()
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+) -> User:
+    """Obter usuário atual do token"""
+    user_id = _token_user_id(credentials)
+    # Consultas síncronas rodam no threadpool, fora do event loop
+    if _generation_expired():
+        _set_generation(await run_in_threadpool(_read_generation, db))
+    user = _cached_user(user_id)
+    if user is not None:
+        return user
+    return _remember_user(await run_in_threadpool(_load_user, db, user_id))
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> User:
+    """Obter usuário atual do token (rotas com AsyncSession)"""
+    user_id = _token_user_id(credentials)
+    if _generation_expired():
+        _set_generation(await db.scalar(users_generation_query()))
+    user = _cached_user(user_id)
+    if user is not None:
+        return user
+    generation = await db.scalar(users_generation_query())
+    return _remember_user((generation, await db.scalar(select(User).where(User.id == user_id))))
@@ -0,0 +1,253 @@
+import bisect
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session
+from app.database.connection import ReadSessionLocal
+from app.models.appointment import Appointment
+from app.models.working_hours import WorkingHours
+from app.utils.google_meet import local_now
+
+# Duração de um atendimento (a mesma usada nos eventos do Google Meet)
+APPOINTMENT_DURATION = timedelta(minutes=int(os.getenv("APPOINTMENT_DURATION_MINUTES", "60")))
+# Entradas do índice são recarregadas após esse tempo (escritas de outros processos)
+AVAILABILITY_INDEX_TTL_SECONDS = float(os.getenv("AVAILABILITY_INDEX_TTL_SECONDS", "300"))
+
+INACTIVE_STATUSES = ("cancelled",)
+
+
+def is_active(status) -> bool:
+    return status not in INACTIVE_STATUSES
+
+
+def active_appointments():
+    # Mesma condição do índice parcial ix_appointments_active_therapist_date
+    return Appointment.status != "cancelled"
+
+
+def find_conflict(db: Session, therapist_id: int, start: datetime, exclude_id: int = None):
+    """
+    Agendamento ativo do terapeuta que se sobrepõe a [start, start + duração)
+
+    Consulta de intervalo no banco (índice em date): é a verificação
+    autoritativa, válida mesmo com vários processos.
+    """
+    query = db.query(Appointment.id, Appointment.date).filter(
+        Appointment.therapist_id == therapist_id,
+        Appointment.date > start - APPOINTMENT_DURATION,
+        Appointment.date < start + APPOINTMENT_DURATION,
+        active_appointments()
+    )
+    if exclude_id is not None:
+        query = query.filter(Appointment.id != exclude_id)
+    return query.first()
+
+
+def find_conflicts_many(db: Session, therapist_id: int, starts: list, exclude_series_id: int = None) -> list:
+    """
+    Inícios em `starts` que se sobrepõem a agendamentos ativos do terapeuta
+
+    Uma única consulta de intervalo cobre todas as datas; a comparação de
+    cada ocorrência é feita em memória com busca binária.
+    """
+    if not starts:
+        return []
+    starts = sorted(starts)
+    query = db.query(Appointment.date).filter(
+        Appointment.therapist_id == therapist_id,
+        Appointment.date > starts[0] - APPOINTMENT_DURATION,
+        Appointment.date < starts[-1] + APPOINTMENT_DURATION,
+        active_appointments()
+    )
+    if exclude_series_id is not None:
+        query = query.filter(or_(Appointment.series_id.is_(None), Appointment.series_id != exclude_series_id))
+    busy = sorted(date for (date,) in query)
+    conflicts = []
+    for start in starts:
+        i = bisect.bisect_right(busy, start - APPOINTMENT_DURATION)
+        if i < len(busy) and busy[i] < start + APPOINTMENT_DURATION:
+            conflicts.append(start)
+    return conflicts
+
+
+class _TherapistCalendar:
+    __slots__ = ("busy", "hours", "loaded_at")
+
+    def __init__(self, busy: list, hours: dict):
+        self.busy = busy  # inícios ordenados dos agendamentos ativos
+        self.hours = hours  # weekday -> [(início, fim)] ordenados
+        self.loaded_at = time.monotonic()
+
+
+class AvailabilityIndex:
+    """
+    Índice em memória dos horários ocupados por terapeuta
+
+    Cada terapeuta é carregado sob demanda (uma consulta pelos agendamentos
+    ativos a partir de hoje e outra pelo modelo de horários) e mantido como
+    uma lista ordenada de inícios. Commits feitos pela ORM atualizam as
+    listas já carregadas; escritas em massa devem chamar invalidate().
+    """
+
+    def __init__(self, session_factory=ReadSessionLocal, ttl: float = AVAILABILITY_INDEX_TTL_SECONDS):
+        self._session_factory = session_factory
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._calendars = {}
+
+    def invalidate(self, therapist_id: int = None):
+        with self._lock:
+            if therapist_id is None:
+                self._calendars.clear()
+            else:
+                self._calendars.pop(therapist_id, None)
+
+    def _load_many(self, therapist_ids: list) -> dict:
+        """Carregar vários terapeutas com uma consulta por tabela"""
+        calendars = {tid: _TherapistCalendar([], {}) for tid in therapist_ids}
+        if not calendars:
+            return calendars
+        db = self._session_factory()
+        try:
+            since = datetime.combine(local_now().date(), datetime.min.time()) - APPOINTMENT_DURATION
+            busy_rows = db.query(Appointment.therapist_id, Appointment.date).filter(
+                Appointment.therapist_id.in_(therapist_ids),
+                Appointment.date >= since,
+                active_appointments()
+            ).order_by(Appointment.therapist_id, Appointment.date)
+            for therapist_id, date in busy_rows:
+                calendars[therapist_id].busy.append(date)
+
+            hour_rows = db.query(
+                WorkingHours.therapist_id, WorkingHours.weekday, WorkingHours.start_time, WorkingHours.end_time
+            ).filter(WorkingHours.therapist_id.in_(therapist_ids))
+            for therapist_id, weekday, start, end in hour_rows:
+                calendars[therapist_id].hours.setdefault(weekday, []).append((start, end))
+            for calendar in calendars.values():
+                for windows in calendar.hours.values():
+                    windows.sort()
+            return calendars
+        finally:
+            db.close()
+
+    def _calendars_for(self, therapist_ids: list) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            found = {
+                tid: calendar for tid in therapist_ids
+                if (calendar := self._calendars.get(tid)) is not None and now - calendar.loaded_at < self._ttl
+            }
+        missing = [tid for tid in therapist_ids if tid not in found]
+        if missing:
+            loaded = self._load_many(missing)
+            with self._lock:
+                self._calendars.update(loaded)
+            found.update(loaded)
+        return found
+
+    def apply_change(self, therapist_id: int, removed: datetime = None, added: datetime = None):
+        """Atualizar a lista de um terapeuta já carregado após um commit"""
+        with self._lock:
+            calendar = self._calendars.get(therapist_id)
+            if calendar is None:
+                return
+            # Cópia: buscas em andamento continuam com a lista anterior
+            busy = list(calendar.busy)
+            if removed is not None:
+                i = bisect.bisect_left(busy, removed)
+                if i < len(busy) and busy[i] == removed:
+                    del busy[i]
+            if added is not None:
+                bisect.insort(busy, added)
+            calendar.busy = busy
+
+    def _free_slots(self, therapist_id: int, calendar: _TherapistCalendar, start: datetime, end: datetime):
+        """Gerador dos horários livres do terapeuta em ordem cronológica"""
+        busy, hours = calendar.busy, calendar.hours
+        if not hours:
+            return
+        day = start.date()
+        while day <= end.date():
+            for window_start, window_end in hours.get(day.weekday(), ()):
+                slot = datetime.combine(day, window_start)
+                limit = min(datetime.combine(day, window_end), end)
+                if slot < start:
+                    # Alinhar à grade da janela
+                    steps = -(-(start - slot) // APPOINTMENT_DURATION)
+                    slot += steps * APPOINTMENT_DURATION
+                while slot + APPOINTMENT_DURATION <= limit:
+                    i = bisect.bisect_right(busy, slot - APPOINTMENT_DURATION)
+                    if i < len(busy) and busy[i] < slot + APPOINTMENT_DURATION:
+                        # Pular para o primeiro horário da grade após o ocupado
+                        blocked_until = busy[i] + APPOINTMENT_DURATION
+                        steps = -(-(blocked_until - slot) // APPOINTMENT_DURATION)
+                        slot += steps * APPOINTMENT_DURATION
+                        continue
+                    yield slot, therapist_id
+                    slot += APPOINTMENT_DURATION
+            day += timedelta(days=1)
+
+    def next_free_slots(self, therapist_ids: list, start: datetime, end: datetime, limit: int) -> list:
+        """Os `limit` próximos horários livres entre os terapeutas informados"""
+        start = max(start, local_now().replace(second=0, microsecond=0))
+        calendars = self._calendars_for(therapist_ids)
+        merged = heapq.merge(*[
+            self._free_slots(tid, calendar, start, end) for tid, calendar in calendars.items()
+        ])
+        return [slot for slot, _ in zip(merged, range(limit))]
+
+
+availability_index = AvailabilityIndex()
+
+
+# ====== SINCRONIZAÇÃO COM COMMITS DA ORM ======
+def _active_start(status, date):
+    return date if date is not None and is_active(status) else None
+
+
+def _old_value(state, attribute: str):
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return state.attrs[attribute].value
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_appointment_changes(session, flush_context):
+    changes = session.info.setdefault("availability_changes", [])
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            changes.append((None, None, obj.therapist_id, _active_start(obj.status, obj.date)))
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and session.is_modified(obj):
+            state = inspect(obj)
+            changes.append((
+                _old_value(state, "therapist_id"),
+                _active_start(_old_value(state, "status"), _old_value(state, "date")),
+                obj.therapist_id,
+                _active_start(obj.status, obj.date)
+            ))
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            changes.append((obj.therapist_id, _active_start(obj.status, obj.date), None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_appointment_changes(session):
+    for old_therapist, old_start, new_therapist, new_start in session.info.pop("availability_changes", []):
+        if old_therapist is not None and old_therapist == new_therapist:
+            if old_start != new_start:
+                availability_index.apply_change(new_therapist, removed=old_start, added=new_start)
+            continue
+        if old_therapist is not None and old_start is not None:
+            availability_index.apply_change(old_therapist, removed=old_start)
+        if new_therapist is not None and new_start is not None:
+            availability_index.apply_change(new_therapist, added=new_start)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_appointment_changes(session, previous_transaction):
+    session.info.pop("availability_changes", None)
@@ -0,0 +1,339 @@
+import os
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from googleapiclient.errors import HttpError
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, joinedload
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.calendar_outbox import CalendarOutbox
+from app.models.user import User
+from app.utils.google_meet import create_google_meet_event, delete_google_meet_event, calendar_event_id, calendar_request_id
+
+logger = logging.getLogger(__name__)
+
+# Configuração
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "2"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "600"))
+# Jobs em processing há mais tempo que isso voltam para a fila (worker caiu)
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+ACTIVE_STATUSES = ("pending", "processing")
+
+
+def enqueue_calendar_job(db: Session, appointment_id: int, operation: str, title: str = None, event_id: str = None):
+    """
+    Registrar uma operação do Calendar na sessão, sem commit
+
+    O chamador faz o commit junto com a alteração do agendamento. Um delete
+    que encontra um create ainda não iniciado cancela os dois.
+
+    Returns:
+        O job criado ou reaproveitado, ou None se a operação foi anulada
+    """
+    if operation == "create":
+        existing = db.query(CalendarOutbox).filter(
+            CalendarOutbox.appointment_id == appointment_id,
+            CalendarOutbox.operation == "create",
+            CalendarOutbox.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if existing:
+            return existing
+
+    if operation == "delete" and event_id is None:
+        pending_create = db.query(CalendarOutbox).filter(
+            CalendarOutbox.appointment_id == appointment_id,
+            CalendarOutbox.operation == "create",
+            CalendarOutbox.status == "pending"
+        ).first()
+        if pending_create:
+            pending_create.status = "cancelled"
+            pending_create.processed_at = datetime.utcnow()
+            return None
+
+    job = CalendarOutbox(
+        appointment_id=appointment_id,
+        operation=operation,
+        title=title,
+        event_id=event_id
+    )
+    db.add(job)
+    return job
+
+
+def get_pending_create(db: Session, appointment_id: int):
+    """Job de criação ainda não concluído para o agendamento, se houver"""
+    return db.query(CalendarOutbox).filter(
+        CalendarOutbox.appointment_id == appointment_id,
+        CalendarOutbox.operation == "create",
+        CalendarOutbox.status.in_(ACTIVE_STATUSES)
+    ).first()
+
+
+def deletes_waiting_on(db: Session, create_jobs: dict) -> dict:
+    """
+    Deletes ainda sem evento pedidos depois de cada create (agendamento -> job)
+
+    Args:
+        create_jobs: dict agendamento -> id do job de create em andamento
+
+    Um delete sem evento registrado espera o create anterior; quando este
+    termina, o evento criado vai para o delete em vez de para o agendamento.
+    """
+    if not create_jobs:
+        return {}
+    jobs = db.query(CalendarOutbox).filter(
+        CalendarOutbox.appointment_id.in_(list(create_jobs)),
+        CalendarOutbox.operation == "delete",
+        CalendarOutbox.status.in_(ACTIVE_STATUSES),
+        CalendarOutbox.event_id.is_(None),
+        CalendarOutbox.id > min(create_jobs.values())
+    ).order_by(CalendarOutbox.id.desc()).all()
+    # O mais antigo de cada agendamento fica por último e prevalece
+    return {job.appointment_id: job for job in jobs if job.id > create_jobs[job.appointment_id]}
+
+
+def get_outbox_stats(db: Session) -> dict:
+    """Profundidade da fila por status/operação e atraso do job mais antigo"""
+    counts = db.query(
+        CalendarOutbox.status, CalendarOutbox.operation, func.count(CalendarOutbox.id)
+    ).filter(
+        CalendarOutbox.status.in_(ACTIVE_STATUSES + ("failed",))
+    ).group_by(CalendarOutbox.status, CalendarOutbox.operation).all()
+
+    oldest_pending = db.query(func.min(CalendarOutbox.created_at)).filter(
+        CalendarOutbox.status.in_(ACTIVE_STATUSES)
+    ).scalar()
+
+    depth = {status: {} for status in ACTIVE_STATUSES + ("failed",)}
+    for status, operation, count in counts:
+        depth[status][operation] = count
+
+    return {
+        "pending": sum(depth["pending"].values()),
+        "processing": sum(depth["processing"].values()),
+        "failed": sum(depth["failed"].values()),
+        "by_status": depth,
+        "lag_seconds": (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0.0
+    }
+
+
+def backoff_delay(attempts: int) -> float:
+    """Espera exponencial com jitter antes da próxima tentativa"""
+    delay = min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class CalendarOutboxWorker:
+    """
+    Worker em threads que consome a tabela calendar_outbox
+
+    Uma thread de coordenação reivindica jobs vencidos e os executa em um pool
+    de OUTBOX_WORKERS threads. notify() acorda a coordenação logo após um
+    enqueue, sem esperar o próximo intervalo de polling.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: int = OUTBOX_WORKERS, poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="calendar-outbox")
+        self._thread = threading.Thread(target=self._run, name="calendar-outbox-coordinator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        self.recover_stale()
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.exception("Erro no worker da outbox do Calendar: %s", e)
+                processed = 0
+            if not processed:
+                self._wake.wait(self._poll_interval)
+                self._wake.clear()
+
+    def recover_stale(self):
+        """Devolver à fila jobs presos em processing além do lease"""
+        db = self._session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_LEASE_SECONDS)
+            db.execute(
+                update(CalendarOutbox)
+                .where(CalendarOutbox.status == "processing", CalendarOutbox.updated_at < cutoff)
+                .values(status="pending", updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self, limit: int) -> list:
+        db = self._session_factory()
+        try:
+            now = datetime.utcnow()
+            candidates = db.query(CalendarOutbox.id).filter(
+                CalendarOutbox.status == "pending",
+                CalendarOutbox.next_attempt_at <= now
+            ).order_by(CalendarOutbox.next_attempt_at, CalendarOutbox.id).limit(limit).all()
+
+            claimed = []
+            for (job_id,) in candidates:
+                # Reivindicação condicional: seguro com vários processos
+                result = db.execute(
+                    update(CalendarOutbox)
+                    .where(CalendarOutbox.id == job_id, CalendarOutbox.status == "pending")
+                    .values(status="processing", updated_at=now)
+                )
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def run_once(self) -> int:
+        """Reivindicar e executar um lote de jobs vencidos; retorna quantos"""
+        claimed = self._claim(self._workers * 2)
+        if self._executor is None:
+            for job_id in claimed:
+                self._process(job_id)
+        else:
+            list(self._executor.map(self._process, claimed))
+        return len(claimed)
+
+    def _process(self, job_id: int):
+        db = self._session_factory()
+        try:
+            job = db.query(CalendarOutbox).filter(CalendarOutbox.id == job_id).first()
+            try:
+                if job.operation == "create":
+                    self._process_create(db, job)
+                else:
+                    self._process_delete(db, job)
+            except Exception as e:
+                db.rollback()
+                job = db.query(CalendarOutbox).filter(CalendarOutbox.id == job_id).first()
+                job.attempts = (job.attempts or 0) + 1
+                job.last_error = str(e)[:1000]
+                if job.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    job.status = "failed"
+                    job.processed_at = datetime.utcnow()
+                else:
+                    job.status = "pending"
+                    job.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job: CalendarOutbox, status: str = "done"):
+        job.status = status
+        job.processed_at = datetime.utcnow()
+
+    def _process_create(self, db: Session, job: CalendarOutbox):
+        # Terapeuta e paciente no mesmo SELECT do agendamento
+        appointment = db.query(Appointment).options(
+            joinedload(Appointment.therapist),
+            joinedload(Appointment.patient)
+        ).filter(Appointment.id == job.appointment_id).first()
+
+        if appointment is None or appointment.status == "cancelled" or not appointment.therapist or not appointment.patient:
+            return self._finish(job, "cancelled")
+        therapist_email = appointment.therapist.email
+        patient_email = appointment.patient.email
+        appointment_datetime = appointment.date.isoformat()
+        title = job.title or "Teleatendimento Sinergia Pro"
+        request_id = calendar_request_id(job.appointment_id, job.id)
+        event_id = calendar_event_id(job.appointment_id, job.id)
+        # Libera a conexão durante a chamada ao Google
+        db.commit()
+
+        meet_event = create_google_meet_event(
+            therapist_email=therapist_email,
+            patient_email=patient_email,
+            appointment_datetime=appointment_datetime,
+            title=title,
+            request_id=request_id,
+            event_id=event_id
+        )
+        job.event_id = meet_event['event_id']
+
+        # Um delete pedido enquanto o create rodava recebe o evento criado
+        pending_delete = deletes_waiting_on(db, {job.appointment_id: job.id}).get(job.appointment_id)
+        if pending_delete:
+            pending_delete.event_id = meet_event['event_id']
+        else:
+            appointment.google_meet_event_id = meet_event['event_id']
+            appointment.google_meet_link = meet_event.get('hangout_link') or meet_event.get('meet_link')
+        self._finish(job)
+
+    def _process_delete(self, db: Session, job: CalendarOutbox):
+        if not job.event_id:
+            create_in_flight = db.query(CalendarOutbox.id).filter(
+                CalendarOutbox.appointment_id == job.appointment_id,
+                CalendarOutbox.operation == "create",
+                CalendarOutbox.status.in_(ACTIVE_STATUSES),
+                CalendarOutbox.id < job.id
+            ).first()
+            if create_in_flight:
+                # O create correspondente ainda não terminou; tentar depois
+                job.status = "pending"
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=OUTBOX_BACKOFF_BASE_SECONDS)
+                return
+            # O create pode ter terminado sem ver este delete (reivindicado
+            # naquele instante): o evento dele é o que deve ser removido
+            finished = db.query(CalendarOutbox).filter(
+                CalendarOutbox.appointment_id == job.appointment_id,
+                CalendarOutbox.operation == "create",
+                CalendarOutbox.status == "done",
+                CalendarOutbox.event_id.isnot(None),
+                CalendarOutbox.id < job.id
+            ).order_by(CalendarOutbox.id.desc()).first()
+            if finished is None:
+                # O create falhou ou foi cancelado: não há evento a deletar
+                return self._finish(job, "cancelled")
+            job.event_id = finished.event_id
+            appointment = db.get(Appointment, job.appointment_id)
+            if appointment is not None and appointment.google_meet_event_id == finished.event_id:
+                appointment.google_meet_event_id = None
+                appointment.google_meet_link = None
+            # Libera a conexão durante a chamada ao Google
+            db.commit()
+        try:
+            delete_google_meet_event(job.event_id)
+        except HttpError as e:
+            # Evento já removido no Google
+            if e.resp.status not in (404, 410):
+                raise
+        self._finish(job)
+
+
+outbox_worker = CalendarOutboxWorker()
@@ -0,0 +1,228 @@
+"""
+Sincronização incremental com o Google Calendar
+
+Cada passada lista só os eventos alterados desde a anterior (syncToken do
+events.list), página a página, e aplica as mudanças nos agendamentos
+correspondentes (índice em google_meet_event_id), uma transação por página:
+evento cancelado no Google cancela o agendamento ainda agendado, evento
+movido atualiza a data e o link do Meet é atualizado. O token só é gravado
+depois da última página; se expirar (410), a passada vira uma sincronização
+completa.
+
+Mudanças de data feitas aqui não são enviadas ao Google; para não
+desfazê-las, a data só é ignorada quando foi alterada localmente
+(date_changed_at) depois da última alteração do evento. Outras edições
+locais (observações, status) não impedem a mudança vinda do Google, que o
+syncToken não devolveria de novo.
+"""
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+from googleapiclient.errors import HttpError
+from sqlalchemy import event as orm_event, inspect
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.calendar_sync_state import CalendarSyncState
+from app.utils.availability import availability_index
+from app.utils.google_meet import calendar_client, CALENDAR_TIME_ZONE
+
+logger = logging.getLogger(__name__)
+
+# Desligado por padrão: habilitar em um único processo, com o Calendar configurado
+CALENDAR_SYNC_ENABLED = os.getenv("CALENDAR_SYNC_ENABLED", "false").lower() == "true"
+CALENDAR_SYNC_INTERVAL_SECONDS = float(os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", "300"))
+# Máximo aceito pelo events.list
+CALENDAR_SYNC_PAGE_SIZE = int(os.getenv("CALENDAR_SYNC_PAGE_SIZE", "2500"))
+CALENDAR_ID = "primary"
+
+
+class SyncTokenExpired(Exception):
+    """O Calendar recusou o syncToken (410): é preciso uma sincronização completa"""
+
+
+# ====== EVENTOS DO CALENDAR ======
+def _list_page(sync_token: Optional[str], page_token: Optional[str]) -> dict:
+    params = {"calendarId": CALENDAR_ID, "maxResults": CALENDAR_SYNC_PAGE_SIZE}
+    if sync_token:
+        params["syncToken"] = sync_token
+    if page_token:
+        params["pageToken"] = page_token
+    try:
+        return calendar_client.execute(calendar_client.service().events().list(**params))
+    except HttpError as e:
+        if e.resp.status == 410:
+            raise SyncTokenExpired() from e
+        raise
+
+
+def event_start(event: dict) -> Optional[datetime]:
+    """Início do evento como data local sem fuso, igual a Appointment.date"""
+    value = (event.get("start") or {}).get("dateTime")
+    if not value:
+        return None
+    start = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if start.tzinfo is not None:
+        start = start.astimezone(ZoneInfo(CALENDAR_TIME_ZONE)).replace(tzinfo=None)
+    return start
+
+
+def event_updated(event: dict) -> Optional[datetime]:
+    """Última alteração do evento no Google, em UTC sem fuso (como updated_at)"""
+    value = event.get("updated")
+    if not value:
+        return None
+    updated = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if updated.tzinfo is not None:
+        updated = updated.astimezone(timezone.utc).replace(tzinfo=None)
+    return updated
+
+
+def event_meet_link(event: dict) -> Optional[str]:
+    entry_points = (event.get("conferenceData") or {}).get("entryPoints") or [{}]
+    return event.get("hangoutLink") or entry_points[0].get("uri")
+
+
+# ====== APLICAÇÃO NOS AGENDAMENTOS ======
+def apply_events(db: Session, events: list) -> dict:
+    """
+    Aplicar uma página de eventos alterados e gravar em uma transação
+
+    Eventos sem agendamento são ignorados, assim como a data de eventos
+    alterados antes da última mudança local de data. As alterações passam
+    pelo ORM, para que contadores e versões das listagens acompanhem.
+    """
+    stats = {"matched": 0, "moved": 0, "cancelled": 0, "relinked": 0}
+    event_ids = [event["id"] for event in events if event.get("id")]
+    if not event_ids:
+        return stats
+    appointments = {
+        appointment.google_meet_event_id: appointment
+        for appointment in db.query(Appointment).filter(Appointment.google_meet_event_id.in_(event_ids))
+    }
+
+    therapists = set()
+    for event in events:
+        appointment = appointments.get(event.get("id"))
+        if appointment is None:
+            continue
+        stats["matched"] += 1
+
+        if event.get("status") == "cancelled":
+            if appointment.status == "scheduled":
+                appointment.status = "cancelled"
+                stats["cancelled"] += 1
+            appointment.google_meet_event_id = None
+            appointment.google_meet_link = None
+            therapists.add(appointment.therapist_id)
+            continue
+
+        start = event_start(event)
+        updated = event_updated(event)
+        local_move_is_newer = updated and appointment.date_changed_at and updated <= appointment.date_changed_at
+        if start and start != appointment.date and not local_move_is_newer:
+            appointment.date = start
+            stats["moved"] += 1
+            therapists.add(appointment.therapist_id)
+        link = event_meet_link(event)
+        if link and link != appointment.google_meet_link:
+            appointment.google_meet_link = link
+            stats["relinked"] += 1
+
+    db.commit()
+    for therapist_id in therapists:
+        availability_index.invalidate(therapist_id)
+    return stats
+
+
+@orm_event.listens_for(Appointment, "before_update")
+def _stamp_date_change(mapper, connection, target):
+    # Escritas em massa que mudam a data gravam date_changed_at por conta própria
+    if inspect(target).attrs.date.history.has_changes():
+        target.date_changed_at = datetime.utcnow()
+
+
+def _sync_pages(db: Session, sync_token: Optional[str]) -> dict:
+    totals = {"pages": 0, "events": 0, "matched": 0, "moved": 0, "cancelled": 0, "relinked": 0}
+    page_token = None
+    while True:
+        page = _list_page(sync_token, page_token)
+        items = page.get("items") or []
+        totals["pages"] += 1
+        totals["events"] += len(items)
+        for key, value in apply_events(db, items).items():
+            totals[key] += value
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            totals["next_sync_token"] = page.get("nextSyncToken")
+            return totals
+
+
+def sync_calendar(session_factory=SessionLocal) -> dict:
+    """Uma passada de sincronização; retorna as contagens de eventos e alterações"""
+    db = session_factory()
+    try:
+        state = db.get(CalendarSyncState, CALENDAR_ID)
+        sync_token = state.sync_token if state else None
+        # Devolver a conexão ao pool durante as chamadas ao Google
+        db.rollback()
+
+        full = sync_token is None
+        try:
+            totals = _sync_pages(db, sync_token)
+        except SyncTokenExpired:
+            logger.warning("syncToken do Calendar expirado; sincronização completa")
+            full = True
+            totals = _sync_pages(db, None)
+
+        now = datetime.utcnow()
+        state = db.get(CalendarSyncState, CALENDAR_ID) or CalendarSyncState(calendar_id=CALENDAR_ID)
+        state.sync_token = totals.pop("next_sync_token")
+        state.synced_at = now
+        if full:
+            state.full_sync_at = now
+        db.add(state)
+        db.commit()
+        return {"full": full, **totals}
+    finally:
+        db.close()
+
+
+class CalendarSyncWorker:
+    """Thread que roda sync_calendar a cada CALENDAR_SYNC_INTERVAL_SECONDS"""
+
+    def __init__(self, session_factory=SessionLocal, interval: float = CALENDAR_SYNC_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = sync_calendar(self._session_factory)
+                if result["moved"] or result["cancelled"] or result["relinked"]:
+                    logger.info("Sincronização com o Calendar: %s", result)
+            except Exception as e:
+                logger.exception("Erro na sincronização com o Calendar: %s", e)
+            self._stop.wait(self._interval)
+
+
+calendar_sync_worker = CalendarSyncWorker()
@@ -0,0 +1,157 @@
+"""
+Versões das coleções e ETags das listagens
+
+Cada escrita incrementa, na mesma transação, a versão das coleções que
+afeta: agendamentos (por terapeuta e por paciente) e usuários (por perfil).
+As listagens leem a versão antes das linhas e respondem 304 a um
+If-None-Match igual, sem carregar nem serializar nada; a escrita de um
+terapeuta mantém válidos os ETags das agendas dos demais.
+
+Não há linha de versão global para os agendamentos: no Postgres ela
+serializaria todas as escritas na trava da linha. A listagem sem filtro usa
+a soma das versões por terapeuta/paciente, que cresce a cada escrita.
+"""
+import zlib
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from app.database.upsert import upsert_increments
+from app.models.appointment import Appointment
+from app.models.collection_version import CollectionVersion
+from app.models.user import User
+
+APPOINTMENTS_PREFIX = "appointments:"
+APPOINTMENTS_THERAPIST_PREFIX = APPOINTMENTS_PREFIX + "therapist:"
+APPOINTMENTS_PATIENT_PREFIX = APPOINTMENTS_PREFIX + "patient:"
+USERS_ROLE_PREFIX = "users:role:"
+USER_ROLES = ("patient", "therapist", "admin")
+
+# Clientes sempre revalidam; a resposta é do usuário autenticado
+CACHE_CONTROL = "private, no-cache"
+
+
+def appointment_version_keys(therapist_ids, patient_ids=()) -> list:
+    """Versão da agenda de cada terapeuta e de cada paciente afetado"""
+    return (
+        [APPOINTMENTS_THERAPIST_PREFIX + str(t) for t in therapist_ids if t is not None]
+        + [APPOINTMENTS_PATIENT_PREFIX + str(p) for p in patient_ids if p is not None]
+    )
+
+
+def appointment_feed_query(therapist_id: Optional[int], patient_id: Optional[int]):
+    """Versão que cobre a listagem: a do terapeuta ou do paciente filtrado, ou a soma de todas"""
+    if therapist_id is not None:
+        return version_query(APPOINTMENTS_THERAPIST_PREFIX + str(therapist_id))
+    if patient_id is not None:
+        return version_query(APPOINTMENTS_PATIENT_PREFIX + str(patient_id))
+    return _prefix_sum_query(APPOINTMENTS_PREFIX)
+
+
+def users_generation_query():
+    """Geração dos usuários: soma das versões de todos os perfis, muda a cada escrita em users"""
+    return _prefix_sum_query(USERS_ROLE_PREFIX)
+
+
+def _prefix_sum_query(prefix: str):
+    # Faixa da chave primária com o prefixo (";" sucede ":"), sem varrer a tabela
+    return select(func.coalesce(func.sum(CollectionVersion.version), 0)).where(
+        CollectionVersion.key > prefix,
+        CollectionVersion.key < prefix[:-1] + ";"
+    )
+
+
+def users_key(role: str) -> str:
+    """Versão da listagem de usuários de um perfil"""
+    return USERS_ROLE_PREFIX + role
+
+
+def user_version_keys(roles) -> list:
+    return [users_key(role) for role in roles if role]
+
+
+def bump_versions(connection, keys):
+    """
+    Incrementar as versões na conexão/transação informada
+
+    Como adjust_counters: escritas em massa do Core, que não passam pelos
+    eventos do mapper, devem chamar esta função com as chaves afetadas.
+    """
+    upsert_increments(connection, CollectionVersion, "version", dict.fromkeys(keys, 1))
+
+
+def version_query(key: str):
+    return select(CollectionVersion.version).where(CollectionVersion.key == key)
+
+
+def read_version(db, key: str) -> int:
+    return db.scalar(version_query(key)) or 0
+
+
+# ====== EVENTOS DO MAPPER ======
+# Como em statistics: carregar o valor antigo mesmo em objetos expirados
+@event.listens_for(Appointment.therapist_id, "set", active_history=True)
+@event.listens_for(Appointment.patient_id, "set", active_history=True)
+def _load_old_owner(target, value, oldvalue, initiator):
+    pass
+
+
+def _old_and_new(target, attribute: str) -> list:
+    history = inspect(target).attrs[attribute].history
+    return list(history.deleted) + [getattr(target, attribute)]
+
+
+@event.listens_for(Appointment, "after_insert")
+@event.listens_for(Appointment, "after_delete")
+def _appointment_written(mapper, connection, target):
+    bump_versions(connection, appointment_version_keys([target.therapist_id], [target.patient_id]))
+
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    # Troca de terapeuta ou paciente: as duas agendas mudam
+    bump_versions(connection, appointment_version_keys(
+        _old_and_new(target, "therapist_id"), _old_and_new(target, "patient_id")
+    ))
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _user_written(mapper, connection, target):
+    bump_versions(connection, user_version_keys([target.role]))
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    bump_versions(connection, user_version_keys(_old_and_new(target, "role")))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_users_written(orm_execute_state):
+    # update()/delete() em massa pela sessão não passam pelos eventos do mapper
+    # e podem alterar o perfil: todas as versões de usuários mudam
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is inspect(User):
+        bump_versions(orm_execute_state.session.connection(), user_version_keys(USER_ROLES))
+
+
+# ====== ETAGS ======
+def collection_etag(request: Request, version: int) -> str:
+    """ETag da listagem: versão da coleção mais os parâmetros da consulta"""
+    return f'"{version}-{zlib.crc32(request.url.query.encode()):08x}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match contém o ETag (comparação fraca, RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
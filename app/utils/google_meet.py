@@ -1,22 +1,272 @@
 import os
 import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from urllib.parse import urljoin
+import google_auth_httplib2
+import httplib2
+import requests
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from datetime import datetime, timedelta
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from app.utils.metrics import observe_calendar_call, registry
+from app.utils.resilience import CircuitBreaker, GuardedExecutor
+
+logger = logging.getLogger(__name__)
 
 # Carregar credenciais
 CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), '../../google-credentials.json')
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-def get_google_credentials():
-    """Obter credenciais do Google"""
-    credentials = service_account.Credentials.from_service_account_file(
+# Endpoint alternativo (ex.: servidor local que simula o Calendar)
+CALENDAR_API_ENDPOINT = os.getenv("GOOGLE_CALENDAR_API_ENDPOINT")
+GOOGLE_HTTP_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_HTTP_TIMEOUT_SECONDS", "10"))
+# Renovar o access token quando faltar menos que isso para expirar
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# Limite de requisições por batch da API do Calendar
+CALENDAR_BATCH_LIMIT = 50
+# Fuso dos horários dos agendamentos (datas sem fuso no banco)
+CALENDAR_TIME_ZONE = os.getenv("CALENDAR_TIME_ZONE", "America/Sao_Paulo")
+
+
+def local_now() -> datetime:
+    """Agora na hora local dos agendamentos, sem fuso (como Appointment.date)"""
+    return datetime.now(ZoneInfo(CALENDAR_TIME_ZONE)).replace(tzinfo=None)
+
+
+# Bulkhead e circuit breaker das chamadas ao Google
+GOOGLE_MAX_CONCURRENT_CALLS = int(os.getenv("GOOGLE_MAX_CONCURRENT_CALLS", "8"))
+GOOGLE_MAX_QUEUED_CALLS = int(os.getenv("GOOGLE_MAX_QUEUED_CALLS", "32"))
+GOOGLE_CALL_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_CALL_TIMEOUT_SECONDS", "15"))
+GOOGLE_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GOOGLE_BREAKER_FAILURE_THRESHOLD", "5"))
+GOOGLE_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GOOGLE_BREAKER_COOLDOWN_SECONDS", "30"))
+
+def _is_google_failure(exc: Exception) -> bool:
+    # Erros 4xx são do pedido, não indicam que o Google está fora
+    if isinstance(exc, HttpError):
+        return exc.resp.status >= 500 or exc.resp.status in (408, 429)
+    return True
+
+calendar_calls = GuardedExecutor(
+    "google-calendar",
+    max_concurrent=GOOGLE_MAX_CONCURRENT_CALLS,
+    max_queue=GOOGLE_MAX_QUEUED_CALLS,
+    timeout=GOOGLE_CALL_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(GOOGLE_BREAKER_FAILURE_THRESHOLD, GOOGLE_BREAKER_COOLDOWN_SECONDS),
+    is_failure=_is_google_failure
+)
+
+def _load_credentials():
+    # GOOGLE_CREDENTIALS_JSON tem precedência sobre o arquivo
+    credentials_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
+    if credentials_json:
+        return service_account.Credentials.from_service_account_info(
+            json.loads(credentials_json),
+            scopes=CALENDAR_SCOPES
+        )
+    return service_account.Credentials.from_service_account_file(
         CREDENTIALS_PATH,
-        scopes=['https://www.googleapis.com/auth/calendar']
+        scopes=CALENDAR_SCOPES
     )
-    return credentials
 
-def create_google_meet_event(therapist_email: str, patient_email: str, appointment_datetime: str, title: str = "Teleatendimento"):
+def _operation_name(request) -> str:
+    # Ex.: "calendar.events.insert"; batches não têm methodId
+    return getattr(request, "methodId", None) or "batch"
+
+class CalendarClient:
+    """
+    Cliente do Google Calendar compartilhado pelo processo
+
+    Carrega as credenciais e o documento de discovery uma única vez, reaproveita
+    o access token até perto da expiração e mantém uma conexão HTTP keep-alive
+    por thread (httplib2.Http não é thread-safe).
+    """
+
+    def __init__(self, credentials_loader=_load_credentials, api_endpoint=None):
+        self._credentials_loader = credentials_loader
+        self._api_endpoint = api_endpoint
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+        self._service = None
+        self._token_session = None
+
+    def _initialize(self):
+        with self._lock:
+            if self._service is not None:
+                return
+            credentials = self._credentials_loader()
+            http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT_SECONDS)
+            )
+            client_options = {"api_endpoint": self._api_endpoint} if self._api_endpoint else None
+            # Documento de discovery empacotado com o googleapiclient, sem busca na rede
+            self._service = build_from_document(
+                get_static_doc('calendar', 'v3'),
+                http=http,
+                client_options=client_options
+            )
+            self._credentials = credentials
+            self._token_session = requests.Session()
+
+    def warm_up(self):
+        """Carregar credenciais e construir o serviço antes da primeira chamada"""
+        self._initialize()
+
+    @property
+    def credentials(self):
+        self._initialize()
+        return self._credentials
+
+    def service(self):
+        """Recurso do Calendar v3 compartilhado"""
+        self._initialize()
+        return self._service
+
+    def _ensure_token(self):
+        credentials = self.credentials
+        with self._lock:
+            expiry = credentials.expiry
+            if credentials.token and expiry and expiry - datetime.utcnow() > timedelta(seconds=TOKEN_REFRESH_MARGIN_SECONDS):
+                return
+            credentials.refresh(Request(session=self._token_session))
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT_SECONDS)
+            )
+            self._local.http = http
+        return http
+
+    def new_batch(self, callback):
+        """Criar um batch HTTP, respeitando o endpoint alternativo se houver"""
+        if self._api_endpoint:
+            return BatchHttpRequest(callback=callback, batch_uri=urljoin(self._api_endpoint, '/batch/calendar/v3'))
+        return self.service().new_batch_http_request(callback=callback)
+
+    def _execute_now(self, request):
+        self._ensure_token()
+        return request.execute(http=self._http())
+
+    def execute(self, request):
+        """
+        Executar uma requisição (ou batch) do googleapiclient
+
+        A chamada roda no executor dedicado (calendar_calls), com timeout e
+        circuit breaker, usando a conexão keep-alive da thread do executor.
+        """
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = calendar_calls.call(self._execute_now, request)
+            failed = False
+            return result
+        finally:
+            observe_calendar_call(_operation_name(request), started, failed)
+
+    async def execute_async(self, request):
+        """Como execute(), sem ocupar uma thread do chamador"""
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await calendar_calls.call_async(self._execute_now, request)
+            failed = False
+            return result
+        finally:
+            observe_calendar_call(_operation_name(request), started, failed)
+
+    def reset(self):
+        """Descartar credenciais, token e conexões (ex.: troca de credenciais)"""
+        with self._lock:
+            self._credentials = None
+            self._service = None
+            if self._token_session is not None:
+                self._token_session.close()
+            self._token_session = None
+            self._local = threading.local()
+
+calendar_client = CalendarClient(api_endpoint=CALENDAR_API_ENDPOINT)
+
+def warm_up_google_calendar():
+    """Pré-carregar o cliente do Calendar na inicialização, se configurado"""
+    try:
+        calendar_client.warm_up()
+    except (OSError, ValueError) as e:
+        logger.warning("Google Calendar não configurado: %s", e)
+
+def get_google_credentials():
+    """Obter credenciais do Google"""
+    return calendar_client.credentials
+
+def calendar_event_id(appointment_id: int, job_id: int) -> str:
+    """ID de evento determinístico (base32hex, exigido pelo Calendar)"""
+    return f'sinergia{appointment_id}o{job_id}'
+
+def calendar_request_id(appointment_id: int, job_id: int) -> str:
+    """ID idempotente do pedido de conferência do Meet"""
+    return f'sinergia-{appointment_id}-{job_id}'
+
+def build_meet_event_body(therapist_email: str, patient_email: str, appointment_datetime: str, title: str = "Teleatendimento", *, request_id: str, event_id: str = None) -> dict:
+    """
+    Montar o corpo do evento do Calendar com pedido de criação do Meet
+
+    request_id (pedido de conferência) e event_id (id do evento) devem ser
+    determinísticos para que uma nova tentativa não crie outro evento; ver
+    calendar_event_id.
+    """
+    # Converter string para datetime
+    appointment_time = datetime.fromisoformat(appointment_datetime)
+    end_time = appointment_time + timedelta(hours=1)  # 1 hora de duração
+    
+    event = {
+        'summary': title,
+        'description': f'Teleatendimento entre {therapist_email} e {patient_email}',
+        'start': {
+            'dateTime': appointment_time.isoformat(),
+            'timeZone': CALENDAR_TIME_ZONE
+        },
+        'end': {
+            'dateTime': end_time.isoformat(),
+            'timeZone': CALENDAR_TIME_ZONE
+        },
+        'attendees': [
+            {'email': therapist_email},
+            {'email': patient_email}
+        ],
+        'conferenceData': {
+            'createRequest': {
+                'requestId': request_id,
+                'conferenceSolutionKey': {
+                    'type': 'hangoutsMeet'
+                }
+            }
+        }
+    }
+    if event_id:
+        event['id'] = event_id
+    return event
+
+def summarize_meet_event(created_event: dict) -> dict:
+    """Extrair os campos do evento criado que a aplicação usa"""
+    return {
+        'event_id': created_event.get('id'),
+        'title': created_event.get('summary'),
+        'start': created_event.get('start'),
+        'end': created_event.get('end'),
+        'meet_link': created_event.get('conferenceData', {}).get('entryPoints', [{}])[0].get('uri'),
+        'hangout_link': created_event.get('hangoutLink')
+    }
+
+def create_google_meet_event(therapist_email: str, patient_email: str, appointment_datetime: str, title: str = "Teleatendimento", *, request_id: str, event_id: str):
     """
     Criar um evento no Google Calendar com Google Meet integrado
     
@@ -25,63 +275,118 @@ def create_google_meet_event(therapist_email: str, patient_email: str, appointme
         patient_email: Email do paciente
         appointment_datetime: Data/hora do atendimento (formato: "2024-11-23T10:00:00")
         title: Título do evento
+        request_id: ID idempotente do pedido de conferência
+        event_id: ID do evento definido pelo cliente; se o evento já existir
+            (nova tentativa), o evento existente é retornado
     
     Returns:
         dict com detalhes do evento e link do Google Meet
     """
     try:
-        credentials = get_google_credentials()
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # Converter string para datetime
-        appointment_time = datetime.fromisoformat(appointment_datetime)
-        end_time = appointment_time + timedelta(hours=1)  # 1 hora de duração
-        
-        event = {
-            'summary': title,
-            'description': f'Teleatendimento entre {therapist_email} e {patient_email}',
-            'start': {
-                'dateTime': appointment_time.isoformat(),
-                'timeZone': 'America/Sao_Paulo'
-            },
-            'end': {
-                'dateTime': end_time.isoformat(),
-                'timeZone': 'America/Sao_Paulo'
-            },
-            'attendees': [
-                {'email': therapist_email},
-                {'email': patient_email}
-            ],
-            'conferenceData': {
-                'createRequest': {
-                    'requestId': f'sinergia-{datetime.now().timestamp()}',
-                    'conferenceSolutionKey': {
-                        'type': 'hangoutsMeet'
-                    }
-                }
-            }
-        }
+        service = calendar_client.service()
+        event = build_meet_event_body(
+            therapist_email, patient_email, appointment_datetime, title, request_id=request_id, event_id=event_id
+        )
         
         # Criar evento
-        created_event = service.events().insert(
-            calendarId='primary',
-            body=event,
-            conferenceDataVersion=1
-        ).execute()
+        try:
+            created_event = calendar_client.execute(service.events().insert(
+                calendarId='primary',
+                body=event,
+                conferenceDataVersion=1
+            ))
+        except HttpError as e:
+            if not event_id or e.resp.status != 409:
+                raise
+            # Já criado em uma tentativa anterior
+            created_event = calendar_client.execute(service.events().get(
+                calendarId='primary',
+                eventId=event_id
+            ))
         
-        return {
-            'event_id': created_event.get('id'),
-            'title': created_event.get('summary'),
-            'start': created_event.get('start'),
-            'end': created_event.get('end'),
-            'meet_link': created_event.get('conferenceData', {}).get('entryPoints', [{}])[0].get('uri'),
-            'hangout_link': created_event.get('hangoutLink')
-        }
+        return summarize_meet_event(created_event)
     
     except Exception as e:
-        print(f"Erro ao criar evento do Google Meet: {str(e)}")
+        logger.error("Erro ao criar evento do Google Meet: %s", e)
         raise
 
+def _build_event_batches(events: dict, results: dict) -> list:
+    service = calendar_client.service()
+    
+    def callback(request_id, response, exception):
+        results[request_id] = exception if exception is not None else summarize_meet_event(response)
+    
+    keys = list(events)
+    batches = []
+    for offset in range(0, len(keys), CALENDAR_BATCH_LIMIT):
+        chunk = keys[offset:offset + CALENDAR_BATCH_LIMIT]
+        batch = calendar_client.new_batch(callback)
+        for key in chunk:
+            batch.add(
+                service.events().insert(calendarId='primary', body=events[key], conferenceDataVersion=1),
+                request_id=str(key)
+            )
+        batches.append((chunk, batch))
+    return batches
+
+def _batch_failed(chunk: list, results: dict, e: Exception):
+    # Falha do batch inteiro (transporte, timeout, circuito aberto)
+    logger.error("Erro ao criar eventos do Google Meet em lote: %s", e)
+    for key in chunk:
+        results.setdefault(str(key), e)
+
+def create_google_meet_events_batch(events: dict) -> dict:
+    """
+    Criar vários eventos com Google Meet usando requisições batch do Calendar
+    
+    Args:
+        events: dict chave -> corpo do evento (ver build_meet_event_body)
+    
+    Returns:
+        dict chave -> resumo do evento (summarize_meet_event) ou a exceção
+        da respectiva requisição
+    """
+    results = {}
+    for chunk, batch in _build_event_batches(events, results):
+        try:
+            calendar_client.execute(batch)
+        except Exception as e:
+            _batch_failed(chunk, results, e)
+    
+    return {key: results[str(key)] for key in events}
+
+async def create_google_meet_events_batch_async(events: dict) -> dict:
+    """Versão assíncrona de create_google_meet_events_batch; os batches rodam em paralelo"""
+    results = {}
+    batches = _build_event_batches(events, results)
+    outcomes = await asyncio.gather(
+        *[calendar_client.execute_async(batch) for _, batch in batches],
+        return_exceptions=True
+    )
+    for (chunk, _), outcome in zip(batches, outcomes):
+        if isinstance(outcome, Exception):
+            _batch_failed(chunk, results, outcome)
+    
+    return {key: results[str(key)] for key in events}
+
+def get_calendar_call_stats() -> dict:
+    """Métricas do executor das chamadas ao Calendar"""
+    return calendar_calls.stats()
+
+def _calendar_executor_metrics() -> list:
+    stats = calendar_calls.stats()
+    outcomes = ("successes", "failures", "timeouts", "rejected", "short_circuited")
+    return [
+        ("calendar_executor_calls_total", "counter", "Chamadas ao Calendar por resultado no executor dedicado",
+         {(("outcome", key),): stats[key] for key in outcomes}),
+        ("calendar_executor_in_flight", "gauge", "Chamadas ao Calendar em execução ou na fila",
+         {(): stats["in_flight"]}),
+        ("calendar_breaker_open", "gauge", "1 se o circuit breaker do Calendar não está fechado",
+         {(): int(stats["breaker_state"] != "closed")}),
+    ]
+
+registry.add_collector(_calendar_executor_metrics)
+
 def get_google_meet_link(event_id: str):
     """
     Obter o link do Google Meet de um evento existente
@@ -93,18 +398,17 @@ def get_google_meet_link(event_id: str):
         Link do Google Meet
     """
     try:
-        credentials = get_google_credentials()
-        service = build('calendar', 'v3', credentials=credentials)
+        service = calendar_client.service()
         
-        event = service.events().get(
+        event = calendar_client.execute(service.events().get(
             calendarId='primary',
             eventId=event_id
-        ).execute()
+        ))
         
         return event.get('hangoutLink')
     
     except Exception as e:
-        print(f"Erro ao obter link do Google Meet: {str(e)}")
+        logger.error("Erro ao obter link do Google Meet: %s", e)
         raise
 
 def delete_google_meet_event(event_id: str):
@@ -115,16 +419,15 @@ def delete_google_meet_event(event_id: str):
         event_id: ID do evento no Google Calendar
     """
     try:
-        credentials = get_google_credentials()
-        service = build('calendar', 'v3', credentials=credentials)
+        service = calendar_client.service()
         
-        service.events().delete(
+        calendar_client.execute(service.events().delete(
             calendarId='primary',
             eventId=event_id
-        ).execute()
+        ))
         
         return {"message": "Evento deletado com sucesso"}
     
     except Exception as e:
-        print(f"Erro ao deletar evento do Google Meet: {str(e)}")
+        logger.error("Erro ao deletar evento do Google Meet: %s", e)
         raise
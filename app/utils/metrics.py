@@ -0,0 +1,311 @@
+"""
+Métricas de desempenho no formato de texto do Prometheus
+
+Middleware ASGI com latência por rota, requisições em andamento e contagem
+por status; eventos do SQLAlchemy que atribuem consultas e tempo de SQL à
+requisição atual; tempo das chamadas ao Google Calendar; e log das
+requisições lentas com o detalhamento por instrução SQL.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Requisições acima disso vão para o log com o detalhamento do SQL
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_TOP_STATEMENTS = 5
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+# ====== REGISTRO ======
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(items)
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, *label_values, value: float):
+        # Contagem por faixa; as cumulativas são montadas só na exposição
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        lines = self._header()
+        for key, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Métricas do processo e coletores avaliados a cada exposição"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """`collector()` retorna uma lista de (nome, tipo, ajuda, {labels: valor})"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception:
+                logger.exception("Erro ao coletar métricas")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples.items():
+                    names = tuple(k for k, _ in labels)
+                    values = tuple(v for _, v in labels)
+                    lines.append(f"{name}{_format_labels(names, values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Requisições HTTP concluídas", ("method", "route", "status")
+))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route")
+))
+http_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "Requisições HTTP em andamento", ("method",)
+))
+db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Consultas SQL por requisição", ("method", "route"), COUNT_BUCKETS
+))
+db_duration = registry.register(Counter(
+    "db_query_seconds_total", "Tempo gasto em SQL, por rota (background fora de requisições)", ("route",)
+))
+db_query_count = registry.register(Counter(
+    "db_queries_total", "Consultas SQL executadas, por rota (background fora de requisições)", ("route",)
+))
+calendar_duration = registry.register(Histogram(
+    "calendar_api_duration_seconds", "Latência das chamadas ao Google Calendar", ("operation", "outcome")
+))
+
+
+# ====== CONTEXTO DA REQUISIÇÃO ======
+class RequestStats:
+    """Consultas, tempo de SQL e chamadas ao Calendar de uma requisição"""
+
+    __slots__ = ("queries", "sql_seconds", "statements", "calendar_calls", "calendar_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = {}
+        self.calendar_calls = 0
+        self.calendar_seconds = 0.0
+
+    def add_query(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.sql_seconds += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top_statements(self, limit: int = SLOW_REQUEST_TOP_STATEMENTS) -> list:
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {"sql": " ".join(sql.split())[:200], "count": count, "ms": round(seconds * 1000, 2)}
+            for sql, (count, seconds) in ranked[:limit]
+        ]
+
+
+# A thread do threadpool e os greenlets do AsyncSession herdam uma cópia do
+# contexto, que aponta para o mesmo RequestStats
+_current_request = ContextVar("current_request_stats", default=None)
+
+
+def current_request_stats():
+    return _current_request.get()
+
+
+# ====== EVENTOS DO SQLALCHEMY ======
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    stats = _current_request.get()
+    if stats is not None:
+        stats.add_query(statement, elapsed)
+    else:
+        db_query_count.inc("background")
+        db_duration.inc("background", amount=elapsed)
+
+
+def _handle_error(exception_context):
+    # Consulta que falhou: descartar o início sem par
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+if METRICS_ENABLED:
+    # Na classe Engine: vale para todas as engines, inclusive as síncronas
+    # internas das engines assíncronas
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+# ====== CHAMADAS AO CALENDAR ======
+def observe_calendar_call(operation: str, started: float, failed: bool):
+    """Registrar a duração de uma chamada ao Calendar iniciada em `started`"""
+    if not METRICS_ENABLED:
+        return
+    elapsed = time.perf_counter() - started
+    calendar_duration.observe(operation, "error" if failed else "ok", value=elapsed)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.calendar_calls += 1
+        stats.calendar_seconds += elapsed
+
+
+# ====== MIDDLEWARE ======
+class MetricsMiddleware:
+    """
+    Middleware ASGI de latência, status e SQL por rota
+
+    O rótulo da rota é o modelo do caminho (ex.: /api/admin/pacientes/{patient_id}),
+    conhecido só depois do roteamento; caminhos sem rota viram "unmatched".
+    """
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats()
+        token = _current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_progress.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_progress.dec(method)
+            _current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_requests.inc(method, path, status_code)
+            http_duration.observe(method, path, value=elapsed)
+            db_queries.observe(method, path, value=stats.queries)
+            if stats.queries:
+                db_query_count.inc(path, amount=stats.queries)
+                db_duration.inc(path, amount=stats.sql_seconds)
+            if elapsed * 1000 >= self.slow_request_ms:
+                logger.warning(
+                    "Requisição lenta: %s %s -> %s em %.1f ms (%d consultas, %.1f ms de SQL, "
+                    "%d chamadas ao Calendar, %.1f ms); instruções mais lentas: %s",
+                    method, path, status_code, elapsed * 1000, stats.queries, stats.sql_seconds * 1000,
+                    stats.calendar_calls, stats.calendar_seconds * 1000, stats.top_statements()
+                )
+
+
+def render_metrics() -> str:
+    """Todas as métricas no formato de texto do Prometheus"""
+    return registry.render()
@@ -0,0 +1,21 @@
+import base64
+import json
+from fastapi import HTTPException
+
+
+def encode_cursor(*values) -> str:
+    """Codificar a posição da última linha retornada em um cursor opaco"""
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decodificar um cursor gerado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
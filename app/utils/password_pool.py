@@ -0,0 +1,145 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from app.utils.auth import hash_password, verify_password
+
+# Configuração (0 workers = executar no threadpool, sem processos dedicados)
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(os.cpu_count() or 1)))
+# Fixo e abaixo dos 40 tokens do threadpool do anyio: chamadas síncronas (e o
+# modo sem processos) esperam em threads do pool, e uma rajada de logins não
+# pode ocupar todas, qualquer que seja o número de CPUs
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32"))
+PASSWORD_POOL_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_POOL_RETRY_AFTER_SECONDS", "1"))
+# Pool separado para hashes em massa (importações): não enfileira na frente dos logins
+PASSWORD_BULK_WORKERS = int(os.getenv("PASSWORD_BULK_WORKERS", str(os.cpu_count() or 1)))
+
+_executor = None
+_bulk_executor = None
+_lock = threading.Lock()
+_pending = 0
+_stats = {"completed": 0, "rejected": 0}
+
+
+def _noop():
+    return None
+
+
+def start_password_pool():
+    """Criar o pool de processos e iniciar todos os workers"""
+    global _executor
+    with _lock:
+        if _executor is not None or PASSWORD_POOL_WORKERS <= 0:
+            return
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+    # Os processos só são criados sob demanda; forçar a criação na inicialização
+    # evita o custo do fork durante a primeira rajada de logins
+    for future in [_executor.submit(_noop) for _ in range(PASSWORD_POOL_WORKERS)]:
+        future.result()
+
+
+def shutdown_password_pool():
+    """Encerrar os pools de processos"""
+    global _executor, _bulk_executor
+    with _lock:
+        executor, _executor = _executor, None
+        bulk_executor, _bulk_executor = _bulk_executor, None
+    for pool in (executor, bulk_executor):
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _acquire():
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_POOL_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente em instantes",
+                headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER_SECONDS)}
+            )
+        _pending += 1
+
+
+def _release():
+    global _pending
+    with _lock:
+        _pending -= 1
+        _stats["completed"] += 1
+
+
+def _get_executor():
+    if _executor is None and PASSWORD_POOL_WORKERS > 0:
+        start_password_pool()
+    return _executor
+
+
+async def _run_async(fn, *args):
+    _acquire()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(executor.submit(fn, *args))
+    finally:
+        _release()
+
+
+def _run_sync(fn, *args):
+    _acquire()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            return fn(*args)
+        # A thread só espera o resultado; o GIL fica livre para as demais
+        return executor.submit(fn, *args).result()
+    finally:
+        _release()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash de senha no pool de processos"""
+    return await _run_async(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar senha no pool de processos"""
+    return await _run_async(verify_password, plain_password, hashed_password)
+
+
+def hash_password_pooled(password: str) -> str:
+    """Hash de senha no pool de processos, para handlers síncronos"""
+    return _run_sync(hash_password, password)
+
+
+def hash_passwords_bulk(passwords: list) -> list:
+    """
+    Hash de uma lista de senhas distribuído entre processos
+
+    Usa o pool de importação, criado sob demanda, em vez do pool dos logins.
+    """
+    global _bulk_executor
+    if not passwords:
+        return []
+    if PASSWORD_BULK_WORKERS <= 0:
+        return [hash_password(password) for password in passwords]
+    with _lock:
+        if _bulk_executor is None:
+            _bulk_executor = ProcessPoolExecutor(max_workers=PASSWORD_BULK_WORKERS)
+        executor = _bulk_executor
+    chunksize = max(1, len(passwords) // (PASSWORD_BULK_WORKERS * 4))
+    return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+
+def get_password_pool_stats() -> dict:
+    """Estado atual do pool de senhas"""
+    with _lock:
+        return {
+            "workers": PASSWORD_POOL_WORKERS,
+            "max_pending": PASSWORD_POOL_MAX_PENDING,
+            "pending": _pending,
+            **_stats
+        }
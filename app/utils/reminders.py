@@ -0,0 +1,365 @@
+"""
+Lembretes de atendimentos agendados
+
+Os lembretes (REMINDER_OFFSETS antes de cada Appointment.date) ficam em um
+timing wheel em memória, carregado em janelas de REMINDER_WINDOW_SECONDS por
+consultas de intervalo em (status, date); commits da ORM e as escritas em
+massa das rotas atualizam o wheel na hora. Na hora do envio o agendamento é
+relido e o lembrete é reivindicado com uma linha em reminder_deliveries
+antes de chamar o sink (no máximo um envio, mesmo com reinícios ou vários
+processos). Na inicialização, lembretes vencidos há até
+REMINDER_GRACE_SECONDS e ainda sem linha são enviados com atraso.
+
+Appointment.date é hora local ingênua (CALENDAR_TIME_ZONE), então o relógio
+do agendador também é: com UTC os lembretes sairiam horas adiantados.
+"""
+import os
+import re
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.reminder_delivery import ReminderDelivery
+from app.utils.google_meet import local_now
+from app.utils.metrics import registry
+from app.utils.timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "false").lower() == "true"
+# Antecedências separadas por vírgula, ex.: "24h,30m" ou "1h30m"
+REMINDER_OFFSETS = os.getenv("REMINDER_OFFSETS", "24h,30m")
+REMINDER_WINDOW_SECONDS = float(os.getenv("REMINDER_WINDOW_SECONDS", "600"))
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "1"))
+REMINDER_GRACE_SECONDS = float(os.getenv("REMINDER_GRACE_SECONDS", "900"))
+# Linhas de reminder_deliveries mais antigas que isso são removidas
+REMINDER_RETENTION_DAYS = int(os.getenv("REMINDER_RETENTION_DAYS", "7"))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_offsets(value: str) -> list:
+    """Antecedências em minutos, da maior para a menor ("24h,30m" -> [1440, 30])"""
+    offsets = set()
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if not re.fullmatch(r"(\d+h)?(\d+m)?", part):
+            raise ValueError(f"Antecedência inválida: {part}")
+        hours = re.search(r"(\d+)h", part)
+        minutes = re.search(r"(\d+)m", part)
+        offsets.add((int(hours.group(1)) if hours else 0) * 60 + (int(minutes.group(1)) if minutes else 0))
+    return sorted(offsets, reverse=True)
+
+
+def _seconds(value: datetime) -> float:
+    return (value - _EPOCH).total_seconds()
+
+
+# ====== SINKS ======
+class LogReminderSink:
+    """Sink local (substituto do email/WhatsApp): registra o lembrete no log"""
+
+    def send(self, reminder: dict):
+        logger.info(
+            "Lembrete: atendimento %s em %s (%s min antes) para %s e %s",
+            reminder["appointment_id"], reminder["date"], reminder["offset_minutes"],
+            reminder["patient_email"], reminder["therapist_email"]
+        )
+
+
+# ====== AGENDADOR ======
+class ReminderScheduler:
+    """
+    Agendador de lembretes em um timing wheel, com thread própria
+
+    O sink recebe um dict por lembrete (ver _reminder) e pode ser trocado
+    com set_sink(); exceções do sink marcam o lembrete como failed, sem nova
+    tentativa.
+    """
+
+    def __init__(self, session_factory=SessionLocal, offsets: str = REMINDER_OFFSETS,
+                 window: float = REMINDER_WINDOW_SECONDS, tick: float = REMINDER_TICK_SECONDS,
+                 grace: float = REMINDER_GRACE_SECONDS, sink=None, clock=local_now):
+        self._session_factory = session_factory
+        self.offsets = parse_offsets(offsets)
+        self._window = timedelta(seconds=window)
+        self._tick = tick
+        self._grace = timedelta(seconds=grace)
+        self._sink = sink or LogReminderSink()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wheel = None
+        # Lembretes com prazo antes disso já estão no wheel
+        self._horizon = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"loaded": 0, "sent": 0, "failed": 0, "skipped": 0, "duplicates": 0}
+
+    @property
+    def active(self) -> bool:
+        return self._wheel is not None
+
+    def set_sink(self, sink):
+        self._sink = sink
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._wheel) if self._wheel is not None else 0
+
+    # ------ Ciclo de vida ------
+    def start(self):
+        if self._thread is not None:
+            return
+        self.load_window()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            self._wheel = None
+            self._horizon = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                now = self._clock()
+                # Recarregar na metade da janela: pega escritas de outros processos
+                if now + self._window / 2 >= self._horizon:
+                    self.load_window(now)
+                self.run_once(now)
+            except Exception as e:
+                logger.exception("Erro no agendador de lembretes: %s", e)
+            self._stop.wait(self._tick)
+
+    # ------ Carga em janelas ------
+    def load_window(self, now: datetime = None) -> int:
+        """
+        Carregar os lembretes com prazo em [now, now + janela)
+
+        Uma consulta de intervalo por antecedência (índice em (status, date)).
+        Na primeira carga a janela começa REMINDER_GRACE_SECONDS antes. Também
+        remove as linhas de envio além da retenção.
+        """
+        now = now or self._clock()
+        with self._lock:
+            if self._wheel is None:
+                self._wheel = TimingWheel(_seconds(now), tick=self._tick)
+                start = now - self._grace
+            else:
+                start = now
+        end = now + self._window
+
+        db = self._session_factory()
+        try:
+            due = {}
+            for offset in self.offsets:
+                before = timedelta(minutes=offset)
+                rows = db.query(Appointment.id, Appointment.date).filter(
+                    Appointment.status == "scheduled",
+                    Appointment.date >= start + before,
+                    Appointment.date < end + before
+                )
+                for appointment_id, date in rows:
+                    due[(appointment_id, offset)] = date - before
+            claimed = set(db.execute(
+                select(ReminderDelivery.appointment_id, ReminderDelivery.offset_minutes, ReminderDelivery.due_at)
+                .where(ReminderDelivery.due_at >= start, ReminderDelivery.due_at < end)
+            ).all())
+            db.execute(delete(ReminderDelivery).where(
+                ReminderDelivery.due_at < now - timedelta(days=REMINDER_RETENTION_DAYS)
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+        loaded = 0
+        with self._lock:
+            for (appointment_id, offset), due_at in due.items():
+                if (appointment_id, offset, due_at) in claimed:
+                    continue
+                self._wheel.schedule((appointment_id, offset), _seconds(due_at), due_at)
+                loaded += 1
+            self._horizon = end if self._horizon is None else max(self._horizon, end)
+        self.stats["loaded"] += loaded
+        return loaded
+
+    # ------ Ganchos de escrita ------
+    def appointments_changed(self, changes):
+        """
+        Atualizar o wheel com (id, date, status) de agendamentos gravados
+
+        Chamado depois do commit. Lembretes além da janela carregada ficam
+        para a carga da janela correspondente; os que já passaram (ex.: o de
+        24h de um atendimento marcado para daqui a 1h) não são enviados.
+        """
+        now = self._clock()
+        with self._lock:
+            if self._wheel is None:
+                return
+            for appointment_id, date, status in changes:
+                for offset in self.offsets:
+                    key = (appointment_id, offset)
+                    due_at = date - timedelta(minutes=offset) if date is not None else None
+                    if status == "scheduled" and due_at is not None and now <= due_at < self._horizon:
+                        self._wheel.schedule(key, _seconds(due_at), due_at)
+                    else:
+                        self._wheel.cancel(key)
+
+    # ------ Envio ------
+    def run_once(self, now: datetime = None) -> int:
+        """Avançar o wheel até `now` e enviar os lembretes vencidos; retorna quantos"""
+        now = now or self._clock()
+        with self._lock:
+            if self._wheel is None:
+                return 0
+            expired = self._wheel.advance(_seconds(now))
+        if not expired:
+            return 0
+        return self._deliver(dict(expired), now)
+
+    def _deliver(self, expired: dict, now: datetime) -> int:
+        db = self._session_factory()
+        try:
+            # Reler os agendamentos: cancelados ou movidos depois da carga
+            appointments = {
+                a.id: a for a in db.query(Appointment).options(
+                    joinedload(Appointment.therapist), joinedload(Appointment.patient)
+                ).filter(Appointment.id.in_({appointment_id for appointment_id, _ in expired}))
+            }
+            reminders = []
+            for (appointment_id, offset), due_at in expired.items():
+                appointment = appointments.get(appointment_id)
+                current_due = appointment.date - timedelta(minutes=offset) if appointment and appointment.date else None
+                if appointment is None or appointment.status != "scheduled" or current_due != due_at:
+                    self.stats["skipped"] += 1
+                    if appointment is not None and appointment.status == "scheduled" and current_due is not None:
+                        # Movido por outro processo: reagendar no novo prazo
+                        self.appointments_changed([(appointment_id, appointment.date, appointment.status)])
+                    continue
+                reminders.append(_reminder(appointment, offset, due_at))
+
+            claimed = self._claim(db, reminders, now)
+            # Envios fora de transação: o sink faz I/O externo e a conexão de
+            # escrita (e a trava do SQLite) não pode ficar presa durante o lote
+            outcomes = []
+            for reminder in claimed:
+                try:
+                    self._sink.send(reminder)
+                    outcomes.append({"id": reminder["delivery_id"], "status": "sent", "sent_at": self._clock(), "error": None})
+                except Exception as e:
+                    logger.error("Erro ao enviar lembrete do atendimento %s: %s", reminder["appointment_id"], e)
+                    outcomes.append({"id": reminder["delivery_id"], "status": "failed", "sent_at": None, "error": str(e)[:1000]})
+            if outcomes:
+                # UPDATE em massa por chave primária, em uma transação curta
+                db.execute(update(ReminderDelivery), outcomes)
+                db.commit()
+            sent = sum(1 for outcome in outcomes if outcome["status"] == "sent")
+            self.stats["sent"] += sent
+            self.stats["failed"] += len(claimed) - sent
+            return sent
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, reminders: list, now: datetime) -> list:
+        """Gravar as linhas de envio antes do sink; lembretes já reivindicados são descartados"""
+        if not reminders:
+            return []
+        keys = [(r["appointment_id"], r["offset_minutes"], r["due_at"]) for r in reminders]
+        try:
+            ids = db.execute(
+                insert(ReminderDelivery).returning(ReminderDelivery.id, sort_by_parameter_order=True),
+                [{"appointment_id": a, "offset_minutes": o, "due_at": d, "status": "sending", "created_at": now} for a, o, d in keys]
+            ).scalars().all()
+            db.commit()
+        except IntegrityError:
+            # Outro processo (ou uma passada anterior) já reivindicou algum: um a um
+            db.rollback()
+            ids = []
+            for a, o, d in keys:
+                try:
+                    with db.begin_nested():
+                        ids.append(db.execute(insert(ReminderDelivery).values(
+                            appointment_id=a, offset_minutes=o, due_at=d, status="sending", created_at=now
+                        ).returning(ReminderDelivery.id)).scalar_one())
+                except IntegrityError:
+                    ids.append(None)
+                    self.stats["duplicates"] += 1
+            db.commit()
+        claimed = []
+        for reminder, delivery_id in zip(reminders, ids):
+            if delivery_id is not None:
+                claimed.append({**reminder, "delivery_id": delivery_id})
+        return claimed
+
+
+def _reminder(appointment: Appointment, offset: int, due_at: datetime) -> dict:
+    return {
+        "appointment_id": appointment.id,
+        "offset_minutes": offset,
+        "due_at": due_at,
+        "date": appointment.date,
+        "therapist_id": appointment.therapist_id,
+        "therapist_name": appointment.therapist.name if appointment.therapist else None,
+        "therapist_email": appointment.therapist.email if appointment.therapist else None,
+        "patient_id": appointment.patient_id,
+        "patient_name": appointment.patient.name if appointment.patient else None,
+        "patient_email": appointment.patient.email if appointment.patient else None,
+        "meet_link": appointment.google_meet_link,
+    }
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+def _reminder_metrics() -> list:
+    stats = reminder_scheduler.stats
+    return [
+        ("reminders_total", "counter", "Lembretes por resultado",
+         {(("outcome", key),): stats[key] for key in ("sent", "failed", "skipped", "duplicates")}),
+        ("reminders_pending", "gauge", "Lembretes no timing wheel", {(): reminder_scheduler.pending()}),
+    ]
+
+registry.add_collector(_reminder_metrics)
+
+
+# ====== SINCRONIZAÇÃO COM COMMITS DA ORM ======
+@event.listens_for(Session, "after_flush")
+def _collect_reminder_changes(session, flush_context):
+    if not reminder_scheduler.active:
+        return
+    changes = session.info.setdefault("reminder_changes", [])
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            changes.append((obj.id, obj.date, obj.status))
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and session.is_modified(obj):
+            state = inspect(obj)
+            if state.attrs.date.history.has_changes() or state.attrs.status.history.has_changes():
+                changes.append((obj.id, obj.date, obj.status))
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            changes.append((obj.id, None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_reminder_changes(session):
+    changes = session.info.pop("reminder_changes", None)
+    if changes:
+        reminder_scheduler.appointments_changed(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_reminder_changes(session, previous_transaction):
+    session.info.pop("reminder_changes", None)
@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada porque o circuito está aberto"""
+
+
+class BulkheadFullError(Exception):
+    """Chamada rejeitada porque o executor dedicado está saturado"""
+
+
+class CallTimeoutError(Exception):
+    """A chamada excedeu o tempo limite"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por contagem de falhas consecutivas
+
+    Abre após `failure_threshold` falhas seguidas; depois de `cooldown_seconds`
+    passa a meio-aberto e libera uma única chamada de teste, que fecha o
+    circuito se der certo ou o reabre se falhar.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    raise CircuitOpenError("Circuito aberto")
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError("Circuito meio-aberto aguardando chamada de teste")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Chamada de teste que não chegou a rodar: continua meio-aberto"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_ignored(self):
+        """Resultado que não conta como sucesso nem falha (ex.: erro 4xx)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures = 0
+            self._trial_in_flight = False
+
+
+class GuardedExecutor:
+    """
+    Bulkhead com timeout e circuit breaker para chamadas bloqueantes
+
+    As chamadas rodam em um pool próprio de `max_concurrent` threads, com no
+    máximo `max_queue` esperando; além disso são rejeitadas na hora. Assim uma
+    dependência lenta não consome o threadpool que atende as requisições.
+    `is_failure(exc)` decide quais exceções contam para o breaker.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float,
+                 breaker: CircuitBreaker, is_failure=lambda exc: True):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker
+        self._is_failure = is_failure
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"calls": 0, "successes": 0, "failures": 0, "timeouts": 0, "rejected": 0, "short_circuited": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, fn, *args):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("short_circuited")
+            raise
+        with self._lock:
+            if self._in_flight >= self.max_concurrent + self.max_queue:
+                self._counters["rejected"] += 1
+                # Libera a vaga de teste do meio-aberto sem fechar o circuito: com a
+                # dependência travada, as chamadas que expiraram seguem ocupando o pool
+                self.breaker.release_trial()
+                raise BulkheadFullError(f"{self.name}: limite de chamadas simultâneas atingido")
+            self._in_flight += 1
+            self._counters["calls"] += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _record_exception(self, exc: Exception):
+        if self._is_failure(exc):
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_ignored()
+
+    def _record_timeout(self):
+        self._count("timeouts")
+        self.breaker.record_failure()
+
+    def _record_success(self):
+        self._count("successes")
+        self.breaker.record_success()
+
+    def call(self, fn, *args):
+        """Executar `fn` no pool dedicado e aguardar o resultado"""
+        future = self._submit(fn, *args)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            self._record_timeout()
+            raise CallTimeoutError(f"{self.name}: tempo limite de {self.timeout}s excedido")
+        except Exception as e:
+            self._record_exception(e)
+            raise
+        self._record_success()
+        return result
+
+    async def call_async(self, fn, *args):
+        """Como call(), sem ocupar thread do chamador enquanto espera"""
+        future = self._submit(fn, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._record_timeout()
+            raise CallTimeoutError(f"{self.name}: tempo limite de {self.timeout}s excedido")
+        except Exception as e:
+            self._record_exception(e)
+            raise
+        self._record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = self._in_flight
+        stats["max_concurrent"] = self.max_concurrent
+        stats["max_queue"] = self.max_queue
+        stats["breaker_state"] = self.breaker.state
+        stats["breaker_times_opened"] = self.breaker.times_opened
+        return stats
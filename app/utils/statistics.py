@@ -0,0 +1,248 @@
+import os
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import event, func, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal, ReadSessionLocal
+from app.database.upsert import upsert_increments
+from app.models.appointment import Appointment
+from app.models.archived_appointment import ArchivedAppointment
+from app.models.stat_counter import StatCounter
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Reconciliação periódica dos contadores com as tabelas de origem; desligada
+# por padrão: habilitar em um único processo
+STATS_RECONCILE_ENABLED = os.getenv("STATS_RECONCILE_ENABLED", "false").lower() == "true"
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+USER_ROLE_PREFIX = "users:role:"
+APPOINTMENT_STATUS_PREFIX = "appointments:status:"
+APPOINTMENT_MONTH_PREFIX = "appointments:month:"
+
+
+def _month_key(date) -> str:
+    return date.strftime("%Y-%m") if date else None
+
+
+def user_counter_keys(role) -> list:
+    return [USER_ROLE_PREFIX + role] if role else []
+
+
+def appointment_counter_keys(status, date) -> list:
+    keys = []
+    if status:
+        keys.append(APPOINTMENT_STATUS_PREFIX + status)
+    if date:
+        keys.append(APPOINTMENT_MONTH_PREFIX + _month_key(date))
+    return keys
+
+
+def adjust_counters(connection, deltas: dict):
+    """
+    Somar deltas aos contadores na conexão/transação informada
+
+    Caminhos de escrita em massa (insert()/update() do Core), que não passam
+    pelos eventos do mapper, devem chamar esta função com os seus deltas.
+    """
+    upsert_increments(connection, StatCounter, "value", deltas)
+
+
+def _history_change(target, attribute: str):
+    """(valor antigo, valor novo) se o atributo mudou neste flush"""
+    history = inspect(target).attrs[attribute].history
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+
+# ====== EVENTOS DO MAPPER ======
+# Sem histórico ativo, atribuir a um objeto expirado (ex.: depois de um
+# commit) não carrega o valor antigo, e o contador dele não seria decrementado
+@event.listens_for(User.role, "set", active_history=True)
+@event.listens_for(Appointment.status, "set", active_history=True)
+@event.listens_for(Appointment.date, "set", active_history=True)
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(User, "after_insert")
+def _user_inserted(mapper, connection, target):
+    adjust_counters(connection, Counter(user_counter_keys(target.role)))
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    adjust_counters(connection, {key: -1 for key in user_counter_keys(target.role)})
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    change = _history_change(target, "role")
+    if change:
+        deltas = Counter(user_counter_keys(change[1]))
+        deltas.subtract(user_counter_keys(change[0]))
+        adjust_counters(connection, deltas)
+
+
+@event.listens_for(Appointment, "after_insert")
+def _appointment_inserted(mapper, connection, target):
+    adjust_counters(connection, Counter(appointment_counter_keys(target.status, target.date)))
+
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    adjust_counters(connection, {key: -1 for key in appointment_counter_keys(target.status, target.date)})
+
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    status_change = _history_change(target, "status")
+    date_change = _history_change(target, "date")
+    if not status_change and not date_change:
+        return
+    old_status, new_status = status_change or (target.status, target.status)
+    old_date, new_date = date_change or (target.date, target.date)
+    deltas = Counter(appointment_counter_keys(new_status, new_date))
+    deltas.subtract(appointment_counter_keys(old_status, old_date))
+    adjust_counters(connection, deltas)
+
+
+# ====== LEITURA E RECONCILIAÇÃO ======
+def _counter_queries(dialect_name: str) -> list:
+    """(chave, contagem) de cada contador, por GROUP BY nas tabelas de origem"""
+    def month(column):
+        if dialect_name == "sqlite":
+            return func.strftime("%Y-%m", column)
+        return func.to_char(column, "YYYY-MM")
+
+    queries = [select(literal(USER_ROLE_PREFIX) + User.role, func.count(User.id)).group_by(User.role)]
+    # Agendamentos arquivados continuam nas estatísticas
+    for model in (Appointment, ArchivedAppointment):
+        queries.append(
+            select(literal(APPOINTMENT_STATUS_PREFIX) + model.status, func.count(model.id)).group_by(model.status)
+        )
+        queries.append(
+            select(literal(APPOINTMENT_MONTH_PREFIX) + month(model.date), func.count(model.id))
+            .where(model.date.isnot(None)).group_by(month(model.date))
+        )
+    return queries
+
+
+def compute_counters(db: Session) -> dict:
+    """Recalcular todos os contadores a partir das tabelas (GROUP BY)"""
+    counters = {}
+    for key, count in db.execute(union_all(*_counter_queries(db.get_bind().dialect.name))):
+        # Perfil ou status nulo não tem contador
+        if key is not None:
+            counters[key] = counters.get(key, 0) + count
+    return counters
+
+
+def counter_drift(db: Session) -> dict:
+    """
+    Diferença entre os valores recalculados e os contadores (chave -> delta)
+
+    Contagens e contadores saem de uma única instrução, portanto do mesmo
+    snapshot, e a consulta pode rodar na sessão de leitura: a divergência
+    não muda com as escritas concorrentes, que atualizam linhas e contadores
+    na mesma transação.
+    """
+    expected = union_all(*_counter_queries(db.get_bind().dialect.name)).subquery()
+    rows = db.execute(union_all(
+        select(literal(1), expected.c[0], expected.c[1]),
+        select(literal(-1), StatCounter.key, StatCounter.value)
+    ))
+    drift = Counter()
+    for sign, key, count in rows:
+        if key is not None:
+            drift[key] += sign * count
+    return {key: delta for key, delta in drift.items() if delta}
+
+
+def correct_counters(db: Session, drift: dict):
+    """Aplicar a divergência como delta (curto: só o upsert na trava de escrita)"""
+    if drift:
+        adjust_counters(db.connection(), drift)
+    db.commit()
+
+
+def reconcile_counters(db: Session, read_db: Session = None) -> dict:
+    """
+    Corrigir os contadores pelos valores recalculados; retorna as divergências
+
+    Com read_db, as contagens rodam na sessão de leitura e a sessão de
+    escrita só entra para somar os deltas.
+    """
+    drift = counter_drift(read_db if read_db is not None else db)
+    correct_counters(db, drift)
+    return drift
+
+
+def read_statistics(db: Session) -> dict:
+    """Estatísticas do painel a partir da tabela de contadores"""
+    counters = dict(db.execute(select(StatCounter.key, StatCounter.value)).all())
+
+    def with_prefix(prefix):
+        return {key[len(prefix):]: value for key, value in counters.items() if key.startswith(prefix) and value}
+
+    roles = with_prefix(USER_ROLE_PREFIX)
+    statuses = with_prefix(APPOINTMENT_STATUS_PREFIX)
+    return {
+        "total_users": sum(roles.values()),
+        "total_therapists": roles.get("therapist", 0),
+        "total_patients": roles.get("patient", 0),
+        "total_admins": roles.get("admin", 0),
+        "users_by_role": roles,
+        "total_appointments": sum(statuses.values()),
+        "appointments_by_status": statuses,
+        "appointments_by_month": dict(sorted(with_prefix(APPOINTMENT_MONTH_PREFIX).items()))
+    }
+
+
+class StatsReconciler:
+    """Thread que reconcilia os contadores na inicialização e periodicamente"""
+
+    def __init__(self, session_factory=SessionLocal, read_session_factory=ReadSessionLocal,
+                 interval: float = STATS_RECONCILE_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._read_session_factory = read_session_factory
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = self._session_factory()
+            read_db = self._read_session_factory()
+            try:
+                drift = reconcile_counters(db, read_db)
+                if drift:
+                    logger.info("Contadores de estatísticas reconciliados: %s", drift)
+            except Exception as e:
+                logger.exception("Erro ao reconciliar estatísticas: %s", e)
+            finally:
+                read_db.close()
+                db.close()
+            self._stop.wait(self._interval)
+
+
+stats_reconciler = StatsReconciler()
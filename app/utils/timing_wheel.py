@@ -0,0 +1,81 @@
+class TimingWheel:
+    """
+    Timing wheel hierárquico (não thread-safe; o chamador sincroniza)
+
+    `levels` rodas de `wheel_size` posições: a posição de uma roda do nível n
+    cobre wheel_size ** n ticks. Agendar e cancelar custam O(1); cada tick
+    esvazia uma posição do nível 0, e ao completar uma volta a posição
+    seguinte do nível acima desce (cascata) para os níveis de baixo. Prazos
+    além do alcance (wheel_size ** levels ticks) são recusados: quem agenda
+    carrega os itens distantes mais tarde, em janelas.
+    """
+
+    def __init__(self, start: float, tick: float = 1.0, wheel_size: int = 64, levels: int = 4):
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.current = int(start // tick)
+        self._wheels = [[{} for _ in range(wheel_size)] for _ in range(levels)]
+        # chave -> dict da posição onde o item está
+        self._slots = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    @property
+    def span(self) -> float:
+        """Alcance em segundos a partir do tick atual"""
+        return self.wheel_size ** self.levels * self.tick
+
+    def _place(self, key, due_tick: int, item) -> bool:
+        # Prazo vencido: dispara no próximo tick
+        due_tick = max(due_tick, self.current + 1)
+        delta = due_tick - self.current
+        for level in range(self.levels):
+            if delta < self.wheel_size ** (level + 1):
+                slot = self._wheels[level][(due_tick // self.wheel_size ** level) % self.wheel_size]
+                slot[key] = (due_tick, item)
+                self._slots[key] = slot
+                return True
+        return False
+
+    def schedule(self, key, due: float, item) -> bool:
+        """Agendar (ou reagendar) `key` para o instante `due`; False se além do alcance"""
+        self.cancel(key)
+        return self._place(key, int(due // self.tick), item)
+
+    def cancel(self, key) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        del slot[key]
+        return True
+
+    def advance(self, now: float) -> list:
+        """Avançar até `now`; retorna os (chave, item) vencidos, em ordem de prazo"""
+        target = int(now // self.tick)
+        expired = []
+        while self.current < target:
+            self.current += 1
+            # Cascata de cima para baixo quando a roda de baixo completa a volta
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % self.wheel_size ** level == 0:
+                    slot = self._wheels[level][(self.current // self.wheel_size ** level) % self.wheel_size]
+                    entries = list(slot.items())
+                    slot.clear()
+                    for key, (due_tick, item) in entries:
+                        del self._slots[key]
+                        if due_tick <= self.current:
+                            expired.append((key, item))
+                        else:
+                            self._place(key, due_tick, item)
+            slot = self._wheels[0][self.current % self.wheel_size]
+            if slot:
+                for key, (_, item) in slot.items():
+                    del self._slots[key]
+                    expired.append((key, item))
+                slot.clear()
+        return expired
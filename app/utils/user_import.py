@@ -0,0 +1,182 @@
+import codecs
+import csv
+import json
+import os
+import secrets
+import string
+from collections import Counter
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.schemas.user import UserImportRow
+from app.utils.password_pool import hash_passwords_bulk
+from app.utils.statistics import adjust_counters, user_counter_keys
+from app.utils.collection_versions import bump_versions, user_version_keys
+
+# Linhas por lote: uma consulta IN, um lote de hashes e um executemany por lote
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+def generate_temp_password(length=12):
+    characters = string.ascii_letters + string.digits + "!@#$%"
+    return ''.join(secrets.choice(characters) for _ in range(length))
+
+
+def iter_csv(binary_file):
+    """(linha, dict) de um CSV com cabeçalho, lido em streaming"""
+    text = codecs.getreader("utf-8-sig")(binary_file)
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Colunas vazias contam como ausentes
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, "")}
+
+
+def iter_ndjson(binary_file):
+    """(linha, dict) de um arquivo NDJSON, um objeto por linha"""
+    for line_number, line in enumerate(binary_file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            payload = None
+        yield line_number, payload if isinstance(payload, dict) else ValueError("JSON inválido")
+
+
+def _validate(line_number: int, payload):
+    """UserImportRow ou mensagem de erro"""
+    if isinstance(payload, Exception):
+        return None, str(payload)
+    try:
+        row = UserImportRow(**payload)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return None, f"{field}: {error['msg']}" if field else error["msg"]
+    if row.password_hash and not row.password_hash.startswith(BCRYPT_PREFIXES):
+        return None, "password_hash: não é um hash bcrypt"
+    if row.role == "therapist" and (not row.specialization or not row.crm_or_crp):
+        return None, "Profissional exige specialization e crm_or_crp"
+    return row, None
+
+
+class UserImporter:
+    """
+    Importação em massa de usuários a partir de linhas (linha, dict)
+
+    As linhas são processadas em lotes de IMPORT_BATCH_SIZE: e-mails já
+    cadastrados são descartados com uma consulta IN por lote, as senhas são
+    processadas em paralelo no pool de importação e o lote é gravado com um
+    único executemany e commit.
+    """
+
+    def __init__(self, db: Session, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.seen = set()
+        self.created = 0
+        self.errors = []
+        self.credentials = []
+
+    def _error(self, line_number: int, email, message: str):
+        self.errors.append({"line": line_number, "email": email, "error": message})
+
+    def run(self, rows) -> dict:
+        batch = []
+        total = 0
+        for line_number, payload in rows:
+            total += 1
+            row, error = _validate(line_number, payload)
+            if error:
+                email = payload.get("email") if isinstance(payload, dict) else None
+                self._error(line_number, email, error)
+                continue
+            email = row.email
+            if email in self.seen:
+                self._error(line_number, email, "Email duplicado no arquivo")
+                continue
+            self.seen.add(email)
+            batch.append((line_number, email, row))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return {
+            "processed": total,
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "credentials": self.credentials
+        }
+
+    def _existing_emails(self, emails: list) -> set:
+        return set(self.db.execute(select(User.email).where(User.email.in_(emails))).scalars())
+
+    def _flush(self, batch: list):
+        existing = self._existing_emails([email for _, email, _ in batch])
+        pending = []
+        for line_number, email, row in batch:
+            if email in existing:
+                self._error(line_number, email, "Email já registrado")
+            else:
+                pending.append((line_number, email, row))
+        # Devolver a conexão durante os hashes
+        self.db.rollback()
+
+        temp_passwords = {}
+        to_hash = []
+        for line_number, _, row in pending:
+            if not row.password_hash:
+                password = row.password or temp_passwords.setdefault(line_number, generate_temp_password())
+                to_hash.append(password)
+        hashes = iter(hash_passwords_bulk(to_hash))
+
+        now = datetime.utcnow()
+        values = [
+            {
+                "email": email,
+                "password": row.password_hash or next(hashes),
+                "name": row.name,
+                "role": row.role,
+                "specialization": row.specialization,
+                "crm_or_crp": row.crm_or_crp,
+                "created_at": now,
+            }
+            for _, email, row in pending
+        ]
+        if not values:
+            return
+
+        try:
+            self._insert(values)
+        except IntegrityError:
+            # Cadastro concorrente entre a consulta e o insert: refazer sem eles
+            self.db.rollback()
+            existing = self._existing_emails([v["email"] for v in values])
+            for line_number, email, _ in pending:
+                if email in existing:
+                    self._error(line_number, email, "Email já registrado")
+            kept = [(item, v) for item, v in zip(pending, values) if v["email"] not in existing]
+            pending = [item for item, _ in kept]
+            values = [v for _, v in kept]
+            if values:
+                self._insert(values)
+
+        self.created += len(values)
+        for line_number, email, _ in pending:
+            if line_number in temp_passwords:
+                self.credentials.append({"line": line_number, "email": email, "temporary_password": temp_passwords[line_number]})
+
+    def _insert(self, values: list):
+        self.db.execute(insert(User), values)
+        # insert() em massa não dispara os eventos do mapper
+        adjust_counters(self.db.connection(), Counter(key for v in values for key in user_counter_keys(v["role"])))
+        bump_versions(self.db.connection(), user_version_keys({v["role"] for v in values}))
+        self.db.commit()
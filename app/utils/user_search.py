@@ -0,0 +1,259 @@
+"""
+Busca de usuários por nome e email
+
+Nome e email são comparados "dobrados": minúsculas e sem acentos (joão,
+JOAO e João casam). O resultado vem em duas faixas, paginadas por cursor:
+primeiro os nomes que começam pela busca, em ordem alfabética, depois os
+demais que contêm todos os termos (no nome ou no email), por id.
+
+No SQLite a tabela user_search (chaves dobradas, índice B-tree para o
+prefixo) e a tabela FTS5 user_search_fts (trigramas, para a substring) são
+mantidas por triggers em users, inclusive nas importações em massa do Core.
+Nos demais bancos um índice em memória por prefixo de palavra é recarregado
+quando a versão das listagens de usuários muda, no máximo a cada
+USER_SEARCH_REFRESH_SECONDS.
+"""
+import bisect
+import os
+import re
+import threading
+import time
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, column, select, table, tuple_
+from sqlalchemy.orm import Session
+from app.models.collection_version import CollectionVersion
+from app.models.user import User
+from app.utils.collection_versions import USERS_ROLE_PREFIX
+from app.utils.pagination import encode_cursor, decode_cursor
+
+SEARCH_COLUMNS = (User.id, User.email, User.name, User.role, User.specialization)
+# Trigramas: termos mais curtos só filtram as linhas já encontradas
+MIN_TERM_LENGTH = 3
+# Intervalo mínimo entre recargas do índice em memória (bancos sem FTS5):
+# uma rajada de escritas recarrega a tabela users uma vez, não uma por escrita
+USER_SEARCH_REFRESH_SECONDS = float(os.getenv("USER_SEARCH_REFRESH_SECONDS", "5"))
+
+# Tabela de apoio só do SQLite, fora de Base.metadata (não entra no create_all)
+_metadata = MetaData()
+user_search = Table(
+    "user_search", _metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("role", String),
+    Column("specialization", String),
+    Column("name_key", String),
+    Column("email_key", String),
+    Index("ix_user_search_name_key", "name_key", "user_id"),
+    Index("ix_user_search_role_name_key", "role", "name_key", "user_id"),
+)
+# Tabela virtual FTS5 (criada pela migração 10); a coluna com o nome da
+# tabela é a usada no MATCH
+user_search_fts = table("user_search_fts", column("rowid", Integer), column("user_search_fts"))
+
+# ====== DOBRA DE CAIXA E ACENTOS ======
+# Acentos do português; cada um vira dois replace() aninhados nos triggers da
+# migração 10 (a mudança da dobra exige nova migração para os triggers), e o
+# parser do SQLite recusa expressões aninhadas muito fundo (~30 níveis)
+_ACCENTS = {"a": "áàâã", "e": "éê", "i": "í", "o": "óôõ", "u": "úü", "c": "ç"}
+# Só ASCII e os acentos acima, igual ao lower() do SQLite mais os replace() dos triggers
+_FOLD = {ord(upper): lower for upper, lower in zip("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")}
+for _plain, _accented in _ACCENTS.items():
+    for _char in _accented:
+        _FOLD[ord(_char)] = _plain
+        _FOLD[ord(_char.upper())] = _plain
+
+
+def fold(value: Optional[str]) -> str:
+    return (value or "").translate(_FOLD)
+
+
+def search_terms(q: str) -> list:
+    return fold(q).split()
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Acima de qualquer caractere: fim do intervalo de um prefixo
+_PREFIX_END = "\U0010ffff"
+
+
+def _filtered(query, role: Optional[str], specialization: Optional[str]):
+    if role:
+        query = query.where(user_search.c.role == role)
+    if specialization:
+        query = query.where(user_search.c.specialization == specialization)
+    return query
+
+
+def prefix_query(prefix: str, role: Optional[str], specialization: Optional[str], after: Optional[tuple], limit: int):
+    """Nomes que começam por `prefix` (índice (role, name_key) ou (name_key))"""
+    key = user_search.c.name_key
+    query = select(key, user_search.c.user_id).where(key >= prefix, key < prefix + _PREFIX_END)
+    if after:
+        query = query.where(tuple_(key, user_search.c.user_id) > after)
+    return _filtered(query, role, specialization).order_by(key, user_search.c.user_id).limit(limit)
+
+
+def _sqlite_prefix(db: Session, prefix, role, specialization, after, limit) -> list:
+    return [tuple(row) for row in db.execute(prefix_query(prefix, role, specialization, after, limit))]
+
+
+def _sqlite_contains(db: Session, terms, prefix, role, specialization, after_id, limit) -> list:
+    long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    fts = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+    query = (
+        select(user_search.c.name_key, user_search.c.user_id)
+        .select_from(user_search_fts)
+        .join(user_search, user_search.c.user_id == user_search_fts.c.rowid)
+        .where(user_search_fts.c.user_search_fts.match(fts))
+        .where(user_search_fts.c.rowid > after_id)
+        .where(~user_search.c.name_key.like(_like_escape(prefix) + "%", escape="\\"))
+    )
+    for term in terms:
+        if len(term) < MIN_TERM_LENGTH:
+            pattern = "%" + _like_escape(term) + "%"
+            query = query.where(user_search.c.name_key.like(pattern, escape="\\") | user_search.c.email_key.like(pattern, escape="\\"))
+    query = _filtered(query, role, specialization).order_by(user_search_fts.c.rowid).limit(limit)
+    return [tuple(row) for row in db.execute(query)]
+
+
+# ====== OUTROS BANCOS: ÍNDICE EM MEMÓRIA ======
+_WORD = re.compile(r"[^\W_]+")
+
+
+class UserPrefixIndex:
+    """
+    Índice em memória por prefixo (nome completo e cada palavra do nome/email)
+
+    Recarregado por inteiro quando alguma versão users:role:* muda, o que
+    cobre escritas de outros processos e as importações em massa. As versões
+    são conferidas no máximo a cada USER_SEARCH_REFRESH_SECONDS: nesse
+    intervalo a busca pode não refletir as últimas alterações.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = None
+        self._checked_at = float("-inf")
+        self._users = {}
+        self._names = []
+        self._words = []
+
+    def _current_versions(self, db: Session) -> dict:
+        return dict(db.execute(
+            select(CollectionVersion.key, CollectionVersion.version).where(CollectionVersion.key.like(USERS_ROLE_PREFIX + "%"))
+        ).all())
+
+    def _refresh(self, db: Session):
+        now = time.monotonic()
+        if now - self._checked_at < USER_SEARCH_REFRESH_SECONDS:
+            return
+        self._checked_at = now
+        versions = self._current_versions(db)
+        if versions == self._versions:
+            return
+        users, names, words = {}, [], []
+        for user_id, email, name, role, specialization in db.execute(select(*SEARCH_COLUMNS)):
+            name_key, email_key = fold(name), fold(email)
+            users[user_id] = (role, specialization, name_key, email_key)
+            names.append((name_key, user_id))
+            for word in set(_WORD.findall(name_key) + _WORD.findall(email_key)):
+                words.append((word, user_id))
+        names.sort()
+        words.sort()
+        self._users, self._names, self._words, self._versions = users, names, words, versions
+
+    def _accepts(self, user_id, role, specialization) -> bool:
+        user_role, user_specialization, _, _ = self._users[user_id]
+        return (not role or user_role == role) and (not specialization or user_specialization == specialization)
+
+    def prefix(self, db, prefix, role, specialization, after, limit) -> list:
+        with self._lock:
+            self._refresh(db)
+            start = bisect.bisect_right(self._names, after) if after else bisect.bisect_left(self._names, (prefix,))
+            rows = []
+            for name_key, user_id in self._names[start:]:
+                if not name_key.startswith(prefix) or len(rows) == limit:
+                    break
+                if self._accepts(user_id, role, specialization):
+                    rows.append((name_key, user_id))
+            return rows
+
+    def _word_matches(self, term: str) -> set:
+        start = bisect.bisect_left(self._words, (term,))
+        end = bisect.bisect_left(self._words, (term + _PREFIX_END,))
+        return {user_id for _, user_id in self._words[start:end]}
+
+    def contains(self, db, terms, prefix, role, specialization, after_id, limit) -> list:
+        with self._lock:
+            self._refresh(db)
+            ids = None
+            for term in sorted(terms, key=len, reverse=True):
+                matches = self._word_matches(term)
+                ids = matches if ids is None else ids & matches
+                if not ids:
+                    return []
+            rows = []
+            for user_id in sorted(user_id for user_id in ids if user_id > after_id):
+                name_key = self._users[user_id][2]
+                if name_key.startswith(prefix) or not self._accepts(user_id, role, specialization):
+                    continue
+                rows.append((name_key, user_id))
+                if len(rows) == limit:
+                    break
+            return rows
+
+
+user_prefix_index = UserPrefixIndex()
+
+
+# ====== BUSCA PAGINADA ======
+def search_users(db: Session, q: str, role: Optional[str] = None, specialization: Optional[str] = None,
+                 cursor: Optional[str] = None, limit: int = 50) -> dict:
+    """
+    Página da busca: {"items": [...], "next_cursor": ...}
+
+    O cursor guarda a faixa (0 = prefixo, 1 = contém), a chave do nome e o
+    id da última linha.
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Informe um termo de busca")
+    prefix = " ".join(terms)
+    tier, after_key, after_id = 0, None, None
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            tier, after_key, after_id = int(values[0]), values[1], int(values[2])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    rows = []
+    if tier == 0:
+        after = (after_key, after_id) if after_id is not None else None
+        if sqlite:
+            found = _sqlite_prefix(db, prefix, role, specialization, after, limit + 1)
+        else:
+            found = user_prefix_index.prefix(db, prefix, role, specialization, after, limit + 1)
+        rows = [(0, name_key, user_id) for name_key, user_id in found]
+    # Só termos de MIN_TERM_LENGTH+ usam o FTS; termos curtos ficam no prefixo
+    if len(rows) <= limit and (not sqlite or any(len(term) >= MIN_TERM_LENGTH for term in terms)):
+        after = after_id if tier == 1 else 0
+        need = limit + 1 - len(rows)
+        if sqlite:
+            found = _sqlite_contains(db, terms, prefix, role, specialization, after, need)
+        else:
+            found = user_prefix_index.contains(db, terms, prefix, role, specialization, after, need)
+        rows += [(1, name_key, user_id) for name_key, user_id in found]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    users = {row.id: row._asdict() for row in db.execute(select(*SEARCH_COLUMNS).where(User.id.in_([r[2] for r in rows])))}
+    last = rows[-1] if rows else None
+    return {
+        "items": [users[user_id] for _, _, user_id in rows if user_id in users],
+        "next_cursor": encode_cursor(last[0], last[1] if last[0] == 0 else None, last[2]) if has_more else None
+    }
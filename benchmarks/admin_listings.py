@@ -0,0 +1,103 @@
+"""
+Benchmark das listagens de profissionais e pacientes do admin
+
+Cada tamanho de tabela de usuários roda em um subprocesso separado:
+
+    python -m benchmarks.admin_listings --users 50000 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SEED_BATCH_SIZE = 20000
+SPECIALIZATIONS = ["Psicólogo", "Médico", "Psiquiatra"]
+
+
+def seed(users: int):
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.models.user import User
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "admin@example.com", "password": "x", "name": "Admin", "role": "admin"}])
+        for offset in range(0, users, SEED_BATCH_SIZE):
+            conn.execute(insert(User), [
+                {
+                    "email": f"user{i}@example.com",
+                    "password": "$2b$12$" + "x" * 53,
+                    "name": f"Usuário {i:07d}",
+                    "role": "therapist" if i % 10 == 0 else "patient",
+                    "specialization": SPECIALIZATIONS[i % 3] if i % 10 == 0 else None,
+                }
+                for i in range(offset, min(users, offset + SEED_BATCH_SIZE))
+            ])
+
+
+def run_worker(users: int, repeat: int) -> dict:
+    from benchmarks.asgi import call, percentile, timed
+    from app.utils.auth import create_access_token
+    from main import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    seed(users)
+    headers = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+
+    async def fetch(path, params):
+        status, _, body = await call(app, "GET", path, params, headers=headers)
+        assert status == 200, body
+        return json.loads(body)
+
+    async def main():
+        # Cursor do meio da tabela para medir uma página profunda
+        page = await fetch("/api/admin/pacientes", {"limit": 500})
+        for _ in range(users // 2000):
+            if not page["next_cursor"]:
+                break
+            page = await fetch("/api/admin/pacientes", {"limit": 500, "cursor": page["next_cursor"]})
+        deep_cursor = page["next_cursor"]
+
+        scenarios = {
+            "professionals_first_page": ("/api/admin/profissionais", {"limit": 50}),
+            "professionals_by_specialization": ("/api/admin/profissionais", {"limit": 50, "specialization": "Médico"}),
+            "patients_first_page": ("/api/admin/pacientes", {"limit": 50}),
+            "patients_deep_page": ("/api/admin/pacientes", {"limit": 50, "cursor": deep_cursor} if deep_cursor else {"limit": 50}),
+            "patients_name_prefix": ("/api/admin/pacientes", {"limit": 50, "q": "Usuário 00001"}),
+        }
+        result = {"users": users}
+        for name, (path, params) in scenarios.items():
+            samples = await timed(lambda: fetch(path, params), repeat)
+            result[name] = {"p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+        return result
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[50000, 500000])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.users[0], args.repeat)))
+        return
+
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.admin_listings", "--worker",
+                 "--users", str(users), "--repeat", str(args.repeat)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark da listagem e do export de agendamentos (paginada, NDJSON e CSV)
+
+Cada tamanho de tabela roda em um subprocesso separado para que o pico de
+RSS medido seja apenas o daquele tamanho:
+
+    python -m benchmarks.appointments_listing --rows 10000 100000 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+SEED_BATCH_SIZE = 10000
+
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.models.appointment import Appointment
+    from app.models.user import User
+
+    start = datetime(2020, 1, 1, 8, 0)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "admin@example.com", "password": "x", "name": "Admin", "role": "admin"}])
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            conn.execute(insert(Appointment), [
+                {
+                    "therapist_id": i % 50 + 1,
+                    "patient_id": i % 2000 + 1000,
+                    "date": start + timedelta(minutes=30 * i),
+                    "status": "scheduled",
+                }
+                for i in range(offset, min(rows, offset + SEED_BATCH_SIZE))
+            ])
+
+
+def run_worker(rows: int, repeat: int) -> dict:
+    from benchmarks.asgi import call, percentile, timed
+    from app.utils.auth import create_access_token
+    from main import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    seed(rows)
+    admin = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+
+    async def first_page():
+        status, _, _ = await call(app, "GET", "/api/appointments/", {"limit": 50})
+        assert status == 200
+
+    async def filtered_page():
+        status, _, _ = await call(app, "GET", "/api/appointments/", {"therapist_id": 7, "limit": 50})
+        assert status == 200
+
+    async def ndjson():
+        status, _, size = await call(app, "GET", "/api/appointments/", headers={"accept": "application/x-ndjson"}, collect=False)
+        assert status == 200 and size > 0
+
+    async def export_csv():
+        status, _, size = await call(app, "GET", "/api/appointments/export", headers=admin, collect=False)
+        assert status == 200 and size > 0
+
+    async def export_csv_gzip():
+        status, _, size = await call(app, "GET", "/api/appointments/export", {"gzip": "true"}, headers=admin, collect=False)
+        assert status == 200 and size > 0
+
+    async def main():
+        result = {"rows": rows}
+        scenarios = [
+            ("page", first_page, repeat),
+            ("filtered_page", filtered_page, repeat),
+            ("ndjson_full", ndjson, 3),
+            ("export_csv", export_csv, 3),
+            ("export_csv_gzip", export_csv_gzip, 3),
+        ]
+        for name, factory, n in scenarios:
+            samples = await timed(factory, n)
+            result[name] = {"p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+        return result
+
+    result = asyncio.run(main())
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.rows[0], args.repeat)))
+        return
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.appointments_listing", "--worker",
+                 "--rows", str(rows), "--repeat", str(args.repeat)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Arquivamento de agendamentos: duração dos lotes e escritas concorrentes
+
+Popula a clínica sintética com --years de histórico, arquiva tudo além de
+--after-days em lotes de --batch-size enquanto uma thread cria agendamentos
+sem parar, e relata a duração dos lotes (tempo com a trava de escrita), a
+latência das escritas concorrentes comparada à do banco ocioso, o tamanho
+da tabela quente antes e depois e o tempo de algumas consultas:
+
+    python -m benchmarks.archival --therapists 50 --years 5 --after-days 365
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def seed(args):
+    from app.database.migrate import upgrade
+    from benchmarks.synthetic import seed_clinic
+
+    upgrade()
+    seed_clinic(therapists=args.therapists, patients=args.therapists * 40, years=args.years, sessions_per_week=20)
+
+
+def run_worker(args) -> dict:
+    from sqlalchemy import func, select
+    from app.database.connection import SessionLocal, ReadSessionLocal
+    from app.models.appointment import Appointment
+    from app.models.archived_appointment import ArchivedAppointment
+    from app.utils.archive import archive_batch
+    from benchmarks.asgi import percentile
+
+    def timed_queries() -> dict:
+        db = ReadSessionLocal()
+        try:
+            queries = {
+                "count_completed": select(func.count(Appointment.id)).where(Appointment.status == "completed"),
+                "agenda_therapist_90d": select(Appointment.id).where(
+                    Appointment.therapist_id == 2, Appointment.date >= datetime.utcnow() - timedelta(days=90)
+                ),
+            }
+            result = {}
+            for name, query in queries.items():
+                started = time.perf_counter()
+                for _ in range(5):
+                    db.execute(query).all()
+                result[name + "_ms"] = round((time.perf_counter() - started) * 200, 2)
+            return result
+        finally:
+            db.close()
+
+    def hot_rows() -> int:
+        db = ReadSessionLocal()
+        try:
+            return db.scalar(select(func.count(Appointment.id)))
+        finally:
+            db.close()
+
+    writes = []
+    stop = threading.Event()
+
+    def writer():
+        # Um agendamento por vez em datas futuras distintas, pela ORM
+        base = datetime(2040, 1, 1)
+        n = 0
+        while not stop.is_set():
+            n += 1
+            db = SessionLocal()
+            started = time.perf_counter()
+            db.add(Appointment(therapist_id=args.therapists + 1, patient_id=args.therapists + 2, date=base + timedelta(hours=n)))
+            db.commit()
+            writes.append((time.perf_counter() - started) * 1000)
+            db.close()
+            time.sleep(0.005)
+
+    before = {"hot_rows": hot_rows(), **timed_queries()}
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(1.0)
+    idle = list(writes)
+    writes.clear()
+
+    cutoff = datetime.utcnow() - timedelta(days=args.after_days)
+    batches = []
+    started = time.perf_counter()
+    db = SessionLocal()
+    while True:
+        batch_started = time.perf_counter()
+        moved = archive_batch(db, cutoff, args.batch_size)
+        if moved:
+            batches.append((time.perf_counter() - batch_started) * 1000)
+        if moved < args.batch_size:
+            break
+        time.sleep(args.pause)
+    db.close()
+    archive_s = time.perf_counter() - started
+    stop.set()
+    thread.join()
+
+    db = ReadSessionLocal()
+    archived = db.scalar(select(func.count(ArchivedAppointment.id)))
+    db.close()
+    after = {"hot_rows": hot_rows(), **timed_queries()}
+    return {
+        "archived": archived,
+        "archive_s": round(archive_s, 2),
+        "batches": len(batches),
+        "batch_p50_ms": round(percentile(batches, 50), 2),
+        "batch_p99_ms": round(percentile(batches, 99), 2),
+        "batch_max_ms": round(max(batches), 2) if batches else 0,
+        "write_idle_p99_ms": round(percentile(idle, 99), 2),
+        "write_during_archive_p50_ms": round(percentile(writes, 50), 2),
+        "write_during_archive_p99_ms": round(percentile(writes, 99), 2),
+        "write_during_archive_max_ms": round(max(writes), 2) if writes else 0,
+        "before": before,
+        "after": after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--therapists", type=int, default=50)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--after-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.05)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args)
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    forwarded = ["--therapists", str(args.therapists), "--years", str(args.years), "--after-days", str(args.after_days),
+                 "--batch-size", str(args.batch_size), "--pause", str(args.pause)]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", OUTBOX_WORKER_ENABLED="false")
+        subprocess.run([sys.executable, "-m", "benchmarks.archival", "--seed", *forwarded], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.archival", "--worker", *forwarded],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
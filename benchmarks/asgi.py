@@ -0,0 +1,74 @@
+import asyncio
+import time
+from urllib.parse import urlencode
+
+
+async def call(app, method: str, path: str, params: dict = None, headers: dict = None, body: bytes = b"", collect: bool = True):
+    """
+    Executar uma requisição diretamente na aplicação ASGI, sem rede
+
+    Args:
+        collect: se False, o corpo é descartado e só o número de bytes é retornado
+
+    Returns:
+        (status, headers, corpo ou tamanho do corpo) da resposta
+    """
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if body:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params or {}, doseq=True).encode(),
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+    response_headers = {}
+    chunks = []
+    size = 0
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, response_headers, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if collect:
+                chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks) if collect else size
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Percentil por vizinho mais próximo de uma lista de amostras"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def timed(coro_factory, repeat: int) -> list:
+    """Executar a corrotina `repeat` vezes e retornar as latências em ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
@@ -0,0 +1,145 @@
+"""
+Benchmark das rotas síncronas (threadpool) contra as rotas com AsyncSession
+
+Cada modo (DATABASE_ASYNC=false/true) e número de conexões roda em um
+subprocesso separado, com clientes concorrentes por --duration segundos
+(listagens de agendamentos e pacientes e 10% de criações):
+
+    python -m benchmarks.async_engine --connections 50 200 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SEED_APPOINTMENTS = 50000
+SEED_PATIENTS = 5000
+THERAPISTS = 200
+WRITE_RATIO = 0.1
+
+
+def seed():
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.database.migrate import upgrade
+    from app.models.appointment import Appointment
+    from app.models.user import User
+
+    upgrade()
+    start = datetime(2025, 1, 6, 8)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "admin@example.com", "password": "x", "name": "Admin", "role": "admin"}])
+        conn.execute(insert(User), [
+            {"email": f"patient{i}@example.com", "password": "x", "name": f"Paciente {i:05d}", "role": "patient"}
+            for i in range(SEED_PATIENTS)
+        ])
+        conn.execute(insert(Appointment), [
+            {
+                "therapist_id": i % THERAPISTS + 1,
+                "patient_id": i % 1000 + 1000,
+                "date": start + timedelta(hours=i // THERAPISTS),
+                "status": "scheduled",
+            }
+            for i in range(SEED_APPOINTMENTS)
+        ])
+
+
+def run_worker(connections: int, duration: float) -> dict:
+    from benchmarks.asgi import call, percentile
+    from app.database.connection import DATABASE_ASYNC, async_engine, async_read_engine
+    from app.utils.auth import create_access_token
+    from main import app
+
+    headers = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+    samples = {"read": [], "write": []}
+    errors = {}
+    base = datetime(2030, 1, 1)
+
+    async def client(n: int):
+        rng = random.Random(n)
+        hour = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            roll = rng.random()
+            kind = "write" if roll < WRITE_RATIO else "read"
+            try:
+                if kind == "write":
+                    hour += 2
+                    params = {"therapist_id": 10000 + n, "patient_id": 1000, "date": (base + timedelta(hours=hour)).isoformat()}
+                    status, _, _ = await call(app, "POST", "/api/appointments/", params, collect=False)
+                elif roll < 0.55:
+                    params = {"therapist_id": rng.randint(1, THERAPISTS), "limit": 50}
+                    status, _, _ = await call(app, "GET", "/api/appointments/", params, collect=False)
+                else:
+                    params = {"limit": 50, "q": f"Paciente {rng.randint(0, 49):02d}"}
+                    status, _, _ = await call(app, "GET", "/api/admin/pacientes", params, headers=headers, collect=False)
+            except Exception as e:
+                status = type(e).__name__
+            if status == 200:
+                samples[kind].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    async def main():
+        await asyncio.gather(*[client(n) for n in range(connections)])
+        if DATABASE_ASYNC:
+            # Fecha as conexões do aiosqlite (threads próprias) antes de sair
+            await async_engine.dispose()
+            await async_read_engine.dispose()
+
+    asyncio.run(main())
+    every = samples["read"] + samples["write"]
+    return {
+        "requests_per_second": round(len(every) / duration, 1),
+        "errors": errors,
+        "p50_ms": percentile(every, 50),
+        "p99_ms": percentile(every, 99),
+        "read_p99_ms": percentile(samples["read"], 99),
+        "write_p99_ms": percentile(samples["write"], 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed()
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args.connections[0], args.duration)))
+        return
+
+    for connections in args.connections:
+        for mode in ("false", "true"):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                    DATABASE_ASYNC=mode,
+                    OUTBOX_WORKER_ENABLED="false",
+                    STATS_RECONCILE_INTERVAL_SECONDS="3600",
+                )
+                subprocess.run([sys.executable, "-m", "benchmarks.async_engine", "--seed"], env=env, check=True)
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.async_engine", "--worker",
+                     "--connections", str(connections), "--duration", str(args.duration)],
+                    env=env, check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(json.dumps({"async": mode == "true", "connections": connections, **result}))
+
+
+if __name__ == "__main__":
+    main()
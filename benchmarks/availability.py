@@ -0,0 +1,137 @@
+"""
+Benchmark da busca de horários livres
+
+Cada terapeuta atende de segunda a sexta, das 8h às 18h, com a agenda de um
+ano preenchida na proporção --fill. Cada quantidade de terapeutas roda em
+um subprocesso separado:
+
+    python -m benchmarks.availability --therapists 100 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time as clock
+from datetime import datetime, time, timedelta
+
+SEED_BATCH_SIZE = 20000
+SPECIALIZATIONS = ["Psicólogo", "Médico", "Psiquiatra"]
+DAYS = 365
+
+
+def seed(therapists: int, fill: float) -> datetime:
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.models.appointment import Appointment
+    from app.models.user import User
+    from app.models.working_hours import WorkingHours
+
+    rng = random.Random(42)
+    today = datetime.combine(datetime.utcnow().date() + timedelta(days=1), time())
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "admin@example.com", "password": "x", "name": "Admin", "role": "admin"}])
+        conn.execute(insert(User), [{"email": "patient@example.com", "password": "x", "name": "Paciente", "role": "patient"}])
+        conn.execute(insert(User), [
+            {
+                "email": f"therapist{i}@example.com",
+                "password": "x",
+                "name": f"Terapeuta {i}",
+                "role": "therapist",
+                "specialization": SPECIALIZATIONS[i % 3],
+            }
+            for i in range(therapists)
+        ])
+        therapist_ids = range(3, therapists + 3)
+        conn.execute(insert(WorkingHours), [
+            {"therapist_id": tid, "weekday": weekday, "start_time": time(8), "end_time": time(18)}
+            for tid in therapist_ids for weekday in range(5)
+        ])
+
+        rows = []
+        for tid in therapist_ids:
+            for day in range(DAYS):
+                date = today + timedelta(days=day)
+                if date.weekday() >= 5:
+                    continue
+                for hour in range(8, 18):
+                    if rng.random() < fill:
+                        rows.append({"therapist_id": tid, "patient_id": 2, "date": date.replace(hour=hour), "status": "scheduled"})
+                if len(rows) >= SEED_BATCH_SIZE:
+                    conn.execute(insert(Appointment), rows)
+                    rows = []
+        if rows:
+            conn.execute(insert(Appointment), rows)
+    return today
+
+
+def run_worker(therapists: int, fill: float, repeat: int) -> dict:
+    from benchmarks.asgi import call, percentile, timed
+    from app.utils.auth import create_access_token
+    from main import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    started = clock.perf_counter()
+    today = seed(therapists, fill)
+    seed_seconds = clock.perf_counter() - started
+    headers = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+    year_end = (today + timedelta(days=DAYS)).isoformat()
+
+    async def fetch(params):
+        status, _, body = await call(app, "GET", "/api/availability/slots", params, headers=headers)
+        assert status == 200, body
+        return json.loads(body)
+
+    async def main():
+        result = {"therapists": therapists, "fill": fill, "seed_seconds": round(seed_seconds, 1)}
+        specialization = {"specialization": "Médico", "start": today.isoformat(), "end": year_end, "limit": 20}
+        scenarios = {
+            "therapist_next_10": {"therapist_id": 3, "start": today.isoformat(), "end": year_end, "limit": 10},
+            "therapist_year_200": {"therapist_id": 3, "start": today.isoformat(), "end": year_end, "limit": 200},
+            "specialization_next_20": specialization,
+            "specialization_late_year": {
+                "specialization": "Psicólogo",
+                "start": (today + timedelta(days=DAYS - 30)).isoformat(),
+                "end": year_end,
+                "limit": 50,
+            },
+        }
+        for name, params in scenarios.items():
+            # A primeira busca carrega o índice dos terapeutas envolvidos
+            cold = await timed(lambda: fetch(params), 1)
+            samples = await timed(lambda: fetch(params), repeat)
+            result[name] = {"cold_ms": cold[0], "p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+        return result
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--therapists", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--fill", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.therapists[0], args.fill, args.repeat)))
+        return
+
+    for therapists in args.therapists:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.availability", "--worker",
+                 "--therapists", str(therapists), "--fill", str(args.fill), "--repeat", str(args.repeat)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark do bulkhead/circuit breaker com um Calendar local lento
+
+Dispara criações de Meet em lote contra um servidor que demora `--delay`
+segundos por resposta e mede, ao mesmo tempo, a latência de login e da
+listagem de agendamentos. Com as chamadas ao Google isoladas no executor
+dedicado, essas rotas não devem ficar na fila atrás do Google:
+
+    python -m benchmarks.calendar_bulkhead --delay 3 --storm 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from benchmarks.asgi import call, percentile
+from benchmarks.fake_calendar import FakeCalendarServer
+
+
+async def probe_latencies(app, headers_login, login_body, duration: float) -> dict:
+    samples = {"login": [], "listing": []}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await call(app, "GET", "/api/appointments/", {"limit": 20})
+        samples["listing"].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        await call(app, "POST", "/api/auth/login", headers=headers_login, body=login_body)
+        samples["login"].append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.02)
+    return {
+        name: {"p50_ms": percentile(values, 50), "p99_ms": percentile(values, 99), "samples": len(values)}
+        for name, values in samples.items()
+    }
+
+
+def run(delay: float, storm: int, duration: float) -> dict:
+    with FakeCalendarServer(delay=delay) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("GOOGLE_CALL_TIMEOUT_SECONDS", str(max(0.5, delay / 2)))
+        os.environ.setdefault("BCRYPT_ROUNDS", "6")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["GOOGLE_CREDENTIALS_JSON"] = json.dumps(server.service_account_info())
+        os.environ["GOOGLE_CALENDAR_API_ENDPOINT"] = server.api_endpoint
+        os.environ["OUTBOX_WORKER_ENABLED"] = "false"
+
+        from app.database.connection import SessionLocal
+        from app.models.appointment import Appointment
+        from app.models.user import User
+        from app.utils.auth import create_access_token, hash_password
+        from app.utils.google_meet import get_calendar_call_stats
+        from main import app
+        from app.database.migrate import upgrade
+
+        upgrade()
+        db = SessionLocal()
+        db.add_all([
+            User(email="admin@example.com", password=hash_password("senha123"), name="Admin", role="admin"),
+            User(email="t@example.com", password="x", name="T", role="therapist"),
+            User(email="p@example.com", password="x", name="P", role="patient"),
+        ])
+        db.commit()
+        start = datetime(2025, 1, 6, 8)
+        db.add_all([Appointment(therapist_id=2, patient_id=3, date=start + timedelta(hours=i)) for i in range(storm)])
+        db.commit()
+        db.close()
+
+        token = create_access_token({"sub": "1", "role": "admin"})
+        meet_headers = {"authorization": f"Bearer {token}", "content-type": "application/json"}
+        login_headers = {"content-type": "application/json"}
+        login_body = json.dumps({"email": "admin@example.com", "password": "senha123"}).encode()
+
+        async def main():
+            baseline = await probe_latencies(app, login_headers, login_body, duration)
+            storm_tasks = [
+                asyncio.create_task(call(app, "POST", "/api/google-meet/create-batch", headers=meet_headers,
+                                         body=json.dumps({"appointment_ids": [i + 1]}).encode()))
+                for i in range(storm)
+            ]
+            during = await probe_latencies(app, login_headers, login_body, duration)
+            responses = await asyncio.gather(*storm_tasks)
+            statuses = {}
+            for _, _, body in responses:
+                for item in json.loads(body)["results"]:
+                    key = item["status"] if item["status"] != "error" else item["detail"].split(":")[-1].strip()[:40]
+                    statuses[key] = statuses.get(key, 0) + 1
+            return {"baseline": baseline, "during_storm": during, "meet_results": statuses}
+
+        result = asyncio.run(main())
+        result["calendar_calls"] = get_calendar_call_stats()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=3.0)
+    parser.add_argument("--storm", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.delay, args.storm, args.duration), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Painéis fazendo polling das listagens, com e sem If-None-Match
+
+--clients clientes consultam em laço a agenda de um terapeuta (um por
+cliente), a listagem de profissionais ou a de pacientes, enquanto um escritor
+cria um agendamento para um terapeuta aleatório a cada --write-interval
+segundos. No modo etag os clientes reenviam o último ETag de cada URL. Cada
+modo roda em um subprocesso com banco próprio; relata bytes transferidos,
+respostas 304 e tempo de CPU por requisição:
+
+    python -m benchmarks.etag_polling --clients 32 --duration 10 --write-interval 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+THERAPISTS = 50
+PATIENTS = 2000
+
+
+def seed():
+    from app.database.migrate import upgrade
+    from benchmarks.synthetic import seed_clinic
+
+    upgrade()
+    seed_clinic(therapists=THERAPISTS, patients=PATIENTS, years=1, sessions_per_week=20)
+
+
+def run_worker(mode: str, clients: int, duration: float, write_interval: float) -> dict:
+    from benchmarks.asgi import call, percentile
+    from app.utils.auth import create_access_token
+    from main import app
+
+    admin = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+    # Ids do seed: admin = 1, terapeutas = 2..THERAPISTS + 1
+    therapist_ids = list(range(2, THERAPISTS + 2))
+    samples = []
+    totals = {"requests": 0, "not_modified": 0, "bytes": 0, "writes": 0}
+
+    def feed(n: int):
+        if n % 4 == 0:
+            return "/api/admin/profissionais", {"limit": 100}
+        if n % 4 == 1:
+            return "/api/admin/pacientes", {"limit": 100}
+        return "/api/appointments/", {"therapist_id": therapist_ids[n % THERAPISTS], "limit": 200}
+
+    async def client(n: int, deadline: float):
+        path, params = feed(n)
+        etag = None
+        while time.perf_counter() < deadline:
+            headers = dict(admin)
+            if mode == "etag" and etag:
+                headers["if-none-match"] = etag
+            started = time.perf_counter()
+            status, response_headers, size = await call(app, "GET", path, params, headers=headers, collect=False)
+            samples.append((time.perf_counter() - started) * 1000)
+            totals["requests"] += 1
+            totals["bytes"] += size
+            if status == 304:
+                totals["not_modified"] += 1
+            etag = response_headers.get("etag", etag)
+
+    async def writer(deadline: float):
+        rng = random.Random(7)
+        base = datetime(2035, 1, 1)
+        hour = 0
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(write_interval)
+            hour += 1
+            params = {
+                "therapist_id": rng.choice(therapist_ids),
+                "patient_id": THERAPISTS + 2,
+                "date": (base + timedelta(hours=hour)).isoformat()
+            }
+            status, _, _ = await call(app, "POST", "/api/appointments/", params)
+            totals["writes"] += status == 200
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            # Aquecimento: caches de autenticação e primeira consulta de cada URL
+            await asyncio.gather(*[client(n, time.perf_counter() + 0.5) for n in range(clients)])
+            samples.clear()
+            totals.update({key: 0 for key in totals})
+            deadline = time.perf_counter() + duration
+            cpu_started = time.process_time()
+            await asyncio.gather(writer(deadline), *[client(n, deadline) for n in range(clients)])
+            return time.process_time() - cpu_started
+
+    cpu_seconds = asyncio.run(main())
+    requests = totals["requests"]
+    return {
+        "mode": mode,
+        "requests": requests,
+        "writes": totals["writes"],
+        "not_modified_pct": round(100 * totals["not_modified"] / requests, 1),
+        "megabytes": round(totals["bytes"] / 1e6, 2),
+        "bytes_per_request": round(totals["bytes"] / requests),
+        "cpu_ms_per_request": round(1000 * cpu_seconds / requests, 3),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            OUTBOX_WORKER_ENABLED="false",
+            STATS_RECONCILE_INTERVAL_SECONDS="3600",
+            SLOW_REQUEST_MS="60000",
+        )
+        subprocess.run([sys.executable, "-m", "benchmarks.etag_polling", "--seed"], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.etag_polling", "--worker", mode,
+             "--clients", str(args.clients), "--duration", str(args.duration), "--write-interval", str(args.write_interval)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-interval", type=float, default=0.5)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", choices=["plain", "etag"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed()
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.clients, args.duration, args.write_interval)))
+        return
+
+    for mode in ("plain", "etag"):
+        print(json.dumps(run_mode(mode, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Servidor local que simula a API do Google Calendar v3
+
+Implementa o endpoint de token OAuth e as operações de eventos usadas pela
+aplicação, inclusive a listagem incremental com syncToken. Os eventos ficam
+em memória e cada conexão TCP aceita é contada, para verificar o
+reaproveitamento de conexões keep-alive. move_event/cancel_event simulam
+alterações feitas direto no Google e expire_sync_tokens força o 410.
+"""
+import itertools
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+EVENTS_PATH = "/calendar/v3/calendars/primary/events"
+BATCH_PATH = "/batch/calendar/v3"
+
+
+class FakeCalendarState:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.events = {}
+        self.ids = itertools.count(1)
+        self.counters = {"connections": 0, "token_requests": 0, "api_requests": 0, "batch_requests": 0}
+        # Registro de alterações para o syncToken: id -> (sequência, evento)
+        self.sequence = 0
+        self.changes = {}
+        self.token_generation = 0
+
+    def count(self, key: str):
+        with self.lock:
+            self.counters[key] += 1
+
+    def record(self, event: dict):
+        """Registrar uma alteração do evento (chamar com o lock)"""
+        self.sequence += 1
+        event["updated"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        self.changes[event["id"]] = (self.sequence, event)
+
+    def move_event(self, event_id: str, start: datetime):
+        """Mudar o horário direto no Google (mesma duração)"""
+        with self.lock:
+            event = self.events[event_id]
+            duration = datetime.fromisoformat(event["end"]["dateTime"]) - datetime.fromisoformat(event["start"]["dateTime"])
+            event["start"] = {**event["start"], "dateTime": start.isoformat()}
+            event["end"] = {**event["end"], "dateTime": (start + duration).isoformat()}
+            self.record(event)
+
+    def cancel_event(self, event_id: str):
+        """Excluir direto no Google: o evento fica como cancelled no registro"""
+        with self.lock:
+            event = self.events.pop(event_id)
+            event["status"] = "cancelled"
+            self.record(event)
+
+    def expire_sync_tokens(self):
+        """Tokens já emitidos passam a receber 410"""
+        with self.lock:
+            self.token_generation += 1
+
+    def list_events(self, query: dict):
+        """(status, corpo) de events.list, incremental com syncToken"""
+        max_results = int(query.get("maxResults", ["250"])[0])
+        page_token = query.get("pageToken", [None])[0]
+        with self.lock:
+            if page_token:
+                since, until, offset = (int(v) for v in page_token.split(":"))
+            else:
+                sync_token = query.get("syncToken", [None])[0]
+                since, until, offset = -1, self.sequence, 0
+                if sync_token:
+                    generation, since = (int(v) for v in sync_token.split("-"))
+                    if generation != self.token_generation:
+                        return 410, {"error": {"code": 410, "message": "Sync token is no longer valid, a full sync is required."}}
+            changed = sorted(
+                ((sequence, event) for sequence, event in self.changes.values() if since < sequence <= until),
+                key=lambda item: item[0]
+            )
+            if since < 0:
+                # Sincronização completa: só eventos existentes
+                changed = [(sequence, event) for sequence, event in changed if event["status"] != "cancelled"]
+            items = [json.loads(json.dumps(event)) for _, event in changed[offset:offset + max_results]]
+            next_sync_token = f"{self.token_generation}-{until}"
+        payload = {"kind": "calendar#events", "items": items}
+        if offset + max_results < len(changed):
+            payload["nextPageToken"] = f"{since}:{until}:{offset + max_results}"
+        else:
+            payload["nextSyncToken"] = next_sync_token
+        return 200, payload
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: FakeCalendarState = None
+
+    def setup(self):
+        super().setup()
+        self.state.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _event_id(self):
+        path = self.path.split("?")[0]
+        if not path.startswith(EVENTS_PATH + "/"):
+            return None
+        return path[len(EVENTS_PATH) + 1:]
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path.startswith("/token"):
+            self.state.count("token_requests")
+            return self._send_json(200, {"access_token": f"fake-{time.time()}", "expires_in": 3600, "token_type": "Bearer"})
+
+        if self.path.startswith(BATCH_PATH):
+            return self._handle_batch(body)
+
+        self.state.count("api_requests")
+        time.sleep(self.state.delay)
+        if self.path.split("?")[0] == EVENTS_PATH:
+            event = self.state_insert(json.loads(body or b"{}"))
+            if event is None:
+                return self._send_json(409, {"error": {"code": 409, "message": "The requested identifier already exists."}})
+            return self._send_json(200, event)
+        return self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+
+    def state_insert(self, event: dict) -> dict:
+        with self.state.lock:
+            event_id = event.get("id") or f"evt{next(self.state.ids)}"
+            if event_id in self.state.events:
+                return None
+            link = f"https://meet.google.com/fake-{event_id}"
+            event.update({
+                "id": event_id,
+                "status": "confirmed",
+                "hangoutLink": link,
+                "conferenceData": {"entryPoints": [{"entryPointType": "video", "uri": link}]},
+            })
+            self.state.events[event_id] = event
+            self.state.record(event)
+            return event
+
+    def _handle_batch(self, body: bytes):
+        # Corpo multipart/mixed com uma requisição HTTP serializada por parte
+        self.state.count("batch_requests")
+        time.sleep(self.state.delay)
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        message = BytesParser().parsebytes(header + body)
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, path, _ = request_line.split(" ", 2)
+            inner_body = rest.split("\n\n", 1)[1] if "\n\n" in rest else ""
+            if method == "POST" and path.split("?")[0] == EVENTS_PATH:
+                event = self.state_insert(json.loads(inner_body or "{}"))
+                if event is not None:
+                    status, payload = "200 OK", event
+                else:
+                    status, payload = "409 Conflict", {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            else:
+                status, payload = "404 Not Found", {"error": {"code": 404, "message": "Not Found"}}
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        response = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def do_GET(self):
+        self._read_body()
+        self.state.count("api_requests")
+        time.sleep(self.state.delay)
+        path, _, query = self.path.partition("?")
+        if path == EVENTS_PATH:
+            return self._send_json(*self.state.list_events(parse_qs(query)))
+        event = self.state.events.get(self._event_id())
+        if event is None:
+            return self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+        return self._send_json(200, event)
+
+    def do_DELETE(self):
+        self._read_body()
+        self.state.count("api_requests")
+        time.sleep(self.state.delay)
+        with self.state.lock:
+            event = self.state.events.pop(self._event_id(), None)
+            if event is not None:
+                event["status"] = "cancelled"
+                self.state.record(event)
+        if event is None:
+            return self._send_json(410, {"error": {"code": 410, "message": "Resource has been deleted"}})
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class FakeCalendarServer:
+    """Servidor em thread de fundo; use como context manager"""
+
+    def __init__(self, delay: float = 0.0):
+        self.state = FakeCalendarState(delay)
+        handler = type("Handler", (FakeCalendarHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def api_endpoint(self) -> str:
+        return f"{self.url}/calendar/v3/"
+
+    def service_account_info(self) -> dict:
+        """Credenciais de service account válidas apontando para o token local"""
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode()
+        return {
+            "type": "service_account",
+            "project_id": "fake-project",
+            "private_key_id": "fake-key",
+            "private_key": pem,
+            "client_email": "fake@fake-project.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": f"{self.url}/token",
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,76 @@
+"""
+Benchmark do cliente do Google Calendar contra um servidor local
+
+Compara a criação de eventos construindo credenciais e serviço a cada chamada
+(comportamento antigo) com o cliente compartilhado de app.utils.google_meet:
+
+    python -m benchmarks.google_client --calls 200 --threads 8
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.asgi import percentile
+from benchmarks.fake_calendar import FakeCalendarServer
+
+
+def run(calls: int, threads: int) -> dict:
+    with FakeCalendarServer() as server:
+        info = server.service_account_info()
+        os.environ["GOOGLE_CREDENTIALS_JSON"] = json.dumps(info)
+        os.environ["GOOGLE_CALENDAR_API_ENDPOINT"] = server.api_endpoint
+
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+        from app.utils import google_meet
+
+        def per_call_build():
+            credentials = service_account.Credentials.from_service_account_info(info, scopes=google_meet.CALENDAR_SCOPES)
+            service = build("calendar", "v3", credentials=credentials,
+                            client_options={"api_endpoint": server.api_endpoint})
+            service.events().insert(calendarId="primary", body={"summary": "x"}, conferenceDataVersion=1).execute()
+
+        ids = itertools.count(1)
+
+        def shared_client():
+            n = next(ids)
+            google_meet.create_google_meet_event(
+                "t@example.com", "p@example.com", "2025-01-01T10:00:00",
+                request_id=google_meet.calendar_request_id(n, n), event_id=google_meet.calendar_event_id(n, n)
+            )
+
+        result = {"calls": calls, "threads": threads}
+        for name, fn in [("per_call_build", per_call_build), ("shared_client", shared_client)]:
+            before = dict(server.state.counters)
+            samples = []
+
+            def timed_call(_):
+                start = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(timed_call, range(calls)))
+            elapsed = time.perf_counter() - start
+            result[name] = {
+                "calls_per_sec": calls / elapsed,
+                "p50_ms": percentile(samples, 50),
+                "p99_ms": percentile(samples, 99),
+                **{k: server.state.counters[k] - before[k] for k in before},
+            }
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.threads)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Custo da instrumentação (middleware de métricas e eventos de SQL)
+
+Roda as mesmas requisições sequenciais com METRICS_ENABLED=false e true, cada
+modo em um subprocesso, alternando os modos por --rounds rodadas; compara o
+menor p50 de cada modo, o menos sensível a ruído da máquina:
+
+    python -m benchmarks.instrumentation --repeat 2000 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+SEED_APPOINTMENTS = 20000
+THERAPISTS = 100
+
+
+def seed():
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.database.migrate import upgrade
+    from app.models.appointment import Appointment
+    from app.models.user import User
+
+    upgrade()
+    start = datetime(2025, 1, 6, 8)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "admin@example.com", "password": "x", "name": "Admin", "role": "admin"}])
+        conn.execute(insert(User), [
+            {"email": f"patient{i}@example.com", "password": "x", "name": f"Paciente {i:05d}", "role": "patient"}
+            for i in range(1000)
+        ])
+        conn.execute(insert(Appointment), [
+            {
+                "therapist_id": i % THERAPISTS + 1,
+                "patient_id": i % 1000 + 2,
+                "date": start + timedelta(hours=i // THERAPISTS),
+                "status": "scheduled",
+            }
+            for i in range(SEED_APPOINTMENTS)
+        ])
+
+
+def run_worker(repeat: int) -> dict:
+    from benchmarks.asgi import call, percentile, timed
+    from app.utils.auth import create_access_token
+    from main import app
+
+    headers = {"authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}"}
+    base = datetime(2030, 1, 1)
+    counter = {"hour": 0}
+
+    async def create():
+        counter["hour"] += 2
+        params = {"therapist_id": 5000, "patient_id": 2, "date": (base + timedelta(hours=counter["hour"])).isoformat()}
+        status, _, body = await call(app, "POST", "/api/appointments/", params)
+        assert status == 200, body
+
+    async def fetch(path, params, request_headers=None):
+        status, _, body = await call(app, "GET", path, params, headers=request_headers)
+        assert status == 200, body
+
+    scenarios = {
+        "root": lambda: fetch("/", {}),
+        "appointments_page": lambda: fetch("/api/appointments/", {"therapist_id": 7, "limit": 50}),
+        "patients_page": lambda: fetch("/api/admin/pacientes", {"limit": 50}, headers),
+        "create_appointment": create,
+    }
+
+    async def main():
+        result = {}
+        for name, factory in scenarios.items():
+            await timed(factory, 50)  # aquecimento
+            samples = await timed(factory, repeat)
+            result[name] = {"p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+        return result
+
+    return asyncio.run(main())
+
+
+def run_mode(enabled: str, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            METRICS_ENABLED=enabled,
+            SLOW_REQUEST_MS="60000",
+            OUTBOX_WORKER_ENABLED="false",
+            STATS_RECONCILE_INTERVAL_SECONDS="3600",
+        )
+        subprocess.run([sys.executable, "-m", "benchmarks.instrumentation", "--seed"], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.instrumentation", "--worker", "--repeat", str(repeat)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed()
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args.repeat)))
+        return
+
+    results = {"false": [], "true": []}
+    for _ in range(args.rounds):
+        for enabled in ("false", "true"):
+            results[enabled].append(run_mode(enabled, args.repeat))
+
+    best = {
+        enabled: {name: min(r[name]["p50_ms"] for r in rounds) for name in rounds[0]}
+        for enabled, rounds in results.items()
+    }
+    for name, baseline in best["false"].items():
+        instrumented = best["true"][name]
+        overhead = instrumented - baseline
+        print(json.dumps({
+            "scenario": name,
+            "p50_ms_without": round(baseline, 3),
+            "p50_ms_with": round(instrumented, 3),
+            "overhead_us": round(overhead * 1000, 1),
+            "overhead_pct": round(100 * overhead / baseline, 1),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de rajada de logins com o pool de processos para bcrypt
+
+Para cada número de workers um subprocesso dispara logins concorrentes e,
+ao mesmo tempo, mede a latência de uma rota GET sem relação com senhas:
+
+    python -m benchmarks.login_storm --workers 0 1 2 4 --logins 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_worker(logins: int, concurrency: int) -> dict:
+    from benchmarks.asgi import call, percentile
+    from app.database.connection import SessionLocal
+    from app.models.user import User
+    from app.utils.auth import hash_password
+    from app.utils.password_pool import start_password_pool, get_password_pool_stats
+    from main import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    db = SessionLocal()
+    db.add(User(email="storm@example.com", password=hash_password("senha123"), name="Storm", role="patient"))
+    db.commit()
+    db.close()
+    start_password_pool()
+
+    body = json.dumps({"email": "storm@example.com", "password": "senha123"}).encode()
+    headers = {"content-type": "application/json"}
+
+    async def main():
+        statuses = []
+        get_samples = []
+        done = asyncio.Event()
+
+        async def login_worker(n):
+            for _ in range(n):
+                status, _, _ = await call(app, "POST", "/api/auth/login", headers=headers, body=body)
+                statuses.append(status)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await call(app, "GET", "/api/appointments/", {"limit": 10})
+                get_samples.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        per_worker = max(1, logins // concurrency)
+        await asyncio.gather(*[login_worker(per_worker) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+        return {
+            "logins": len(statuses),
+            "ok": statuses.count(200),
+            "shed_503": statuses.count(503),
+            "logins_per_sec": len(statuses) / elapsed,
+            "get_p50_ms": percentile(get_samples, 50),
+            "get_p99_ms": percentile(get_samples, 99),
+        }
+
+    result = asyncio.run(main())
+    result["pool"] = get_password_pool_stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.logins, args.concurrency)))
+        return
+
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                PASSWORD_POOL_WORKERS=str(workers),
+            )
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.login_storm", "--worker",
+                 "--logins", str(args.logins), "--concurrency", str(args.concurrency)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            print(json.dumps({"workers": workers, **json.loads(output.strip().splitlines()[-1])}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Agendador de lembretes: timing wheel, carga das janelas e envio sem duplicatas
+
+Mede agendar/cancelar/avançar no timing wheel, o tempo de carga de uma
+janela com a clínica sintética (--years de histórico e --future-days de
+agenda) e simula --hours horas com relógio acelerado, reiniciando o
+agendador no meio e com um segundo agendador concorrente no mesmo banco;
+relata lembretes esperados, enviados e duplicados:
+
+    python -m benchmarks.reminders --therapists 50 --years 2 --future-days 60 --hours 48
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def bench_wheel(n: int) -> dict:
+    from app.utils.timing_wheel import TimingWheel
+
+    rng = random.Random(1)
+    wheel = TimingWheel(0.0)
+    dues = [rng.uniform(1, 86400) for _ in range(n)]
+    started = time.perf_counter()
+    for key, due in enumerate(dues):
+        wheel.schedule(key, due, None)
+    schedule_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for key in range(0, n, 2):
+        wheel.cancel(key)
+    cancel_s = time.perf_counter() - started
+    started = time.perf_counter()
+    fired = len(wheel.advance(86400))
+    advance_s = time.perf_counter() - started
+    return {
+        "items": n,
+        "schedule_us": round(1e6 * schedule_s / n, 2),
+        "cancel_us": round(1e6 * cancel_s / (n // 2), 2),
+        "advance_86400_ticks_ms": round(1000 * advance_s, 1),
+        "fired": fired,
+    }
+
+
+def seed(args):
+    from app.database.migrate import upgrade
+    from benchmarks.synthetic import seed_clinic
+
+    upgrade()
+    seed_clinic(therapists=args.therapists, patients=args.therapists * 40, years=args.years,
+                sessions_per_week=20, future_days=args.future_days)
+
+
+def run_worker(args) -> dict:
+    from sqlalchemy import func
+    from app.database.connection import SessionLocal
+    from app.models.appointment import Appointment
+    from app.models.reminder_delivery import ReminderDelivery
+    from app.utils.reminders import ReminderScheduler
+
+    db = SessionLocal()
+    total = db.query(func.count(Appointment.id)).scalar()
+    first = db.query(func.min(Appointment.date)).filter(Appointment.date >= datetime.utcnow()).scalar()
+    db.close()
+
+    sent = []
+
+    class Sink:
+        def send(self, reminder):
+            sent.append((reminder["appointment_id"], reminder["offset_minutes"]))
+
+    clock = {"now": first.replace(minute=0, second=0, microsecond=0)}
+    start = clock["now"]
+    end = start + timedelta(hours=args.hours)
+
+    def make():
+        return ReminderScheduler(offsets="24h,30m", window=600, tick=1, grace=0, sink=Sink(), clock=lambda: clock["now"])
+
+    # Tempo de carga de uma janela (consultas de intervalo por antecedência)
+    probe = make()
+    started = time.perf_counter()
+    loaded = probe.load_window(start)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    # Dois agendadores no mesmo banco; o primeiro "reinicia" no meio
+    schedulers = [make(), make()]
+    for scheduler in schedulers:
+        scheduler.load_window(start)
+    restart_at = start + timedelta(hours=args.hours / 2)
+    restarted = False
+    step = timedelta(seconds=args.step)
+    cpu_started = time.process_time()
+    while clock["now"] < end:
+        clock["now"] += step
+        if not restarted and clock["now"] >= restart_at:
+            schedulers[0] = make()
+            schedulers[0].load_window(clock["now"] - timedelta(seconds=args.step))
+            restarted = True
+        for scheduler in schedulers:
+            if clock["now"] + timedelta(seconds=300) >= scheduler._horizon:
+                scheduler.load_window(clock["now"])
+            scheduler.run_once(clock["now"])
+    cpu_s = time.process_time() - cpu_started
+
+    db = SessionLocal()
+    expected = 0
+    for offset in (1440, 30):
+        expected += db.query(func.count(Appointment.id)).filter(
+            Appointment.status == "scheduled",
+            Appointment.date >= start + timedelta(minutes=offset),
+            Appointment.date <= end + timedelta(minutes=offset)
+        ).scalar()
+    recorded = db.query(func.count(ReminderDelivery.id)).scalar()
+    db.close()
+    return {
+        "appointments": total,
+        "window_loaded": loaded,
+        "window_load_ms": round(load_ms, 2),
+        "simulated_hours": args.hours,
+        "expected": expected,
+        "sent": len(sent),
+        "duplicates": len(sent) - len(set(sent)),
+        "delivery_rows": recorded,
+        "cpu_s": round(cpu_s, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--therapists", type=int, default=50)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--future-days", type=int, default=60)
+    parser.add_argument("--hours", type=float, default=48)
+    parser.add_argument("--step", type=float, default=30, help="passo do relógio simulado, em segundos")
+    parser.add_argument("--wheel-items", type=int, default=200_000)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args)
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    print(json.dumps(bench_wheel(args.wheel_items)))
+    forwarded = ["--therapists", str(args.therapists), "--years", str(args.years),
+                 "--future-days", str(args.future_days), "--hours", str(args.hours), "--step", str(args.step)]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", OUTBOX_WORKER_ENABLED="false")
+        subprocess.run([sys.executable, "-m", "benchmarks.reminders", "--seed", *forwarded], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.reminders", "--worker", *forwarded],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
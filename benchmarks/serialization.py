@@ -0,0 +1,163 @@
+"""
+Custo de serialização das listagens, por 10 mil linhas
+
+Compara, para agendamentos e profissionais, o caminho antigo (objetos do ORM
+passando por jsonable_encoder ou pela validação do response_model e
+json.dumps) com o atual (tuplas de colunas convertidas em dict e serializadas
+pelo orjson). Separa o tempo de carga (consulta + hidratação) do tempo de
+serialização; cada medida é a menor de --repeat execuções:
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.database.migrate import upgrade
+    from app.models.appointment import Appointment
+    from app.models.user import User
+
+    upgrade()
+    start = datetime(2025, 1, 6, 8)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "email": f"therapist{i}@example.com",
+                "password": "$2b$12$" + "x" * 53,
+                "name": f"Terapeuta {i:05d}",
+                "role": "therapist",
+                "specialization": "Psicólogo",
+                "crm_or_crp": f"CRP-{i:06d}",
+                "created_at": start,
+            }
+            for i in range(rows)
+        ])
+        conn.execute(insert(Appointment), [
+            {
+                "therapist_id": i % 100 + 1,
+                "patient_id": i % 1000 + 1,
+                "date": start + timedelta(hours=i),
+                "status": "scheduled",
+                "google_meet_link": f"https://meet.google.com/abc-{i:04d}",
+                "notes": "Sessão de acompanhamento",
+                "created_at": start,
+                "updated_at": start,
+            }
+            for i in range(rows)
+        ])
+
+
+def _legacy_appointment(appointment) -> dict:
+    # Conversão usada pela listagem antes das tuplas de colunas
+    return {
+        "id": appointment.id,
+        "therapist_id": appointment.therapist_id,
+        "patient_id": appointment.patient_id,
+        "date": appointment.date.isoformat() if appointment.date else None,
+        "status": appointment.status,
+        "google_meet_event_id": appointment.google_meet_event_id,
+        "google_meet_link": appointment.google_meet_link,
+        "notes": appointment.notes,
+        "series_id": appointment.series_id,
+        "created_at": appointment.created_at.isoformat() if appointment.created_at else None,
+        "updated_at": appointment.updated_at.isoformat() if appointment.updated_at else None,
+    }
+
+
+def _modes():
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from pydantic import TypeAdapter
+    from app.models.appointment import Appointment
+    from app.models.user import User
+    from app.routes.admin import PROFESSIONAL_COLUMNS
+    from app.routes.appointments import APPOINTMENT_COLUMNS
+    from app.schemas.user import ProfessionalSummary
+
+    professionals = TypeAdapter(list[ProfessionalSummary])
+
+    def validate_professionals(users):
+        # O que o response_model fazia com objetos do ORM
+        return professionals.dump_python(professionals.validate_python(
+            [{c.key: getattr(u, c.key) for c in PROFESSIONAL_COLUMNS} for u in users]
+        ), mode="json")
+
+    # nome: (carga, serialização)
+    return {
+        "appointments_orm_jsonable_encoder": (
+            lambda db: db.query(Appointment).all(),
+            lambda rows: JSONResponse(jsonable_encoder([_legacy_appointment(a) for a in rows])).body,
+        ),
+        "appointments_columns_orjson": (
+            lambda db: db.query(*APPOINTMENT_COLUMNS).all(),
+            lambda rows: ORJSONResponse([row._asdict() for row in rows]).body,
+        ),
+        "professionals_orm_response_model": (
+            lambda db: db.query(User).filter(User.role == "therapist").all(),
+            lambda rows: JSONResponse(validate_professionals(rows)).body,
+        ),
+        "professionals_columns_orjson": (
+            lambda db: db.query(*PROFESSIONAL_COLUMNS).filter(User.role == "therapist").all(),
+            lambda rows: ORJSONResponse([row._asdict() for row in rows]).body,
+        ),
+    }
+
+
+def run(rows: int, repeat: int) -> list:
+    from app.database.connection import SessionLocal
+
+    results = []
+    for name, (load, serialize) in _modes().items():
+        best_load = best_serialize = float("inf")
+        size = 0
+        for _ in range(repeat):
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                loaded = load(db)
+                loaded_at = time.perf_counter()
+                body = serialize(loaded)
+                finished = time.perf_counter()
+            finally:
+                db.close()
+            best_load = min(best_load, loaded_at - started)
+            best_serialize = min(best_serialize, finished - loaded_at)
+            size = len(body)
+        per_10k = 10000 / len(loaded)
+        results.append({
+            "mode": name,
+            "rows": len(loaded),
+            "load_ms_per_10k": round(best_load * 1000 * per_10k, 1),
+            "serialize_ms_per_10k": round(best_serialize * 1000 * per_10k, 1),
+            "total_ms_per_10k": round((best_load + best_serialize) * 1000 * per_10k, 1),
+            "bytes": size,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ.setdefault("METRICS_ENABLED", "false")
+        seed(args.rows)
+        for result in run(args.rows, args.repeat):
+            print(json.dumps(result))
+        from app.database.connection import engine, read_engine
+        engine.dispose()
+        read_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
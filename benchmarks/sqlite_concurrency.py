@@ -0,0 +1,151 @@
+"""
+Benchmark de leituras e escritas concorrentes no SQLite
+
+Vários processos (como workers do uvicorn) usam o mesmo arquivo ao mesmo
+tempo, cada um com --clients clientes concorrentes, por --duration segundos.
+Compara os perfis SQLITE_PROFILE=default e production:
+
+    python -m benchmarks.sqlite_concurrency --processes 4 --clients 16 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SEED_APPOINTMENTS = 50000
+THERAPISTS = 200
+
+
+def seed():
+    from sqlalchemy import insert
+    from app.database.connection import engine
+    from app.database.migrate import upgrade
+    from app.models.appointment import Appointment
+
+    upgrade()
+    start = datetime(2025, 1, 6, 8)
+    with engine.begin() as conn:
+        conn.execute(insert(Appointment), [
+            {
+                "therapist_id": i % THERAPISTS + 1,
+                "patient_id": i % 1000 + 1000,
+                "date": start + timedelta(hours=i // THERAPISTS),
+                "status": "scheduled",
+            }
+            for i in range(SEED_APPOINTMENTS)
+        ])
+
+
+def run_worker(process: int, clients: int, duration: float, write_ratio: float) -> dict:
+    from benchmarks.asgi import call, percentile
+    from main import app
+
+    samples = {"read": [], "write": []}
+    errors = {}
+    # Horários exclusivos por processo/cliente: as escritas não geram 409
+    base = datetime(2030, 1, 1) + timedelta(days=3650 * process)
+
+    async def client(n: int):
+        rng = random.Random(process * 1000 + n)
+        therapist_id = 10000 + process * 1000 + n
+        hour = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    kind = "write"
+                    hour += 2
+                    params = {"therapist_id": therapist_id, "patient_id": 1000, "date": (base + timedelta(hours=hour)).isoformat()}
+                    status, _, _ = await call(app, "POST", "/api/appointments/", params)
+                else:
+                    kind = "read"
+                    params = {"therapist_id": rng.randint(1, THERAPISTS), "limit": 50}
+                    status, _, _ = await call(app, "GET", "/api/appointments/", params)
+            except Exception as e:
+                # Ex.: OperationalError "database is locked" propagado pela aplicação
+                status = type(e).__name__
+            if status == 200:
+                samples[kind].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    async def main():
+        await asyncio.gather(*[client(n) for n in range(clients)])
+
+    asyncio.run(main())
+    return {
+        "reads": len(samples["read"]),
+        "writes": len(samples["write"]),
+        "errors": errors,
+        "read_p99_ms": percentile(samples["read"], 99),
+        "write_p99_ms": percentile(samples["write"], 99),
+    }
+
+
+def run_profile(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            SQLITE_PROFILE=profile,
+            OUTBOX_WORKER_ENABLED="false",
+            STATS_RECONCILE_INTERVAL_SECONDS="3600",
+        )
+        subprocess.run([sys.executable, "-m", "benchmarks.sqlite_concurrency", "--seed"], env=env, check=True)
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.sqlite_concurrency", "--worker", str(p),
+                 "--clients", str(args.clients), "--duration", str(args.duration), "--write-ratio", str(args.write_ratio)],
+                env=env, stdout=subprocess.PIPE, text=True
+            )
+            for p in range(args.processes)
+        ]
+        results = [json.loads(w.communicate()[0].strip().splitlines()[-1]) for w in workers]
+
+    errors = {}
+    for r in results:
+        for key, count in r["errors"].items():
+            errors[key] = errors.get(key, 0) + count
+    return {
+        "profile": profile,
+        "processes": args.processes,
+        "clients_per_process": args.clients,
+        "reads_per_second": round(sum(r["reads"] for r in results) / args.duration, 1),
+        "writes_per_second": round(sum(r["writes"] for r in results) / args.duration, 1),
+        "errors": errors,
+        "read_p99_ms": max(r["read_p99_ms"] for r in results),
+        "write_p99_ms": max(r["write_p99_ms"] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed()
+        return
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.clients, args.duration, args.write_ratio)))
+        return
+
+    for profile in args.profiles:
+        print(json.dumps(run_profile(profile, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Suíte de carga reproduzível dos endpoints principais
+
+Gera a clínica sintética (benchmarks/synthetic.py) em um banco descartável,
+sobe um Calendar local (benchmarks/fake_calendar.py) e exercita cada cenário
+em um subprocesso próprio, com --concurrency clientes por --duration segundos.
+Por padrão a aplicação roda no mesmo processo do gerador de carga; com --http
+cada cenário sobe um uvicorn local e a carga passa pela rede.
+
+Relata vazão, p50/p95/p99, erros e pico de RSS em JSON e, com --baseline,
+compara com um resultado salvo (saída 1 se houver regressão além de
+--tolerance):
+
+    python -m benchmarks.suite --output resultado.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCENARIOS = ("login", "appointments", "admin_patients", "admin_professionals", "statistics", "meet_create")
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+# ====== CENÁRIOS ======
+def load_context() -> dict:
+    """Ids e tokens usados pelos cenários, lidos do banco semeado"""
+    from sqlalchemy import select
+    from app.database.connection import SessionLocal
+    from app.models.appointment import Appointment
+    from app.models.user import User
+    from app.utils.auth import create_access_token
+
+    db = SessionLocal()
+    try:
+        admin_id = db.scalar(select(User.id).where(User.role == "admin"))
+        therapist_ids = list(db.scalars(select(User.id).where(User.role == "therapist")))
+        patients = db.query(User).filter(User.role == "patient").count()
+        meet_ids = list(db.scalars(
+            select(Appointment.id).where(
+                Appointment.status == "scheduled",
+                Appointment.google_meet_event_id.is_(None),
+                Appointment.date >= datetime.utcnow()
+            ).order_by(Appointment.id)
+        ))
+    finally:
+        db.close()
+    return {
+        "admin_headers": {"authorization": f"Bearer {create_access_token({'sub': str(admin_id), 'role': 'admin'})}"},
+        "therapist_ids": therapist_ids,
+        "patients": patients,
+        "meet_ids": meet_ids,
+    }
+
+
+def build_request(scenario: str, rng: random.Random, context: dict, state: dict):
+    """(método, caminho, params, headers, corpo) de uma requisição do cenário"""
+    from benchmarks.synthetic import SPECIALIZATIONS, SYNTHETIC_PASSWORD, patient_email
+
+    json_headers = {"content-type": "application/json"}
+    admin = context["admin_headers"]
+    if scenario == "login":
+        body = {"email": patient_email(rng.randrange(context["patients"])), "password": SYNTHETIC_PASSWORD}
+        return "POST", "/api/auth/login", None, json_headers, json.dumps(body).encode()
+    if scenario == "appointments":
+        params = {"therapist_id": rng.choice(context["therapist_ids"]), "limit": 50}
+        return "GET", "/api/appointments/", params, None, b""
+    if scenario == "admin_patients":
+        return "GET", "/api/admin/pacientes", {"limit": 50}, admin, b""
+    if scenario == "admin_professionals":
+        params = {"limit": 50, "specialization": rng.choice(SPECIALIZATIONS)}
+        return "GET", "/api/admin/profissionais", params, admin, b""
+    if scenario == "statistics":
+        return "GET", "/api/admin/estatisticas", None, admin, b""
+    if scenario == "meet_create":
+        # Um agendamento diferente por requisição; ao esgotar, recomeça (resposta "skipped")
+        ids = context["meet_ids"]
+        appointment_id = ids[state.setdefault("next_meet", 0) % len(ids)]
+        state["next_meet"] += 1
+        body = {"appointment_ids": [appointment_id]}
+        return "POST", "/api/google-meet/create-batch", None, {**admin, **json_headers}, json.dumps(body).encode()
+    raise ValueError(f"Cenário desconhecido: {scenario}")
+
+
+# ====== TRANSPORTES ======
+class InProcessTransport:
+    """Chamadas ASGI diretas, com o lifespan da aplicação ativo"""
+
+    def __init__(self):
+        from main import app
+        self.app = app
+        self._lifespan = None
+
+    async def __aenter__(self):
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._lifespan.__aexit__(*exc)
+
+    async def request(self, method, path, params, headers, body) -> int:
+        from benchmarks.asgi import call
+        status, _, _ = await call(self.app, method, path, params, headers=headers, body=body, collect=False)
+        return status
+
+    def peak_rss_mb(self) -> float:
+        # ru_maxrss em KiB no Linux; inclui o gerador de carga
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class HttpTransport:
+    """Requisições HTTP para um uvicorn local (RSS medido no processo do servidor)"""
+
+    def __init__(self, target: str, server_pid: int):
+        import httpx
+        self.server_pid = server_pid
+        self.client = httpx.AsyncClient(base_url=target, timeout=60, limits=httpx.Limits(max_connections=None))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+    async def request(self, method, path, params, headers, body) -> int:
+        response = await self.client.request(method, path, params=params, headers=headers, content=body or None)
+        return response.status_code
+
+    def peak_rss_mb(self) -> float:
+        with open(f"/proc/{self.server_pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+        return 0.0
+
+
+# ====== EXECUÇÃO ======
+async def run_level(transport, scenario: str, context: dict, concurrency: int, duration: float) -> dict:
+    from benchmarks.asgi import percentile
+
+    samples = []
+    errors = {}
+    state = {}
+
+    async def client(n: int):
+        rng = random.Random(f"{scenario}-{concurrency}-{n}")
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            request = build_request(scenario, rng, context, state)
+            started = time.perf_counter()
+            try:
+                status = await transport.request(*request)
+            except Exception as e:
+                status = type(e).__name__
+            if isinstance(status, int) and 200 <= status < 300:
+                samples.append((time.perf_counter() - started) * 1000)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "peak_rss_mb": transport.peak_rss_mb(),
+    }
+
+
+def run_worker(scenario: str, levels: list, duration: float, target: str = None, server_pid: int = None) -> list:
+    context = load_context()
+    transport = HttpTransport(target, server_pid) if target else InProcessTransport()
+
+    async def main():
+        async with transport:
+            # Aquecimento: conexões, caches e JIT de consultas fora da medição
+            await run_level(transport, scenario, context, 1, min(1.0, duration))
+            return [await run_level(transport, scenario, context, c, duration) for c in levels]
+
+    return asyncio.run(main())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(env: dict):
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    target = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(target + "/", timeout=1)
+            return server, target
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("uvicorn não respondeu em 30s")
+
+
+def run_suite(args) -> dict:
+    from benchmarks.fake_calendar import FakeCalendarServer
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, FakeCalendarServer() as calendar:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+            GOOGLE_CREDENTIALS_JSON=json.dumps(calendar.service_account_info()),
+            GOOGLE_CALENDAR_API_ENDPOINT=calendar.api_endpoint,
+            OUTBOX_WORKER_ENABLED="false",
+            STATS_RECONCILE_INTERVAL_SECONDS="3600",
+            SLOW_REQUEST_MS="60000",
+            LOG_LEVEL="WARNING",
+        )
+        seed_output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.synthetic", "--therapists", str(args.therapists),
+             "--patients", str(args.patients), "--years", str(args.years), "--seed", str(args.seed)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        dataset = json.loads(seed_output.strip().splitlines()[-1])
+
+        for scenario in args.scenarios:
+            server = None
+            command = [sys.executable, "-m", "benchmarks.suite", "--worker", scenario,
+                       "--duration", str(args.duration), "--concurrency", *map(str, args.concurrency)]
+            if args.http:
+                server, target = _start_server(env)
+                command += ["--target", target, "--server-pid", str(server.pid)]
+            try:
+                output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            finally:
+                if server:
+                    server.terminate()
+                    server.wait()
+            results.extend(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "mode": "http" if args.http else "in-process",
+            "dataset": dataset,
+            "duration_seconds": args.duration,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+# ====== COMPARAÇÃO ======
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Diferenças por (cenário, concorrência) em relação ao baseline
+
+    Regressão: vazão abaixo de (1 - tolerance) vezes a do baseline ou p95
+    acima de (1 + tolerance) vezes.
+    """
+    reference = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        base = reference.get((result["scenario"], result["concurrency"]))
+        if base is None:
+            continue
+        throughput_ratio = result["throughput_rps"] / base["throughput_rps"] if base["throughput_rps"] else None
+        p95_ratio = result["p95_ms"] / base["p95_ms"] if base["p95_ms"] else None
+        regressed = (
+            (throughput_ratio is not None and throughput_ratio < 1 - tolerance)
+            or (p95_ratio is not None and p95_ratio > 1 + tolerance)
+        )
+        rows.append({
+            "scenario": result["scenario"],
+            "concurrency": result["concurrency"],
+            "throughput_rps": result["throughput_rps"],
+            "baseline_throughput_rps": base["throughput_rps"],
+            "throughput_ratio": round(throughput_ratio, 3) if throughput_ratio is not None else None,
+            "p95_ms": result["p95_ms"],
+            "baseline_p95_ms": base["p95_ms"],
+            "p95_ratio": round(p95_ratio, 3) if p95_ratio is not None else None,
+            "regression": regressed,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--therapists", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=6)
+    parser.add_argument("--http", action="store_true", help="carga via HTTP em um uvicorn local")
+    parser.add_argument("--output", help="arquivo JSON do resultado")
+    parser.add_argument("--baseline", help="resultado salvo para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    parser.add_argument("--server-pid", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.concurrency, args.duration, args.target, args.server_pid)))
+        return
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    for result in report["results"]:
+        print(json.dumps(result))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        for key in ("mode", "dataset", "duration_seconds", "bcrypt_rounds", "cpus"):
+            expected, actual = baseline["meta"].get(key), report["meta"].get(key)
+            if key == "dataset":
+                expected, actual = [{k: d[k] for k in ("therapists", "patients", "appointments")} for d in (expected, actual)]
+            if expected != actual:
+                print(f"Aviso: {key} difere do baseline ({expected} != {actual}); comparação pouco confiável", file=sys.stderr)
+        rows = compare(report, baseline, args.tolerance)
+        for row in rows:
+            print(json.dumps({"comparison": row}))
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
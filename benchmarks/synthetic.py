@@ -0,0 +1,164 @@
+"""
+Gerador de uma clínica sintética para benchmarks
+
+Insere em massa (insert() do Core, em lotes) um admin, terapeutas com
+horários de atendimento, pacientes e anos de agendamentos, de forma
+determinística a partir de `seed`. Todos os usuários têm a mesma senha
+(SYNTHETIC_PASSWORD) com um único hash bcrypt, calculado uma vez.
+
+    python -m benchmarks.synthetic --therapists 50 --patients 2000 --years 2
+"""
+import argparse
+import json
+import random
+import time as clock
+from datetime import datetime, time, timedelta
+
+SEED_BATCH_SIZE = 20000
+SPECIALIZATIONS = ["Psicólogo", "Médico", "Psiquiatra"]
+SYNTHETIC_PASSWORD = "senha123"
+ADMIN_EMAIL = "admin@example.com"
+# Atendimentos de segunda a sexta, das 8h às 18h (slots de uma hora)
+WORK_START_HOUR = 8
+WORK_END_HOUR = 18
+
+
+def therapist_email(i: int) -> str:
+    return f"therapist{i}@example.com"
+
+
+def patient_email(i: int) -> str:
+    return f"patient{i}@example.com"
+
+
+def _batched(rows, size: int = SEED_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _appointment_rows(rng, therapist_ids: list, patient_ids: list, start: datetime, days: int,
+                      sessions_per_week: int, now: datetime):
+    slots_per_week = 5 * (WORK_END_HOUR - WORK_START_HOUR)
+    fill = min(1.0, sessions_per_week / slots_per_week)
+    for day in range(days):
+        date = start + timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        for therapist_id in therapist_ids:
+            for hour in range(WORK_START_HOUR, WORK_END_HOUR):
+                if rng.random() >= fill:
+                    continue
+                when = date.replace(hour=hour)
+                if rng.random() < 0.1:
+                    status = "cancelled"
+                else:
+                    status = "completed" if when < now else "scheduled"
+                yield {
+                    "therapist_id": therapist_id,
+                    "patient_id": rng.choice(patient_ids),
+                    "date": when,
+                    "status": status,
+                    "created_at": when - timedelta(days=rng.randint(1, 30)),
+                    "updated_at": when,
+                }
+
+
+def seed_clinic(therapists: int = 50, patients: int = 2000, years: float = 2.0, sessions_per_week: int = 20,
+                future_days: int = 90, seed: int = 42) -> dict:
+    """
+    Popular o banco de DATABASE_URL (já migrado) com a clínica sintética
+
+    Os agendamentos cobrem `years` anos até hoje mais `future_days` dias à
+    frente. Retorna um resumo com as quantidades e os ids gerados.
+    """
+    from sqlalchemy import insert, select
+    from app.database.connection import SessionLocal, engine
+    from app.models.appointment import Appointment
+    from app.models.user import User
+    from app.models.working_hours import WorkingHours
+    from app.utils.auth import hash_password
+    from app.utils.statistics import reconcile_counters
+
+    rng = random.Random(seed)
+    started = clock.perf_counter()
+    password = hash_password(SYNTHETIC_PASSWORD)
+    created_at = datetime(2020, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "email": ADMIN_EMAIL, "password": password, "name": "Admin", "role": "admin", "created_at": created_at
+        }])
+        conn.execute(insert(User), [
+            {
+                "email": therapist_email(i),
+                "password": password,
+                "name": f"Terapeuta {i:05d}",
+                "role": "therapist",
+                "specialization": SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+                "crm_or_crp": f"CRP-{i:06d}",
+                "created_at": created_at,
+            }
+            for i in range(therapists)
+        ])
+        for batch in _batched(
+            {"email": patient_email(i), "password": password, "name": f"Paciente {i:07d}", "role": "patient", "created_at": created_at}
+            for i in range(patients)
+        ):
+            conn.execute(insert(User), batch)
+
+        therapist_ids = list(conn.scalars(select(User.id).where(User.role == "therapist").order_by(User.id)))
+        patient_ids = list(conn.scalars(select(User.id).where(User.role == "patient").order_by(User.id)))
+        conn.execute(insert(WorkingHours), [
+            {"therapist_id": tid, "weekday": weekday, "start_time": time(WORK_START_HOUR), "end_time": time(WORK_END_HOUR)}
+            for tid in therapist_ids
+            for weekday in range(5)
+        ])
+
+        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        start = datetime.combine((now - timedelta(days=int(365 * years))).date(), time())
+        days = int(365 * years) + future_days
+        appointments = 0
+        for batch in _batched(_appointment_rows(rng, therapist_ids, patient_ids, start, days, sessions_per_week, now)):
+            conn.execute(insert(Appointment), batch)
+            appointments += len(batch)
+
+    # Inserções do Core não passam pelos eventos dos contadores
+    db = SessionLocal()
+    try:
+        reconcile_counters(db)
+    finally:
+        db.close()
+
+    return {
+        "therapists": therapists,
+        "patients": patients,
+        "appointments": appointments,
+        "years": years,
+        "seed": seed,
+        "seconds": round(clock.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--therapists", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--sessions-per-week", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.database.migrate import upgrade
+
+    upgrade()
+    print(json.dumps(seed_clinic(args.therapists, args.patients, args.years, args.sessions_per_week, seed=args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark da importação em massa de usuários
+
+Gera um NDJSON com --users linhas (metade com senha, metade sem) e o envia
+ao endpoint de importação. O custo do bcrypt domina: --rounds ajusta o
+BCRYPT_ROUNDS do subprocesso para medir o restante do pipeline.
+
+    python -m benchmarks.user_import --users 10000 100000 --rounds 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def build_payload(users: int) -> bytes:
+    lines = []
+    for i in range(users):
+        row = {"email": f"user{i}@example.com", "name": f"Usuário {i}", "role": "patient"}
+        if i % 2 == 0:
+            row["password"] = f"senha-{i}"
+        if i % 10 == 0:
+            row.update(role="therapist", specialization="Psicólogo", crm_or_crp=f"CRP{i}")
+        lines.append(json.dumps(row))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def run_worker(users: int) -> dict:
+    import asyncio
+    import resource
+    from benchmarks.asgi import call
+    from app.database.connection import SessionLocal
+    from app.models.user import User
+    from app.utils.auth import create_access_token
+    from main import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    db = SessionLocal()
+    db.add(User(email="admin@example.com", password="x", name="Admin", role="admin"))
+    db.commit()
+    db.close()
+
+    boundary = "benchmark-boundary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"users.ndjson\"\r\n"
+        f"Content-Type: application/x-ndjson\r\n\r\n"
+    ).encode() + build_payload(users) + f"\r\n--{boundary}--\r\n".encode()
+    headers = {
+        "authorization": f"Bearer {create_access_token({'sub': '1', 'role': 'admin'})}",
+        "content-type": f"multipart/form-data; boundary={boundary}",
+    }
+
+    started = time.perf_counter()
+    status, _, response = asyncio.run(call(app, "POST", "/api/admin/usuarios/importar", headers=headers, body=body))
+    elapsed = time.perf_counter() - started
+    assert status == 200, response
+    report = json.loads(response)
+    return {
+        "users": users,
+        "bcrypt_rounds": int(os.environ.get("BCRYPT_ROUNDS", "12")),
+        "created": report["created"],
+        "failed": report["failed"],
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(users / elapsed),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.users[0])))
+        return
+
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                BCRYPT_ROUNDS=str(args.rounds),
+                OUTBOX_WORKER_ENABLED="false",
+            )
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.user_import", "--worker", "--users", str(users)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Busca de usuários: FTS5/prefixo contra LIKE '%termo%'
+
+Cria --users usuários com nomes brasileiros (acentuados, muitos repetidos)
+em um banco temporário, inseridos em lotes pelo Core (os triggers mantêm a
+busca), e mede a latência de cada consulta em search_users e no LIKE
+equivalente sobre users (ordenado por nome, como a faixa do prefixo):
+
+    python -m benchmarks.user_search --users 1000000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+FIRST = (
+    "João José Maria Ana Antônio Francisco Carlos Paulo Pedro Lucas Luís Marcos Luíza Gabriel Rafael Daniel "
+    "Marcelo Bruno Eduardo Felipe Raimundo Rodrigo Manoel Mateus André Fernando Fábio Leonardo Gustavo Márcio "
+    "Juliana Patrícia Aline Sandra Camila Amanda Bruna Jéssica Letícia Júlia Luciana Vanessa Mariana Gabriela "
+    "Vera Cecília Inês Conceição Sebastião Tânia Débora Cláudia Mônica Simão Estêvão Açucena"
+).split()
+LAST = (
+    "Silva Santos Oliveira Souza Rodrigues Ferreira Alves Pereira Lima Gomes Costa Ribeiro Martins Carvalho "
+    "Almeida Lopes Soares Fernandes Vieira Barbosa Rocha Dias Nascimento Andrade Moreira Nunes Marques Machado "
+    "Mendes Freitas Cardoso Ramos Gonçalves Santana Teixeira Araújo Conceição Simões Magalhães Brandão Falcão "
+    "Gusmão Assunção Patrício Correia Leão Xavier"
+).split()
+SPECIALIZATIONS = ("Psicólogo", "Médico", "Psiquiatra")
+
+QUERIES = [
+    {"q": "joao"},
+    {"q": "CONCEICAO"},
+    {"q": "marcio gusmao"},
+    {"q": "ma"},
+    {"q": "silva", "role": "therapist"},
+    {"q": "leao", "role": "therapist", "specialization": "Psiquiatra"},
+    {"q": "user0012345"},
+    {"q": "joao silva santos"},
+]
+
+
+def seed(users: int):
+    from sqlalchemy import insert
+    from app.database.connection import SessionLocal
+    from app.database.migrate import upgrade
+    from app.models.user import User
+    from app.utils.user_search import fold
+
+    upgrade()
+    rng = random.Random(3)
+    db = SessionLocal()
+    started = time.perf_counter()
+    batch = []
+    for i in range(1, users + 1):
+        first, last, last2 = rng.choice(FIRST), rng.choice(LAST), rng.choice(LAST)
+        therapist = i % 20 == 0
+        batch.append({
+            "email": f"{fold(first)}.{fold(last)}.user{i:07d}@example.com",
+            "password": "x",
+            "name": f"{first} {last} {last2}",
+            "role": "therapist" if therapist else "patient",
+            "specialization": rng.choice(SPECIALIZATIONS) if therapist else None,
+        })
+        if len(batch) == 10_000:
+            db.execute(insert(User), batch)
+            batch = []
+    if batch:
+        db.execute(insert(User), batch)
+    db.commit()
+    db.close()
+    print(json.dumps({"seed_users": users, "seed_s": round(time.perf_counter() - started, 1)}), file=sys.stderr)
+
+
+def run_worker(repeat: int) -> list:
+    from sqlalchemy import or_, select
+    from app.database.connection import ReadSessionLocal
+    from app.models.user import User
+    from app.utils.user_search import SEARCH_COLUMNS, search_users
+    from benchmarks.asgi import percentile
+
+    db = ReadSessionLocal()
+    results = []
+    for params in QUERIES:
+        samples, pages = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = search_users(db, limit=20, **params)
+            samples.append((time.perf_counter() - started) * 1000)
+        # Segunda página, pelo cursor
+        if page["next_cursor"]:
+            started = time.perf_counter()
+            search_users(db, limit=20, cursor=page["next_cursor"], **params)
+            pages = round((time.perf_counter() - started) * 1000, 2)
+
+        like = select(*SEARCH_COLUMNS)
+        for term in params["q"].split():
+            like = like.where(or_(User.name.like(f"%{term}%"), User.email.like(f"%{term}%")))
+        if params.get("role"):
+            like = like.where(User.role == params["role"])
+        started = time.perf_counter()
+        like_rows = len(db.execute(like.order_by(User.name).limit(20)).all())
+        like_ms = (time.perf_counter() - started) * 1000
+
+        results.append({
+            **params,
+            "results": len(page["items"]),
+            "first": page["items"][0]["name"] if page["items"] else None,
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "next_page_ms": pages,
+            "like_ms": round(like_ms, 2),
+            "like_results": like_rows,
+        })
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.users)
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", OUTBOX_WORKER_ENABLED="false")
+        subprocess.run([sys.executable, "-m", "benchmarks.user_search", "--seed", "--users", str(args.users)], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.user_search", "--worker", "--repeat", str(args.repeat)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        for result in json.loads(output.strip().splitlines()[-1]):
+            print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
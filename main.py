@@ -1,21 +1,83 @@
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from dotenv import load_dotenv
-from app.database.connection import engine, Base
+from app.database.connection import DATABASE_ASYNC, async_engine, async_read_engine
+from app.database.migrate import pending_migrations
 from app.models.user import User
 from app.models.appointment import Appointment
+from app.models.appointment_series import AppointmentSeries
+from app.models.calendar_outbox import CalendarOutbox
+from app.models.stat_counter import StatCounter
+from app.models.working_hours import WorkingHours
+from app.models.collection_version import CollectionVersion
+from app.models.calendar_sync_state import CalendarSyncState
+from app.models.reminder_delivery import ReminderDelivery
+from app.models.archived_appointment import ArchivedAppointment
 from app.routes.auth import router as auth_router
 from app.routes.appointments import router as appointments_router
 from app.routes.admin import router as admin_router
 from app.routes.google_meet import router as google_meet_router
+from app.routes.availability import router as availability_router
+from app.routes.auth_async import router as auth_async_router
+from app.routes.appointments_async import router as appointments_async_router
+from app.routes.admin_async import router as admin_async_router
+from app.utils.password_pool import start_password_pool, shutdown_password_pool
+from app.utils.google_meet import warm_up_google_calendar
+from app.utils.calendar_outbox import outbox_worker, OUTBOX_WORKER_ENABLED
+from app.utils.statistics import stats_reconciler, STATS_RECONCILE_ENABLED
+from app.utils.calendar_sync import calendar_sync_worker, CALENDAR_SYNC_ENABLED
+from app.utils.reminders import reminder_scheduler, REMINDERS_ENABLED
+from app.utils.archive import appointment_archiver, ARCHIVE_ENABLED
+from app.utils.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Criar tabelas
-Base.metadata.create_all(bind=engine)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O esquema é criado/atualizado por "python -m app.database.migrate upgrade"
+    pending = pending_migrations()
+    if pending:
+        logger.warning(
+            "Migrações pendentes: %s; execute 'python -m app.database.migrate upgrade'",
+            [version for version, _ in pending]
+        )
+    # Workers de senha criados antes que o threadpool comece a atender
+    start_password_pool()
+    warm_up_google_calendar()
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    if STATS_RECONCILE_ENABLED:
+        stats_reconciler.start()
+    if CALENDAR_SYNC_ENABLED:
+        calendar_sync_worker.start()
+    if REMINDERS_ENABLED:
+        reminder_scheduler.start()
+    if ARCHIVE_ENABLED:
+        appointment_archiver.start()
+    yield
+    appointment_archiver.stop()
+    reminder_scheduler.stop()
+    calendar_sync_worker.stop()
+    stats_reconciler.stop()
+    outbox_worker.stop()
+    shutdown_password_pool()
+    if DATABASE_ASYNC:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
 
-app = FastAPI(title="API do Sinergia Pro", version="1.0.0")
+# orjson como serializador padrão das respostas JSON
+app = FastAPI(title="API do Sinergia Pro", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -25,12 +87,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Adicionado por último: envolve os demais middlewares e mede a requisição inteira
+app.add_middleware(MetricsMiddleware)
 
 # Routers
+if DATABASE_ASYNC:
+    # Registradas antes: as rotas com versão assíncrona têm prioridade e as
+    # demais (exportação, séries, importação...) seguem nas síncronas
+    app.include_router(auth_async_router)
+    app.include_router(appointments_async_router)
+    app.include_router(admin_async_router)
 app.include_router(auth_router)
 app.include_router(appointments_router)
 app.include_router(admin_router)
 app.include_router(google_meet_router)
+app.include_router(availability_router)
 
 @app.get("/")
 def read_root():
@@ -40,3 +111,8 @@ def read_root():
         "docs": "/docs",
         "redoc": "/redoc"
     }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
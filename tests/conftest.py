@@ -0,0 +1,63 @@
+"""
+Configuração dos testes
+
+Os módulos da aplicação leem DATABASE_URL na importação: o banco SQLite
+temporário é definido aqui, antes de qualquer import de app, e migrado uma
+vez por sessão com o mesmo executor usado em produção.
+"""
+import os
+import shutil
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sinergia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["OUTBOX_WORKER_ENABLED"] = "false"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Sem processos dedicados: o bcrypt roda no threadpool
+os.environ.setdefault("PASSWORD_POOL_WORKERS", "0")
+os.environ.setdefault("PASSWORD_BULK_WORKERS", "0")
+
+import pytest
+from sqlalchemy import delete
+from app.database.connection import Base, SessionLocal, engine
+from app.database.migrate import upgrade
+from app.models.user import User
+from app.utils.auth import clear_auth_cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    upgrade()
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """Sessão de escrita; as tabelas são esvaziadas ao final de cada teste"""
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(delete(table))
+    session.commit()
+    session.close()
+    # Os ids são reaproveitados depois de esvaziar as tabelas
+    clear_auth_cache()
+
+
+@pytest.fixture
+def therapist(db):
+    user = User(email="terapeuta@example.com", password="x", name="Terapeuta", role="therapist")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def patient(db):
+    user = User(email="paciente@example.com", password="x", name="Paciente", role="patient")
+    db.add(user)
+    db.commit()
+    return user
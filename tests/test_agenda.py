@@ -0,0 +1,24 @@
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.models.appointment import Appointment
+from app.routes import appointments as appointment_routes
+from app.utils.auth import create_access_token
+from main import app
+
+client = TestClient(app)
+
+
+def test_agenda_defaults_to_the_local_day(db, therapist, patient, monkeypatch):
+    # 22h30 em São Paulo: em UTC já é o dia seguinte
+    monkeypatch.setattr(appointment_routes, "local_now", lambda: datetime(2030, 1, 7, 22, 30))
+    db.add_all([
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 7, 23)),
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 8, 9)),
+    ])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(therapist.id), 'role': 'therapist'})}"}
+    db.rollback()
+
+    response = client.get("/api/appointments/agenda", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [item["date"] for item in response.json()["items"]] == ["2030-01-07T23:00:00"]
@@ -0,0 +1,60 @@
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.models.appointment import Appointment
+from app.models.user import User
+from app.utils import google_meet
+from app.utils.auth import create_access_token
+from app.utils.google_meet import local_now
+from main import app
+
+client = TestClient(app)
+
+
+def _headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id), 'role': user.role})}"}
+
+
+def _series(therapist, patient, start, count=3) -> dict:
+    return {"therapist_id": therapist.id, "patient_id": patient.id, "start": start.isoformat(), "count": count}
+
+
+@pytest.fixture
+def other_therapist(db):
+    user = User(email="outro@example.com", password="x", name="Outro", role="therapist")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_series_routes_require_the_owner_or_an_admin(db, therapist, patient, other_therapist):
+    start = (local_now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    payload = _series(therapist, patient, start)
+    owner, other, patient_headers = _headers(therapist), _headers(other_therapist), _headers(patient)
+    # As rotas usam a conexão de escrita
+    db.rollback()
+
+    assert client.post("/api/appointments/series", json=payload).status_code in (401, 403)
+    for headers in (patient_headers, other):
+        assert client.post("/api/appointments/series", json=payload, headers=headers).status_code == 403
+
+    response = client.post("/api/appointments/series", json=payload, headers=owner)
+    assert response.status_code == 201, response.text
+    url = f"/api/appointments/series/{response.json()['series_id']}"
+    assert client.patch(url, json={"notes": "x"}, headers=other).status_code == 403
+    assert client.delete(url, headers=patient_headers).status_code == 403
+    assert client.delete(url, headers=owner).json()["cancelled"] == 3
+
+
+def test_cancel_from_now_uses_local_time(db, therapist, patient, monkeypatch):
+    monkeypatch.setattr(google_meet, "CALENDAR_TIME_ZONE", "America/Sao_Paulo")
+    # Primeira ocorrência daqui a uma hora (hora local), antes do "agora" em UTC
+    start = (local_now() + timedelta(hours=1)).replace(second=0, microsecond=0)
+    payload, owner = _series(therapist, patient, start), _headers(therapist)
+    db.rollback()
+    response = client.post("/api/appointments/series", json=payload, headers=owner)
+    series_id = response.json()["series_id"]
+    response = client.delete(f"/api/appointments/series/{series_id}", headers=owner)
+    assert response.json()["cancelled"] == 3
+    statuses = {status for (status,) in db.query(Appointment.status).filter(Appointment.series_id == series_id)}
+    assert statuses == {"cancelled"}
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.archived_appointment import ArchivedAppointment
+from app.models.calendar_outbox import CalendarOutbox
+from app.models.reminder_delivery import ReminderDelivery
+from app.models.user import User
+from app.utils.archive import archive_appointments
+from app.utils.collection_versions import appointment_feed_query
+from app.utils.statistics import counter_drift
+
+NOW = datetime(2030, 6, 1, 12)
+OLD = NOW - timedelta(days=60)
+
+
+def _feed_version(db, therapist_id=None, patient_id=None):
+    return db.scalar(appointment_feed_query(therapist_id, patient_id)) or 0
+
+
+def test_archive_moves_old_rows_in_batches(db, therapist, patient):
+    other = User(email="outro@example.com", password="x", name="Outro", role="therapist")
+    db.add(other)
+    db.commit()
+    archived = [
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=OLD, status="completed", notes="a"),
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=OLD + timedelta(hours=1), status="cancelled"),
+        Appointment(therapist_id=other.id, patient_id=patient.id, date=OLD, status="completed"),
+    ]
+    kept = [
+        # Ainda agendado, recente demais, ou com job ativo na outbox
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=OLD, status="scheduled"),
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=NOW - timedelta(days=1), status="completed"),
+        Appointment(therapist_id=other.id, patient_id=patient.id, date=OLD, status="cancelled"),
+    ]
+    db.add_all(archived + kept)
+    db.commit()
+    db.add_all([
+        ReminderDelivery(appointment_id=archived[0].id, offset_minutes=30, due_at=OLD - timedelta(minutes=30), status="sent"),
+        CalendarOutbox(appointment_id=archived[0].id, operation="create", status="done"),
+        CalendarOutbox(appointment_id=kept[2].id, operation="delete", status="pending"),
+    ])
+    db.commit()
+    archived_ids, kept_ids = sorted(a.id for a in archived), sorted(a.id for a in kept)
+    before = (_feed_version(db, therapist.id), _feed_version(db, other.id), _feed_version(db, patient_id=patient.id))
+    # O arquivamento usa a própria sessão: liberar a conexão de escrita
+    db.rollback()
+
+    result = archive_appointments(SessionLocal, now=NOW, after_days=30, batch_size=2, pause=0)
+    assert (result["archived"], result["batches"]) == (3, 2)
+
+    assert sorted(db.scalars(select(Appointment.id))) == kept_ids
+    rows = {row.id: row for row in db.scalars(select(ArchivedAppointment))}
+    assert sorted(rows) == archived_ids
+    first = rows[archived_ids[0]]
+    assert (first.therapist_id, first.date, first.status, first.notes) == (therapist.id, OLD, "completed", "a")
+    assert first.created_at is not None and first.archived_at is not None
+    # Linhas dependentes removidas; o job ativo do agendamento mantido fica
+    assert db.scalar(select(func.count()).select_from(ReminderDelivery)) == 0
+    assert list(db.scalars(select(CalendarOutbox.appointment_id))) == [kept[2].id]
+
+    # Versões das agendas afetadas incrementadas na mesma transação
+    after = (_feed_version(db, therapist.id), _feed_version(db, other.id), _feed_version(db, patient_id=patient.id))
+    assert [a > b for a, b in zip(after, before)] == [True, True, True]
+    # Os contadores seguem contando o arquivo
+    assert counter_drift(db) == {}
+
+    db.rollback()
+    assert archive_appointments(SessionLocal, now=NOW, after_days=30, batch_size=2, pause=0)["archived"] == 0
@@ -0,0 +1,71 @@
+import asyncio
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from app.database.connection import ReadSessionLocal
+from app.models.user import User
+from app.utils import auth
+from main import app
+
+client = TestClient(app)
+USER = {"email": "nova@example.com", "password": "segredo123", "name": "Nova", "role": "patient"}
+
+
+def test_register_then_login(db):
+    response = client.post("/api/auth/register", json=USER)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == USER["email"]
+    assert client.post("/api/auth/register", json=USER).status_code == 400
+
+    response = client.post("/api/auth/login", json={"email": USER["email"], "password": USER["password"]})
+    assert response.status_code == 200, response.text
+    token = response.json()["access_token"]
+    assert response.json()["user"]["role"] == "patient"
+    assert client.get("/api/appointments/agenda", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_login_rejects_wrong_password_and_unknown_email(db):
+    client.post("/api/auth/register", json=USER)
+    for email, password in ((USER["email"], "errada"), ("ninguem@example.com", USER["password"])):
+        response = client.post("/api/auth/login", json={"email": email, "password": password})
+        assert response.status_code == 401
+
+
+def _current_user(token):
+    db = ReadSessionLocal()
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        return asyncio.run(auth.get_current_user(credentials, db))
+    finally:
+        db.close()
+
+
+def test_bulk_update_invalidates_cached_user(db, patient, monkeypatch):
+    monkeypatch.setattr(auth, "USER_CACHE_GENERATION_CHECK_SECONDS", 0)
+    user_id = patient.id
+    token = auth.create_access_token({"sub": str(user_id), "role": "patient"})
+    db.rollback()
+    assert _current_user(token).role == "patient"
+    assert _current_user(token).role == "patient"
+    hits = auth.get_auth_cache_stats()["user_hits"]
+
+    # update() em massa não passa pelos eventos do mapper nem pelo after_flush
+    db.execute(update(User).where(User.id == user_id).values(role="admin"))
+    db.commit()
+    assert _current_user(token).role == "admin"
+    assert auth.get_auth_cache_stats()["user_hits"] == hits
+
+
+def test_write_from_another_worker_expires_cached_user(db, patient, monkeypatch):
+    monkeypatch.setattr(auth, "USER_CACHE_GENERATION_CHECK_SECONDS", 0)
+    token = auth.create_access_token({"sub": str(patient.id), "role": "patient"})
+    assert patient.name == "Paciente"
+    db.rollback()
+    assert _current_user(token).name == "Paciente"
+
+    # Commit em outro processo: o after_commit deste não remove a entrada
+    monkeypatch.setattr(auth, "invalidate_user", lambda user_id: None)
+    patient.name = "Renomeada"
+    db.commit()
+    db.rollback()
+    assert _current_user(token).name == "Renomeada"
@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.appointment_series import AppointmentSeries
+from app.models.working_hours import WorkingHours
+from app.utils import google_meet
+from app.utils.availability import APPOINTMENT_DURATION, AvailabilityIndex, find_conflict, find_conflicts_many
+from app.utils.google_meet import local_now
+
+START = datetime(2030, 1, 7, 10)
+
+
+def _book(db, therapist, patient, date, **kwargs):
+    appointment = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=date, **kwargs)
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+
+def test_overlap_is_a_conflict_but_touching_is_not(db, therapist, patient):
+    booked = _book(db, therapist, patient, START)
+    assert find_conflict(db, therapist.id, START + timedelta(minutes=30)).id == booked.id
+    assert find_conflict(db, therapist.id, START - timedelta(minutes=30)).id == booked.id
+    assert find_conflict(db, therapist.id, START + APPOINTMENT_DURATION) is None
+    assert find_conflict(db, therapist.id, START - APPOINTMENT_DURATION) is None
+
+
+def test_cancelled_excluded_and_other_therapists_do_not_conflict(db, therapist, patient):
+    cancelled = _book(db, therapist, patient, START, status="cancelled")
+    assert find_conflict(db, therapist.id, START) is None
+    booked = _book(db, therapist, patient, START + timedelta(hours=3))
+    assert find_conflict(db, therapist.id, booked.date, exclude_id=booked.id) is None
+    assert find_conflict(db, patient.id, booked.date) is None
+    assert cancelled.id != booked.id
+
+
+def test_find_conflicts_many_matches_each_start(db, therapist, patient):
+    _book(db, therapist, patient, START)
+    _book(db, therapist, patient, START + timedelta(days=7))
+    starts = [START + timedelta(days=7 * week, minutes=30) for week in range(4)]
+    assert find_conflicts_many(db, therapist.id, starts) == starts[:2]
+    assert find_conflicts_many(db, therapist.id, []) == []
+
+
+def test_find_conflicts_many_ignores_the_series_being_moved(db, therapist, patient):
+    series = AppointmentSeries(therapist_id=therapist.id, patient_id=patient.id, frequency="weekly", start=START)
+    db.add(series)
+    db.commit()
+    _book(db, therapist, patient, START, series_id=series.id)
+    other = _book(db, therapist, patient, START + timedelta(days=7))
+    starts = [START, other.date]
+    assert find_conflicts_many(db, therapist.id, starts, exclude_series_id=series.id) == [other.date]
+
+
+def test_search_from_the_past_starts_at_local_now(db, therapist, monkeypatch):
+    monkeypatch.setattr(google_meet, "CALENDAR_TIME_ZONE", "America/Sao_Paulo")
+    db.add_all([
+        WorkingHours(therapist_id=therapist.id, weekday=weekday, start_time=time(0), end_time=time(23, 59))
+        for weekday in range(7)
+    ])
+    db.commit()
+    therapist_id = therapist.id
+    db.rollback()
+    utc_now = datetime.utcnow()
+    [(slot, _)] = AvailabilityIndex(SessionLocal).next_free_slots(
+        [therapist_id], utc_now - timedelta(days=1), utc_now + timedelta(days=2), 1
+    )
+    # Horário local, três horas atrás do UTC: o próximo horário já está liberado
+    assert local_now() - timedelta(minutes=1) <= slot < utc_now
@@ -0,0 +1,93 @@
+from datetime import datetime
+import pytest
+from app.models.appointment import Appointment
+from app.models.calendar_outbox import CalendarOutbox
+from app.utils import calendar_outbox
+from app.utils.calendar_outbox import CalendarOutboxWorker, enqueue_calendar_job
+
+
+@pytest.fixture
+def appointment(db, therapist, patient):
+    appointment = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 7, 10))
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """Calendar falso: registra eventos criados e removidos"""
+    state = {"created": [], "deleted": []}
+
+    def create(**kwargs):
+        state["created"].append(kwargs["event_id"])
+        return {"event_id": kwargs["event_id"], "hangout_link": f"https://meet.google.com/{kwargs['event_id']}"}
+
+    monkeypatch.setattr(calendar_outbox, "create_google_meet_event", create)
+    monkeypatch.setattr(calendar_outbox, "delete_google_meet_event", state["deleted"].append)
+    return state
+
+
+def _process(db, job_id: int):
+    # A sessão do teste devolve a conexão de escrita (única no SQLite) ao worker
+    db.rollback()
+    CalendarOutboxWorker(workers=1)._process(job_id)
+    db.expire_all()
+
+
+def _set_status(db, job_id: int, status: str):
+    db.query(CalendarOutbox).filter(CalendarOutbox.id == job_id).update({"status": status})
+    db.commit()
+
+
+def test_create_is_coalesced_with_the_active_job(db, appointment):
+    first = enqueue_calendar_job(db, appointment.id, "create")
+    db.commit()
+    second = enqueue_calendar_job(db, appointment.id, "create")
+    assert second.id == first.id
+    assert db.query(CalendarOutbox).count() == 1
+
+
+def test_delete_cancels_a_create_not_yet_started(db, appointment):
+    create = enqueue_calendar_job(db, appointment.id, "create")
+    db.commit()
+    assert enqueue_calendar_job(db, appointment.id, "delete") is None
+    db.commit()
+    db.refresh(create)
+    assert create.status == "cancelled"
+    assert db.query(CalendarOutbox).count() == 1
+
+
+def test_delete_waits_for_a_create_in_flight(db, appointment, calendar):
+    create = enqueue_calendar_job(db, appointment.id, "create")
+    db.commit()
+    _set_status(db, create.id, "processing")
+    delete = enqueue_calendar_job(db, appointment.id, "delete")
+    db.commit()
+
+    _process(db, delete.id)
+    assert delete.status == "pending" and delete.event_id is None
+
+    _process(db, create.id)
+    assert delete.event_id == calendar["created"][0]
+    # O evento vai para o delete, não para o agendamento
+    assert db.get(Appointment, appointment.id).google_meet_event_id is None
+
+
+def test_delete_claimed_while_create_finishes_still_removes_the_event(db, appointment, calendar):
+    create = enqueue_calendar_job(db, appointment.id, "create")
+    db.commit()
+    _set_status(db, create.id, "processing")
+    delete = enqueue_calendar_job(db, appointment.id, "delete")
+    db.commit()
+
+    # O create termina sem ver o delete (gravado depois da consulta do create)
+    _set_status(db, delete.id, "failed")
+    _process(db, create.id)
+    _set_status(db, delete.id, "processing")
+    event_id = calendar["created"][0]
+    assert db.get(Appointment, appointment.id).google_meet_event_id == event_id
+
+    _process(db, delete.id)
+    assert delete.status == "done" and calendar["deleted"] == [event_id]
+    assert db.get(Appointment, appointment.id).google_meet_event_id is None
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from app.models.appointment import Appointment
+from app.utils.calendar_sync import apply_events
+
+START = datetime(2030, 1, 7, 10)
+
+
+def _event(event_id: str, start: datetime, updated: datetime, **fields) -> dict:
+    return {
+        "id": event_id,
+        "status": "confirmed",
+        # Início com o fuso de São Paulo, "updated" em UTC, como o Calendar devolve
+        "start": {"dateTime": start.isoformat() + "-03:00"},
+        "updated": updated.isoformat() + "Z",
+        **fields
+    }
+
+
+def _linked(db, therapist, patient, event_id="evento1") -> Appointment:
+    appointment = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=START, google_meet_event_id=event_id)
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+
+def test_move_in_google_survives_an_unrelated_local_edit(db, therapist, patient):
+    appointment = _linked(db, therapist, patient)
+    moved_at = datetime.utcnow() - timedelta(minutes=5)
+    # Edição local posterior à mudança no Google, sem tocar na data
+    appointment.notes = "trazer exames"
+    db.commit()
+
+    stats = apply_events(db, [_event("evento1", START + timedelta(hours=2), moved_at)])
+    assert stats["moved"] == 1
+    assert appointment.date == START + timedelta(hours=2)
+
+
+def test_newer_local_reschedule_wins_but_link_still_updates(db, therapist, patient):
+    appointment = _linked(db, therapist, patient)
+    google_changed_at = datetime.utcnow() - timedelta(minutes=5)
+    appointment.date = START + timedelta(days=1)
+    db.commit()
+    assert appointment.date_changed_at >= google_changed_at
+
+    event = _event("evento1", START + timedelta(hours=2), google_changed_at, hangoutLink="https://meet.google.com/abc")
+    stats = apply_events(db, [event])
+    assert stats["moved"] == 0 and stats["relinked"] == 1
+    assert appointment.date == START + timedelta(days=1)
+    assert appointment.google_meet_link == "https://meet.google.com/abc"
+
+
+def test_cancelled_event_cancels_and_unlinks(db, therapist, patient):
+    appointment = _linked(db, therapist, patient)
+    stats = apply_events(db, [{"id": "evento1", "status": "cancelled"}, {"id": "sem-agendamento", "status": "cancelled"}])
+    assert stats == {"matched": 1, "moved": 0, "cancelled": 1, "relinked": 0}
+    assert appointment.status == "cancelled" and appointment.google_meet_event_id is None
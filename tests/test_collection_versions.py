@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.models.appointment import Appointment
+from app.models.collection_version import CollectionVersion
+from app.models.user import User
+from app.utils.collection_versions import appointment_feed_query, bump_versions
+
+START = datetime(2030, 1, 7, 10)
+
+
+def _versions(db, therapist_id, patient_id):
+    return tuple(db.scalar(appointment_feed_query(*args)) or 0 for args in (
+        (therapist_id, None), (None, patient_id), (None, None)
+    ))
+
+
+def test_write_bumps_only_its_own_schedules(db, therapist, patient):
+    other = User(email="outro@example.com", password="x", name="Outro", role="therapist")
+    db.add(other)
+    db.commit()
+    db.add(Appointment(therapist_id=therapist.id, patient_id=patient.id, date=START))
+    db.commit()
+    assert _versions(db, therapist.id, patient.id) == (1, 1, 2)
+    assert db.scalar(appointment_feed_query(other.id, None)) is None
+
+    db.add(Appointment(therapist_id=other.id, patient_id=patient.id, date=START))
+    db.commit()
+    assert _versions(db, therapist.id, patient.id) == (1, 2, 4)
+    # Sem linha global disputada por todas as escritas
+    assert db.get(CollectionVersion, "appointments") is None
+
+
+def test_therapist_change_bumps_both_schedules(db, therapist, patient):
+    other = User(email="outro@example.com", password="x", name="Outro", role="therapist")
+    db.add(other)
+    appointment = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=START)
+    db.add(appointment)
+    db.commit()
+    # Objeto expirado pelo commit: o terapeuta antigo ainda recebe a versão
+    appointment.therapist_id = other.id
+    db.commit()
+    assert db.scalar(appointment_feed_query(therapist.id, None)) == 2
+    assert db.scalar(appointment_feed_query(other.id, None)) == 1
+
+
+def test_bump_versions_upserts_each_key_once(db):
+    bump_versions(db.connection(), ["users:role:patient", "users:role:patient", "users:role:admin"])
+    bump_versions(db.connection(), ["users:role:patient"])
+    db.commit()
+    assert db.get(CollectionVersion, "users:role:patient").version == 2
+    assert db.get(CollectionVersion, "users:role:admin").version == 1
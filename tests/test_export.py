@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.models.appointment import Appointment
+from app.models.user import User
+from app.routes import appointments as appointment_routes
+from app.utils.auth import create_access_token
+from main import app
+
+client = TestClient(app)
+
+
+def _headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id), 'role': user.role})}"}
+
+
+def _seed(db, therapist, patient):
+    db.add_all([
+        Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 7, 9 + hour), notes=f"sessão {hour}")
+        for hour in range(3)
+    ])
+    admin = User(email="admin@example.com", password="x", name="Admin", role="admin")
+    db.add(admin)
+    db.commit()
+    headers = _headers(admin)
+    # A exportação usa as próprias sessões: liberar a conexão de escrita
+    db.rollback()
+    return headers
+
+
+def test_csv_export_streams_in_batches(db, therapist, patient, monkeypatch):
+    headers = _seed(db, therapist, patient)
+    monkeypatch.setattr(appointment_routes, "STREAM_BATCH_SIZE", 2)
+    chunks = list(appointment_routes._export_chunks({"therapist_id": None, "date_from": None, "date_to": None}, "csv"))
+    # Cabeçalho e duas linhas, depois a linha restante
+    assert [chunk.count("\n") for chunk in chunks] == [3, 1]
+
+    response = client.get("/api/appointments/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-disposition"] == 'attachment; filename="agendamentos.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert tuple(rows[0]) == appointment_routes.EXPORT_COLUMNS
+    assert [(r["date"], r["therapist_name"], r["patient_name"], r["notes"]) for r in rows] == [
+        (f"2030-01-07T{9 + hour:02d}:00:00", "Terapeuta", "Paciente", f"sessão {hour}") for hour in range(3)
+    ]
+
+
+def test_gzip_ndjson_export_with_filters(db, therapist, patient):
+    headers = _seed(db, therapist, patient)
+    response = client.get(
+        "/api/appointments/export",
+        params={"format": "ndjson", "gzip": "true", "date_from": "2030-01-07T10:00:00"},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="agendamentos.ndjson.gz"'
+    lines = zlib.decompress(response.content, 31).decode().splitlines()
+    assert [json.loads(line)["notes"] for line in lines] == ["sessão 1", "sessão 2"]
+
+
+def test_therapist_exports_only_their_own_schedule(db, therapist, patient):
+    _seed(db, therapist, patient)
+    other_id = therapist.id + 100
+    therapist_headers, patient_headers = _headers(therapist), _headers(patient)
+    db.rollback()
+    response = client.get("/api/appointments/export", params={"therapist_id": other_id}, headers=therapist_headers)
+    assert response.status_code == 403
+    response = client.get("/api/appointments/export", params={"format": "ndjson"}, headers=patient_headers)
+    assert response.status_code == 403
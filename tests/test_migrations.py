@@ -0,0 +1,53 @@
+import shutil
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, inspect
+from app.database.connection import Base
+from app.database.migrate import check_plans, full_scans, hot_queries, pending_migrations, upgrade
+
+BASELINE_DB = Path(__file__).resolve().parent.parent / "sinergia_pro.db"
+
+
+def _schema(bind) -> dict:
+    """Tabela -> (colunas, índices) do banco, fora as tabelas internas"""
+    inspector = inspect(bind)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_migrations" and not table.startswith("user_search")
+    }
+
+
+def test_upgrade_leaves_nothing_pending(migrated_database):
+    assert pending_migrations(migrated_database) == []
+    assert upgrade(migrated_database) == []
+
+
+def test_migrations_match_models(migrated_database):
+    # Modelo alterado sem migração correspondente falha aqui
+    schema = _schema(migrated_database)
+    for table in Base.metadata.sorted_tables:
+        columns, indexes = schema[table.name]
+        assert {column.name for column in table.columns} == columns, table.name
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+def test_upgraded_baseline_matches_fresh_database(migrated_database, tmp_path):
+    if not BASELINE_DB.exists():
+        pytest.skip("banco da versão inicial não disponível")
+    shutil.copy(BASELINE_DB, tmp_path / "baseline.db")
+    old = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    try:
+        upgrade(old)
+        assert _schema(old) == _schema(migrated_database)
+    finally:
+        old.dispose()
+
+
+@pytest.mark.parametrize("name", sorted(hot_queries()))
+def test_hot_query_uses_an_index(migrated_database, name):
+    plan = check_plans(migrated_database)[name]
+    assert full_scans(plan) == [], f"{name}: {' | '.join(plan)}"
@@ -0,0 +1,23 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(datetime(2025, 3, 1, 14, 30), 42)
+    assert decode_cursor(cursor) == ["2025-03-01 14:30:00", 42]
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("ação?", 1, None)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == ["ação?", 1, None]
+
+
+# Não é base64, JSON que não é lista ({}) e JSON truncado ([1,)
+@pytest.mark.parametrize("cursor", ["não-é-base64!", "e30", "WzEs"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from app.database.connection import SessionLocal
+from app.models.appointment import Appointment
+from app.models.reminder_delivery import ReminderDelivery
+from app.utils import google_meet
+from app.utils.reminders import ReminderScheduler
+
+START = datetime(2030, 1, 7, 10)
+
+
+class RecordingSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminder):
+        self.sent.append(reminder)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _book(db, therapist, patient, date):
+    appointment = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=date)
+    db.add(appointment)
+    db.commit()
+    appointment_id = appointment.id
+    # O agendador usa as próprias sessões: liberar a conexão de escrita
+    db.rollback()
+    return appointment_id
+
+
+def test_reminder_is_due_exactly_at_the_offset(db, therapist, patient):
+    appointment_id = _book(db, therapist, patient, START)
+    clock = FakeClock(START - timedelta(minutes=35))
+    sink = RecordingSink()
+    scheduler = ReminderScheduler(SessionLocal, offsets="30m", sink=sink, clock=clock)
+    assert scheduler.load_window() == 1
+
+    clock.now = START - timedelta(minutes=30, seconds=1)
+    assert scheduler.run_once() == 0
+    clock.now = START - timedelta(minutes=30)
+    assert scheduler.run_once() == 1
+    assert [(r["appointment_id"], r["due_at"]) for r in sink.sent] == [(appointment_id, clock.now)]
+    # sent_at vem do mesmo relógio que os prazos
+    assert db.query(ReminderDelivery.sent_at).scalar() == clock.now
+
+
+def test_default_clock_is_local_time(db, therapist, patient, monkeypatch):
+    monkeypatch.setattr(google_meet, "CALENDAR_TIME_ZONE", "America/Sao_Paulo")
+    # Vencido em UTC, mas ainda a três horas do prazo na hora local
+    _book(db, therapist, patient, datetime.utcnow() + timedelta(minutes=29))
+    sink = RecordingSink()
+    scheduler = ReminderScheduler(SessionLocal, offsets="30m", sink=sink)
+    scheduler.load_window()
+    assert scheduler.run_once() == 0
+    assert sink.sent == []
+
+
+def test_sink_runs_without_holding_the_writer(db, therapist, patient, monkeypatch):
+    first = _book(db, therapist, patient, START)
+    second = _book(db, therapist, patient, START + timedelta(minutes=1))
+    writes = []
+
+    class WritingSink(RecordingSink):
+        def send(self, reminder):
+            # Uma escrita da API durante o envio: com a conexão de escrita presa
+            # pelo agendador, ficaria esperando o pool
+            session = SessionLocal()
+            try:
+                session.get(Appointment, reminder["appointment_id"]).notes = "lembrado"
+                session.commit()
+            finally:
+                session.close()
+            writes.append(reminder["appointment_id"])
+            super().send(reminder)
+
+    monkeypatch.setattr(SessionLocal.kw["bind"].pool, "_timeout", 1)
+    clock = FakeClock(START - timedelta(minutes=35))
+    scheduler = ReminderScheduler(SessionLocal, offsets="30m", sink=WritingSink(), clock=clock)
+    scheduler.load_window()
+    clock.now = START
+    assert scheduler.run_once() == 2
+    assert sorted(writes) == [first, second]
+    assert db.query(ReminderDelivery.status).distinct().all() == [("sent",)]
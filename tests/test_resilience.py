@@ -0,0 +1,135 @@
+import threading
+import pytest
+from app.utils import resilience
+from app.utils.resilience import (
+    BulkheadFullError, CallTimeoutError, CircuitBreaker, CircuitOpenError, GuardedExecutor
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio monotônico controlado pelo teste"""
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=30)
+    _fail(breaker, 2)
+    breaker.before_call()
+    breaker.record_success()
+    _fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    _fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, cooldown_seconds=30)
+    _fail(breaker, 5)
+    clock[0] += 31
+    _fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_ignored_result_frees_the_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    breaker.before_call()
+    breaker.record_ignored()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_guarded_executor_counts_timeouts_as_failures():
+    release = threading.Event()
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    executor = GuardedExecutor("teste", max_concurrent=1, max_queue=0, timeout=0.05, breaker=breaker)
+    try:
+        with pytest.raises(CallTimeoutError):
+            executor.call(release.wait)
+        with pytest.raises(CircuitOpenError):
+            executor.call(lambda: None)
+        stats = executor.stats()
+        assert stats["timeouts"] == 1 and stats["short_circuited"] == 1
+    finally:
+        release.set()
+
+
+def test_guarded_executor_rejects_when_full():
+    release = threading.Event()
+    executor = GuardedExecutor("teste", max_concurrent=1, max_queue=0, timeout=5, breaker=CircuitBreaker())
+    worker = threading.Thread(target=executor.call, args=(release.wait,))
+    worker.start()
+    try:
+        while executor.stats()["in_flight"] == 0:
+            release.wait(0.001)
+        with pytest.raises(BulkheadFullError):
+            executor.call(lambda: None)
+        assert executor.stats()["rejected"] == 1
+    finally:
+        release.set()
+        worker.join()
+    assert executor.call(lambda: 42) == 42
+
+
+def test_guarded_executor_ignores_non_failures():
+    breaker = CircuitBreaker(failure_threshold=1)
+    executor = GuardedExecutor(
+        "teste", max_concurrent=1, max_queue=0, timeout=1, breaker=breaker,
+        is_failure=lambda exc: not isinstance(exc, KeyError)
+    )
+
+    def missing():
+        raise KeyError("404")
+
+    with pytest.raises(KeyError):
+        executor.call(missing)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_bulkhead_rejection_keeps_the_breaker_half_open(clock):
+    release = threading.Event()
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    executor = GuardedExecutor("teste", max_concurrent=1, max_queue=0, timeout=0.05, breaker=breaker)
+    try:
+        # Dependência travada: a chamada expira, mas a thread continua ocupada
+        with pytest.raises(CallTimeoutError):
+            executor.call(release.wait)
+        clock[0] += 30
+        with pytest.raises(BulkheadFullError):
+            executor.call(lambda: None)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(BulkheadFullError):
+            executor.call(lambda: None)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+    finally:
+        release.set()
+    while executor.stats()["in_flight"]:
+        release.wait(0.001)
+    assert executor.call(lambda: 42) == 42
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,51 @@
+from datetime import datetime
+from sqlalchemy import delete, insert
+from app.models.appointment import Appointment
+from app.models.stat_counter import StatCounter
+from app.models.user import User
+from app.utils.statistics import (
+    compute_counters, correct_counters, counter_drift, read_statistics, reconcile_counters
+)
+
+
+def _counters(db) -> dict:
+    return {key: value for key, value in db.query(StatCounter.key, StatCounter.value) if value}
+
+
+def test_mapper_events_keep_counters_equal_to_recomputed(db, therapist, patient):
+    first = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 7, 10))
+    second = Appointment(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 2, 7, 10))
+    db.add_all([first, second])
+    db.commit()
+    assert _counters(db) == compute_counters(db)
+
+    # Mudança de status e de mês, troca de perfil e remoções
+    first.status = "completed"
+    second.date = datetime(2030, 3, 1, 9)
+    patient.role = "therapist"
+    db.commit()
+    assert _counters(db) == compute_counters(db)
+    assert _counters(db)["appointments:month:2030-03"] == 1
+
+    db.delete(first)
+    db.delete(therapist)
+    db.commit()
+    assert _counters(db) == compute_counters(db)
+    stats = read_statistics(db)
+    assert stats["total_users"] == 1 and stats["total_therapists"] == 1
+    assert stats["appointments_by_status"] == {"scheduled": 1}
+    assert stats["appointments_by_month"] == {"2030-03": 1}
+    assert counter_drift(db) == {}
+
+
+def test_drift_from_core_writes_is_corrected(db, therapist, patient):
+    # Escritas do Core sem adjust_counters: os contadores ficam para trás
+    db.execute(insert(Appointment).values(therapist_id=therapist.id, patient_id=patient.id, date=datetime(2030, 1, 7, 10), status="scheduled"))
+    db.execute(delete(StatCounter).where(StatCounter.key == "users:role:patient"))
+    db.commit()
+    drift = counter_drift(db)
+    assert drift == {"appointments:status:scheduled": 1, "appointments:month:2030-01": 1, "users:role:patient": 1}
+
+    correct_counters(db, drift)
+    assert _counters(db) == compute_counters(db)
+    assert reconcile_counters(db) == {}
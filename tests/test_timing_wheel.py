@@ -0,0 +1,52 @@
+import pytest
+from app.utils.timing_wheel import TimingWheel
+
+
+def test_item_expires_on_its_tick():
+    wheel = TimingWheel(start=0, tick=1.0, wheel_size=8, levels=3)
+    wheel.schedule("a", 5.0, "lembrete")
+    assert wheel.advance(4.9) == []
+    assert wheel.advance(5.0) == [("a", "lembrete")]
+    assert len(wheel) == 0
+
+
+def test_far_items_cascade_down_and_expire_in_order():
+    wheel = TimingWheel(start=0, tick=1.0, wheel_size=8, levels=3)
+    # Prazos nos três níveis (8 e 64 ticks por posição nos níveis 1 e 2)
+    dues = {"c": 300.0, "a": 3.0, "b": 70.0, "d": 65.0}
+    for key, due in dues.items():
+        assert wheel.schedule(key, due, due)
+
+    fired = {}
+    for now in range(1, 400):
+        for key, due in wheel.advance(float(now)):
+            fired[key] = now
+    assert fired == {key: int(due) for key, due in dues.items()}
+
+
+def test_cancel_and_reschedule():
+    wheel = TimingWheel(start=0, tick=1.0, wheel_size=8, levels=2)
+    wheel.schedule("a", 10.0, 1)
+    wheel.schedule("b", 10.0, 2)
+    assert wheel.cancel("a")
+    assert not wheel.cancel("a")
+    wheel.schedule("b", 20.0, 3)
+    assert "a" not in wheel and "b" in wheel
+    assert wheel.advance(19.0) == []
+    assert wheel.advance(20.0) == [("b", 3)]
+
+
+def test_past_due_fires_on_next_tick_and_out_of_span_is_refused():
+    wheel = TimingWheel(start=100, tick=1.0, wheel_size=4, levels=2)
+    assert wheel.span == 16
+    assert not wheel.schedule("longe", 100 + wheel.span, None)
+    assert wheel.schedule("atrasado", 50.0, None)
+    assert wheel.advance(101.0) == [("atrasado", None)]
+
+
+@pytest.mark.parametrize("tick", [0.5, 30.0])
+def test_tick_size_scales_due_times(tick):
+    wheel = TimingWheel(start=0, tick=tick, wheel_size=8, levels=2)
+    wheel.schedule("a", 10 * tick, None)
+    assert wheel.advance(9 * tick) == []
+    assert wheel.advance(10 * tick) == [("a", None)]
@@ -0,0 +1,61 @@
+import io
+from app.models.user import User
+from app.utils.auth import hash_password, verify_password
+from app.utils.collection_versions import read_version, user_version_keys
+from app.utils.statistics import compute_counters, counter_drift
+from app.utils.user_import import UserImporter, iter_csv, iter_ndjson
+
+CSV = (
+    "﻿email,name,role,password,specialization,crm_or_crp\n"
+    "ana@example.com,Ana,patient,segredo,,\n"
+    "bruno@example.com,Bruno,therapist,,Psicologia,CRP 123\n"
+    "paciente@example.com,Já Existe,patient,,,\n"
+    "ana@example.com,Ana de Novo,patient,,,\n"
+    "carla@example.com,Carla,therapist,,,\n"
+    "invalido,Sem Email,patient,,,\n"
+).encode()
+
+
+def test_csv_import_in_batches(db, patient):
+    db.rollback()
+    result = UserImporter(db, batch_size=2).run(iter_csv(io.BytesIO(CSV)))
+
+    assert (result["processed"], result["created"], result["failed"]) == (6, 2, 4)
+    assert [(e["line"], e["email"]) for e in result["errors"]] == [
+        (4, "paciente@example.com"), (5, "ana@example.com"), (6, "carla@example.com"), (7, "invalido")
+    ]
+    assert result["errors"][0]["error"] == "Email já registrado"
+    assert result["errors"][1]["error"] == "Email duplicado no arquivo"
+    # Sem senha no arquivo: temporária devolvida uma única vez
+    [credential] = result["credentials"]
+    assert (credential["line"], credential["email"]) == (3, "bruno@example.com")
+
+    ana = db.query(User).filter_by(email="ana@example.com").one()
+    bruno = db.query(User).filter_by(email="bruno@example.com").one()
+    assert verify_password("segredo", ana.password)
+    assert verify_password(credential["temporary_password"], bruno.password)
+    assert (bruno.role, bruno.specialization, bruno.crm_or_crp) == ("therapist", "Psicologia", "CRP 123")
+    assert ana.created_at is not None
+
+
+def test_ndjson_import_keeps_counters_and_versions(db):
+    hashed = hash_password("migrada")
+    data = "\n".join([
+        f'{{"email": "dora@example.com", "name": "Dora", "password_hash": "{hashed}"}}',
+        '{"email": "eva@example.com", "name": "Eva", "password_hash": "md5:abc"}',
+        "não é json",
+        "",
+        '{"email": "fabio@example.com", "name": "Fábio", "password": "x"}',
+    ]).encode()
+    result = UserImporter(db).run(iter_ndjson(io.BytesIO(data)))
+
+    assert result["created"] == 2
+    assert [(e["line"], e["error"]) for e in result["errors"]] == [
+        (2, "password_hash: não é um hash bcrypt"), (3, "JSON inválido")
+    ]
+    # Hash importado sem ser recalculado
+    assert db.query(User.password).filter_by(email="dora@example.com").scalar() == hashed
+    # insert() em massa ajusta contadores e versões na mesma transação
+    assert counter_drift(db) == {}
+    assert compute_counters(db)["users:role:patient"] == 2
+    assert read_version(db, user_version_keys(["patient"])[0]) == 1
@@ -0,0 +1,93 @@
+from sqlalchemy import insert, select, text
+from app.models.user import User
+from app.utils import user_search as user_search_module
+from app.utils.user_search import UserPrefixIndex, fold, search_users, user_search
+
+NAMES = ["Mariana Lopes", "Ana Souza", "João Anágua", "Anabela Reis", "Bruno Lima"]
+
+
+def _add_users(db, names, start=0):
+    users = [User(email=f"user{i}@example.com", password="x", name=name, role="patient") for i, name in enumerate(names, start)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _search_keys(db):
+    return {row.user_id: (row.name_key, row.email_key) for row in db.execute(select(user_search))}
+
+
+def _fts_ids(db, term):
+    return [row[0] for row in db.execute(
+        text("SELECT rowid FROM user_search_fts WHERE user_search_fts MATCH :term ORDER BY rowid"), {"term": f'"{term}"'}
+    )]
+
+
+def test_triggers_keep_search_tables_in_sync(db):
+    ana, bruno = _add_users(db, ["ÁNA Çeleste", "Bruno"])
+    # insert() em massa do Core também passa pelos triggers
+    db.execute(insert(User), [{"email": "Zé@Example.com", "password": "x", "name": "José Ávila", "role": "therapist"}])
+    db.commit()
+    jose_id = db.scalar(select(User.id).where(User.name == "José Ávila"))
+    assert _search_keys(db) == {
+        ana.id: ("ana celeste", "user0@example.com"),
+        bruno.id: ("bruno", "user1@example.com"),
+        jose_id: ("jose avila", "ze@example.com"),
+    }
+
+    assert bruno.name == "Bruno"
+    bruno.name = "Brunão Célio"
+    db.delete(ana)
+    db.commit()
+    keys = _search_keys(db)
+    assert keys[bruno.id][0] == fold("Brunão Célio") == "brunao celio"
+    assert ana.id not in keys
+    # Tabela FTS de conteúdo externo consistente com user_search
+    db.execute(text("INSERT INTO user_search_fts (user_search_fts) VALUES ('integrity-check')"))
+    assert _fts_ids(db, "celi") == [bruno.id]
+    assert _fts_ids(db, "celeste") == []
+
+
+def test_prefix_matches_come_before_contains_matches(db):
+    users = {user.name: user.id for user in _add_users(db, NAMES)}
+    result = search_users(db, "ANA")
+    assert [item["name"] for item in result["items"]] == [
+        # Prefixo, em ordem alfabética; depois os que contêm, por id
+        "Ana Souza", "Anabela Reis", "Mariana Lopes", "João Anágua"
+    ]
+    assert result["next_cursor"] is None
+
+    pages, cursor = [], None
+    while True:
+        page = search_users(db, "ana", cursor=cursor, limit=1)
+        pages += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages == [users[name] for name in ("Ana Souza", "Anabela Reis", "Mariana Lopes", "João Anágua")]
+
+    # Todos os termos precisam casar; termos curtos filtram pelo nome ou email
+    assert [item["name"] for item in search_users(db, "ana lo")["items"]] == ["Mariana Lopes"]
+    assert [item["name"] for item in search_users(db, "ana", role="therapist")["items"]] == []
+
+
+def test_prefix_index_reloads_at_most_once_per_interval(db, monkeypatch):
+    _add_users(db, NAMES)
+    index = UserPrefixIndex()
+    monkeypatch.setattr(user_search_module, "USER_SEARCH_REFRESH_SECONDS", 60)
+    assert [user_id for _, user_id in index.prefix(db, "ana", None, None, None, 10)] == [
+        user.id for user in db.query(User).filter(User.name.in_(["Ana Souza", "Anabela Reis"])).order_by(User.name)
+    ]
+
+    reloads = []
+    current_versions = index._current_versions
+    monkeypatch.setattr(index, "_current_versions", lambda db: reloads.append(1) or current_versions(db))
+    _add_users(db, ["Anastácia"], start=len(NAMES))
+    # Dentro do intervalo: nem as versões são consultadas
+    assert len(index.prefix(db, "ana", None, None, None, 10)) == 2
+    assert index.contains(db, ["ana"], "ana", None, None, 0, 10) != []
+    assert reloads == []
+
+    monkeypatch.setattr(user_search_module, "USER_SEARCH_REFRESH_SECONDS", 0)
+    assert [name_key for name_key, _ in index.prefix(db, "ana", None, None, None, 10)] == ["ana souza", "anabela reis", "anastacia"]
+    assert reloads == [1]